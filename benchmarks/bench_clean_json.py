@@ -0,0 +1,42 @@
+"""Compare clean_json_string against the original character-by-character implementation.
+
+Usage: python benchmarks/bench_clean_json.py [questions] [runs]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.study_logic import clean_json_string
+from tests.test_clean_json import _quiz_payload, _reference_clean_json_string
+
+
+def best_of(fn, payload, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(payload)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    questions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    payload = _quiz_payload(questions)
+    if clean_json_string(payload) != _reference_clean_json_string(payload):
+        print("❌ clean_json_string output differs from the reference implementation")
+        return 1
+
+    current = best_of(clean_json_string, payload, runs)
+    reference = best_of(_reference_clean_json_string, payload, runs)
+    print(f"📦 Payload: {questions} questions, {len(payload)} chars, best of {runs} runs")
+    print(f"⚡ clean_json_string: {current * 1000:.2f} ms")
+    print(f"🐢 reference:         {reference * 1000:.2f} ms")
+    print(f"🚀 Speedup: {reference / current:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
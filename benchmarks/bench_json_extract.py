@@ -0,0 +1,64 @@
+"""Compare extract_json_array against the greedy regex it replaced on ~100 KB AI responses.
+
+Usage: python benchmarks/bench_json_extract.py [size_kb] [runs]
+"""
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.json_extract import extract_json_array
+from tests.test_json_extract import _question
+
+GREEDY_PATTERN = re.compile(r'\[\s*\{.*\}\s*\]', re.DOTALL)
+
+
+def best_of(fn, text, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def regex_extract(text):
+    match = GREEDY_PATTERN.search(text)
+    return match.group(0) if match else None
+
+
+def responses(size):
+    """A well-formed quiz response wrapped in prose, and prose full of '[{' that never closes."""
+    questions = []
+    payload = ""
+    while len(payload) < size:
+        questions.append(_question(len(questions)))
+        payload = json.dumps(questions, ensure_ascii=False, indent=2)
+    unit = "Xem [{mục "
+    return {
+        "quiz": f"Dưới đây là quiz:\n```json\n{payload}\n```\nChúc học tốt!",
+        "unclosed prose": unit * (size // len(unit)),
+    }
+
+
+def main():
+    size_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    for name, text in responses(size_kb * 1024).items():
+        if extract_json_array(text) != regex_extract(text):
+            print(f"❌ {name}: extract_json_array differs from the greedy regex")
+            return 1
+        current = best_of(extract_json_array, text, runs)
+        # The regex backtracks quadratically on unclosed prose; one run is enough to show it
+        reference = best_of(regex_extract, text, 1 if name == "unclosed prose" else runs)
+        print(f"📦 {name}: {len(text) // 1024} KB, best of {runs} runs")
+        print(f"   ⚡ extract_json_array: {current * 1000:.2f} ms")
+        print(f"   🐢 greedy regex:       {reference * 1000:.2f} ms (regex / scan: {reference / max(current, 1e-9):.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
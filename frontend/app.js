@@ -99,6 +99,8 @@ let currentQuiz = [];
 let currentQuestionIndex = 0;
 let searchDebounceTimer = null;
 let currentTimeline = [];
+let timelineEnrichTimer = null;
+let topicsRefreshTimer = null;
 
 let savedProgressMap = {};
 let isExamMode = localStorage.getItem('isExamMode') === 'true';
@@ -443,6 +445,7 @@ async function fetchTopics(forceRefresh = false) {
         allTopics = data.candidates || [];
         populateCourseFilter();
         filterAndRenderTopics();
+        scheduleTopicsRefreshPoll(data.stale);
     } catch (error) {
         console.error(error);
         alert('Lỗi tải chủ đề. Vui lòng kiểm tra kết nối.');
@@ -451,6 +454,30 @@ async function fetchTopics(forceRefresh = false) {
     }
 }
 
+// A stale list is served instantly while the server rebuilds it in the background; swap the fresh one in once ready
+function scheduleTopicsRefreshPoll(stale, attempt = 0) {
+    clearTimeout(topicsRefreshTimer);
+    if (!stale || attempt >= 6) return;
+
+    topicsRefreshTimer = setTimeout(async () => {
+        try {
+            const res = await fetch(`${API_BASE_URL}/api/study/candidates?telegram_id=${telegramData.id}`);
+            if (!res.ok) return;
+            const data = await res.json();
+            if (!data.stale) {
+                const selected = ui.courseFilter.value;
+                allTopics = data.candidates || [];
+                populateCourseFilter();
+                ui.courseFilter.value = selected;
+                filterAndRenderTopics();
+            }
+            scheduleTopicsRefreshPoll(data.stale, attempt + 1);
+        } catch (error) {
+            console.warn('Topics refresh poll failed', error);
+        }
+    }, 5000);
+}
+
 async function startQuickReview() {
     const saved = savedProgressMap['quick_review'];
     if (saved && Array.isArray(saved.quiz) && saved.quiz.length > 0) {
@@ -470,9 +497,16 @@ async function startQuickReview() {
         if (!res.ok) throw new Error('Lỗi tải câu hỏi ôn tập nhanh');
         const data = await res.json();
 
+        // The first page comes from cached questions; the server keeps appending generated ones to the session
+        // and prefetchQuickReviewPage pulls them in ahead of the user
         currentTopic = {
             id: 'quick_review',
-            title: data.title || (selectedCourse ? `Ôn tập nhanh - ${selectedCourse}` : 'Ôn tập tổng hợp')
+            title: data.title || (selectedCourse ? `Ôn tập nhanh - ${selectedCourse}` : 'Ôn tập tổng hợp'),
+            sessionId: data.session_id || null,
+            pageSize: data.page_size,
+            loaded: (data.questions || []).length,
+            total: data.total,
+            complete: data.complete !== false
         };
         currentQuiz = (data.questions || []).map(shuffleQuestionOptions);
         currentQuestionIndex = 0;
@@ -493,6 +527,7 @@ async function startQuickReview() {
         ui.quizTopicTitle.textContent = currentTopic.title;
         renderQuestion();
         showView('quiz');
+        prefetchQuickReviewPage();
     } catch (error) {
         console.error(error);
         alert('Lỗi tải câu hỏi ôn tập nhanh. Có thể không có chủ đề hoặc câu hỏi nào thuộc môn học đã chọn.');
@@ -500,6 +535,43 @@ async function startQuickReview() {
     }
 }
 
+let quickReviewPrefetching = false;
+let quickReviewRetryTimer = null;
+
+async function prefetchQuickReviewPage() {
+    const topic = currentTopic;
+    if (quickReviewPrefetching || !topic || topic.id !== 'quick_review' || !topic.sessionId) return;
+    if (topic.complete && topic.loaded >= topic.total) return;
+    quickReviewPrefetching = true;
+    clearTimeout(quickReviewRetryTimer);
+    try {
+        // Pages can still grow while generation runs, so ask by position and skip what is already loaded
+        const page = Math.floor(topic.loaded / topic.pageSize);
+        const res = await fetch(`${API_BASE_URL}/api/study/quick-review?session_id=${encodeURIComponent(topic.sessionId)}&page=${page}&page_size=${topic.pageSize || ''}`);
+        if (!res.ok) {
+            topic.complete = true; // Session expired: finish with the questions already loaded
+            topic.total = topic.loaded;
+            return;
+        }
+        const data = await res.json();
+        if (currentTopic !== topic) return;
+        const fresh = (data.questions || []).slice(topic.loaded - page * topic.pageSize);
+        currentQuiz.push(...fresh.map(shuffleQuestionOptions));
+        topic.loaded += fresh.length;
+        topic.total = data.total;
+        topic.complete = data.complete !== false;
+        ui.quizProgress.textContent = `${currentQuestionIndex + 1}/${currentQuiz.length}`;
+        saveQuizProgress();
+        if (!topic.complete && !fresh.length) {
+            quickReviewRetryTimer = setTimeout(prefetchQuickReviewPage, 3000);
+        }
+    } catch (error) {
+        console.warn('⚠️ Không tải trước được trang câu hỏi tiếp theo:', error);
+    } finally {
+        quickReviewPrefetching = false;
+    }
+}
+
 async function startQuiz(topic, forceRefresh = false, customConfig = null) {
     if (!forceRefresh && savedProgressMap[topic.id]) {
         const saved = savedProgressMap[topic.id];
@@ -894,6 +966,11 @@ function renderQuestion(animate = true) {
     ui.explanationBox.classList.add('hidden');
     ui.quizProgress.textContent = `${currentQuestionIndex + 1}/${currentQuiz.length}`;
 
+    // Keep one page of quick review questions loaded ahead of the user
+    if (currentTopic.id === 'quick_review' && currentQuestionIndex >= currentQuiz.length - 5) {
+        prefetchQuickReviewPage();
+    }
+
     // Update progress bar
     if (ui.progressBar && ui.progressContainer) {
         const progressPercent = ((currentQuestionIndex + 1) / currentQuiz.length) * 100;
@@ -1418,6 +1495,7 @@ async function fetchTimeline(forceRefresh = false) {
         populateTimelineFilters();
         filterAndRenderTimeline();
         showView('timeline');
+        scheduleTimelineEnrichmentPoll(data.enrichment_pending || data.stale);
     } catch (error) {
         console.error(error);
         alert('Lỗi tải timeline. Vui lòng thử lại.');
@@ -1425,6 +1503,33 @@ async function fetchTimeline(forceRefresh = false) {
     }
 }
 
+// The server answers with the deterministic (or a stale cached) timeline first and enriches / rebuilds it in the
+// background; pick the new version up from the cache once it lands, keeping the user's filter selections
+function scheduleTimelineEnrichmentPoll(pending, attempt = 0) {
+    clearTimeout(timelineEnrichTimer);
+    if (!pending || attempt >= 10) return;
+
+    timelineEnrichTimer = setTimeout(async () => {
+        if (views.timeline.classList.contains('hidden')) return;
+        try {
+            const res = await fetch(`${API_BASE_URL}/api/study/timeline`);
+            if (!res.ok) return;
+            const data = await res.json();
+            const pending = data.enrichment_pending || data.stale;
+            if (!pending) {
+                const selected = [ui.timelineCourseFilter.value, ui.timelineMonthFilter.value, ui.timelineDateFilter.value];
+                currentTimeline = data.timeline || [];
+                populateTimelineFilters();
+                [ui.timelineCourseFilter.value, ui.timelineMonthFilter.value, ui.timelineDateFilter.value] = selected;
+                filterAndRenderTimeline();
+            }
+            scheduleTimelineEnrichmentPoll(pending, attempt + 1);
+        } catch (error) {
+            console.warn('Timeline enrichment poll failed', error);
+        }
+    }, 4000);
+}
+
 function parseDateParts(dateStr) {
     if (!dateStr) return { day: '--', month: '--', time: '' };
 
@@ -1,30 +1,42 @@
 import re
 import json
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, field_validator
 
 from src.services.study_logic import (
-    get_candidates,
+    get_candidates_snapshot,
     generate_quiz,
     generate_quiz_stream,
     update_status,
-    generate_quick_review,
+    generate_quick_review_stream,
+    create_quick_review_session,
+    get_quick_review_page,
     clear_quiz_cache,
     save_quiz_progress,
     get_quiz_progress,
     clear_quiz_progress,
 )
+from src.services.quiz_warmer import save_last_quiz_config, start_load_reporter, start_warm_scheduler, trigger_quiz_warmup
 from src.jobs.daily_report import run_daily_report
 from src.services.timeline import get_timeline_summary, fetch_in_progress_tasks
 from src.services.telegram import TelegramService
 from src.config.settings import Config
 from src.utils.logger import logger
+from src.utils.ai_client import llm_limiter
+from src.utils.ai_metrics import get_ai_metrics
 
 UUID_PATTERN = re.compile(r'^(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{32})$', re.I)
 
-app = FastAPI(title="Study Quiz API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_load_reporter()
+    start_warm_scheduler()
+    yield
+
+app = FastAPI(title="Study Quiz API", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -94,13 +106,14 @@ def read_root():
 @app.get("/api/study/candidates")
 def api_get_candidates(limit: int = None, force_refresh: bool = False):
     try:
-        candidates = get_candidates(limit=limit, force_refresh=force_refresh)
-        return {"candidates": candidates}
+        candidates, stale = get_candidates_snapshot(limit=limit, force_refresh=force_refresh)
+        return {"candidates": candidates, "stale": stale}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/study/quiz")
 def api_generate_quiz(request: QuizRequest):
+    save_last_quiz_config(request.num_questions, request.difficulty, request.question_type)
     try:
         return StreamingResponse(
             generate_quiz_stream(
@@ -115,6 +128,11 @@ def api_generate_quiz(request: QuizRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/study/warm")
+def api_warm_quizzes():
+    trigger_quiz_warmup()
+    return {"success": True, "message": "Quiz warm-up started"}
+
 @app.delete("/api/study/quiz/{topic_id}")
 def api_clear_quiz_cache(topic_id: str):
     if not UUID_PATTERN.match(topic_id):
@@ -148,24 +166,48 @@ def api_clear_quiz_progress(telegram_id: str, topic_id: str = None):
     return {"success": True, "message": "Quiz progress cleared"}
 
 @app.get("/api/study/quick-review")
-def api_quick_review(course: str = None):
+def api_quick_review(course: str = None, session_id: str = None, page: int = 0, page_size: int = None):
+    """Start a quick review session (no session_id) or fetch a further page of an existing one."""
+    if page_size is not None:
+        page_size = max(1, min(page_size, 100))
     try:
-        quiz_data = generate_quick_review(course=course)
-        if not quiz_data:
-            raise HTTPException(status_code=404, detail="No topics or questions found for quick review")
+        if session_id:
+            quiz_data = get_quick_review_page(session_id, page=page, page_size=page_size)
+            if not quiz_data:
+                raise HTTPException(status_code=404, detail="Quick review session expired or not found")
+        else:
+            quiz_data = create_quick_review_session(course=course, page_size=page_size)
+            if not quiz_data:
+                raise HTTPException(status_code=404, detail="No topics or questions found for quick review")
         return quiz_data
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/study/quick-review/stream")
+def api_quick_review_stream(course: str = None):
+    return StreamingResponse(generate_quick_review_stream(course=course), media_type="application/x-ndjson")
+
 @app.get("/api/study/timeline")
 def api_study_timeline(force_refresh: bool = False):
     try:
-        from src.services.timeline import get_structured_timeline
-        timeline_data = get_structured_timeline(force_refresh=force_refresh)
-        return {"timeline": timeline_data}
+        from src.services.timeline import get_structured_timeline_snapshot, is_timeline_enrichment_pending
+        timeline_data, stale = get_structured_timeline_snapshot(force_refresh=force_refresh)
+        return {"timeline": timeline_data, "stale": stale, "enrichment_pending": is_timeline_enrichment_pending()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/ai/metrics")
+def api_ai_metrics(window_seconds: int = 3600):
+    return {"limiter": llm_limiter.stats(), "calls": get_ai_metrics(window_seconds=window_seconds)}
+
+@app.get("/api/cache/metrics")
+def api_cache_metrics():
+    from src.utils.cache import local_cache_stats
+    from src.utils.compression import compression_stats
+    return {"families": local_cache_stats(), "compression": compression_stats()}
+
 def run_background_safe(func, *args, **kwargs):
     """Executes a background task safely, sending a Telegram error alert on failure."""
     try:
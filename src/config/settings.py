@@ -21,6 +21,61 @@ class Config:
     MODEL_BRAIN = os.getenv("MODEL_BRAIN", CUSTOM_AI_MODEL)
     MODEL_WORKER = os.getenv("MODEL_WORKER", CUSTOM_AI_MODEL)
     CUSTOM_AI_VOICE_MODEL = os.getenv("CUSTOM_AI_VOICE_MODEL", "google-tts/vi")
+    AI_CONTEXT_TOKENS = int(os.getenv("AI_CONTEXT_TOKENS", "128000"))
+    AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))  # In-flight LLM calls across the process
+    AI_HTTP_MAX_CONNECTIONS = int(os.getenv("AI_HTTP_MAX_CONNECTIONS", "20"))
+    AI_HTTP_MAX_KEEPALIVE = int(os.getenv("AI_HTTP_MAX_KEEPALIVE", "10"))
+    AI_REQUEST_TIMEOUT = float(os.getenv("AI_REQUEST_TIMEOUT", "180"))
+    AI_LOOP_THREADS = int(os.getenv("AI_LOOP_THREADS", "64"))  # Blocking helpers (Notion, sync backends) used by async pipelines
+    AI_HEDGE_DELAY = float(os.getenv("AI_HEDGE_DELAY", "0"))  # Seconds before racing the fallback model; 0 disables hedging
+    AI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", "3"))
+    AI_BREAKER_P95_SECONDS = float(os.getenv("AI_BREAKER_P95_SECONDS", "120"))
+    AI_BREAKER_WINDOW = int(os.getenv("AI_BREAKER_WINDOW", "20"))  # Latency samples kept per model
+    AI_BREAKER_MIN_SAMPLES = int(os.getenv("AI_BREAKER_MIN_SAMPLES", "5"))
+    AI_BREAKER_COOLDOWN = int(os.getenv("AI_BREAKER_COOLDOWN", "60"))
+
+    # Quiz generation
+    QUIZ_CHUNK_TOKENS = int(os.getenv("QUIZ_CHUNK_TOKENS", "3000"))  # Target size of one generation chunk
+    QUIZ_MAX_CHUNKS = int(os.getenv("QUIZ_MAX_CHUNKS", "6"))
+    QUIZ_PROMPT_RESERVE_TOKENS = int(os.getenv("QUIZ_PROMPT_RESERVE_TOKENS", "8000"))  # Prompt template + output headroom
+    QUIZ_DEDUP_THRESHOLD = float(os.getenv("QUIZ_DEDUP_THRESHOLD", "0.7"))  # Shingle Jaccard above which two questions count as duplicates
+    QUIZ_LATEX_LLM_FALLBACK = os.getenv("QUIZ_LATEX_LLM_FALLBACK", "true").lower() == "true"  # Ask MODEL_WORKER about LaTeX the local normalizer cannot fix
+
+    # In-process cache tier in front of Redis
+    LOCAL_CACHE_ENABLED = os.getenv("LOCAL_CACHE_ENABLED", "true").lower() == "true"
+    LOCAL_CACHE_CHANNEL = os.getenv("LOCAL_CACHE_CHANNEL", "local_cache_invalidation")  # Redis pub/sub channel for cross-worker invalidation
+
+    # Compression of large cached values (quizzes, candidate lists, progress)
+    CACHE_COMPRESSION_ENABLED = os.getenv("CACHE_COMPRESSION_ENABLED", "true").lower() == "true"
+    CACHE_COMPRESSION_THRESHOLD = int(os.getenv("CACHE_COMPRESSION_THRESHOLD", "1024"))  # bytes; smaller values are stored as plain JSON
+
+    # Stale-while-revalidate: past these ages cached lists are served as stale and rebuilt in the background
+    CANDIDATES_SOFT_TTL = int(os.getenv("CANDIDATES_SOFT_TTL", "3600"))
+    TIMELINE_SOFT_TTL = int(os.getenv("TIMELINE_SOFT_TTL", "3600"))
+
+    # Background quiz warm-up
+    QUIZ_WARM_ENABLED = os.getenv("QUIZ_WARM_ENABLED", "true").lower() == "true"
+    QUIZ_WARM_INTERVAL = int(os.getenv("QUIZ_WARM_INTERVAL", "3600"))  # Seconds between scheduled passes; 0 disables the schedule
+    QUIZ_WARM_CONCURRENCY = int(os.getenv("QUIZ_WARM_CONCURRENCY", "1"))
+    QUIZ_WARM_MAX_TOPICS = int(os.getenv("QUIZ_WARM_MAX_TOPICS", "20"))
+    QUIZ_WARM_BUDGET_SECONDS = int(os.getenv("QUIZ_WARM_BUDGET_SECONDS", "1800"))
+    QUIZ_WARM_LAST_CONFIG = os.getenv("QUIZ_WARM_LAST_CONFIG", "true").lower() == "true"
+
+    # Offline batch generation (nightly quiz refresh)
+    AI_BATCH_BACKEND = os.getenv("AI_BATCH_BACKEND", "local").lower()  # 'openai' uses the router's /v1/batches endpoint, 'local' a background stand-in
+    AI_BATCH_MAX_SIZE = int(os.getenv("AI_BATCH_MAX_SIZE", "50"))  # Prompts per submitted batch
+    AI_BATCH_WINDOW = float(os.getenv("AI_BATCH_WINDOW", "10"))  # Seconds to gather prompts before submitting a partial batch
+    AI_BATCH_POLL_INTERVAL = float(os.getenv("AI_BATCH_POLL_INTERVAL", "30"))
+    AI_BATCH_TIMEOUT = int(os.getenv("AI_BATCH_TIMEOUT", str(24 * 3600)))
+    AI_BATCH_LOCAL_CONCURRENCY = int(os.getenv("AI_BATCH_LOCAL_CONCURRENCY", "2"))
+    AI_BATCH_PIPELINES = int(os.getenv("AI_BATCH_PIPELINES", "8"))  # Quiz pipelines the nightly refresh runs at once on its own event loop
+    QUIZ_BATCH_MAX_TOPICS = int(os.getenv("QUIZ_BATCH_MAX_TOPICS", "100"))
+
+    # Quick review
+    QUICK_REVIEW_TIME_BUDGET = float(os.getenv("QUICK_REVIEW_TIME_BUDGET", "60"))  # Seconds spent generating cache misses before returning partial results
+    QUICK_REVIEW_MAX_GENERATE = int(os.getenv("QUICK_REVIEW_MAX_GENERATE", "3"))  # Uncached topics generated inline per request; the rest go to the warmer
+    QUICK_REVIEW_CONCURRENCY = int(os.getenv("QUICK_REVIEW_CONCURRENCY", "3"))
+    QUICK_REVIEW_PAGE_SIZE = int(os.getenv("QUICK_REVIEW_PAGE_SIZE", "20"))
 
     # AI (Gemini - Legacy)
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -47,6 +102,9 @@ class Config:
 
     # Redis
     REDIS_URL = os.getenv("REDIS_URL")
+    # Cache backend: "redis", "memory", "sqlite", "none", or "auto" (Redis when REDIS_URL is set, else memory)
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "auto").lower()
+    CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", ".cache/ueh_notion_cache.sqlite3")
 
     @classmethod
     def validate(cls):
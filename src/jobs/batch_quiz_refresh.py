@@ -0,0 +1,86 @@
+import sys, os; sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+import src.utils.path_setup  # ensure project root is on sys.path
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config.settings import Config
+from src.services.ai import BatchAIService
+from src.services.quiz_warmer import warm_configs
+from src.services.study_logic import get_candidates, generate_quiz_async, rebuild_quiz_from_bank
+from src.utils.ai_batch import BatchCollector
+from src.utils.cache import get_redis
+from src.utils.logger import logger
+
+
+def _group_by_bank_field(jobs):
+    """Group (topic, config) jobs that write the same question bank field, largest config first."""
+    groups = {}
+    for topic, cfg in jobs:
+        groups.setdefault((topic["id"], cfg["difficulty"], cfg["question_type"]), []).append((topic, cfg))
+    return [sorted(group, key=lambda job: job[1]["num_questions"], reverse=True) for group in groups.values()]
+
+
+def run_batch_quiz_refresh(max_topics=None, backend=None):
+    """Regenerate quizzes for all due topics through the batch AI interface and overwrite their cache entries.
+
+    Every pipeline stage of every topic is gathered into shared batches, so the
+    nightly refresh never goes through the interactive LLM limiter. Pipelines run
+    on a private event loop (at most AI_BATCH_PIPELINES at a time) so waiting on
+    batch results never ties up the shared AI loop or its threads. Old quizzes
+    keep being served until their replacement is written.
+    """
+    logger.info("🌙 Starting nightly batch quiz refresh...")
+    candidates = (get_candidates() or [])[: max_topics or Config.QUIZ_BATCH_MAX_TOPICS]
+    jobs = [(c, cfg) for c in candidates for cfg in warm_configs(get_redis())]
+    summary = {"refreshed": [], "failed": [], "batches": 0}
+    if not jobs:
+        logger.info("No due topics to refresh")
+        return summary
+
+    collector = BatchCollector(backend=backend)
+    ai = BatchAIService(collector)
+    pipelines = max(1, Config.AI_BATCH_PIPELINES)
+
+    def label(topic, cfg):
+        return f"{topic.get('title', topic['id'])} ({cfg['num_questions']}q, {cfg['difficulty']}, {cfg['question_type']})"
+
+    async def refresh_group(group, slots):
+        # Configs sharing a bank field are regenerated once (largest first); the rest are re-assembled from that bank
+        (topic, cfg), rest = group[0], group[1:]
+        ok = False
+        async with slots:
+            try:
+                quiz = await generate_quiz_async(topic["id"], ai_service=ai, refresh_in_place=True, **cfg)
+                ok = bool(quiz and quiz.get("questions") and quiz["questions"][0].get("q") != "Lỗi tạo câu hỏi trắc nghiệm")
+            except Exception as e:
+                logger.error(f"❌ Batch refresh failed for {topic['id']}: {e}")
+        results = [(topic, cfg, ok)]
+        for other_topic, other_cfg in rest:
+            rebuilt = ok and await asyncio.to_thread(rebuild_quiz_from_bank, other_topic["id"], **other_cfg)
+            results.append((other_topic, other_cfg, bool(rebuilt)))
+        return results
+
+    async def refresh_all():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=pipelines * 4, thread_name_prefix="batch-refresh"))
+        slots = asyncio.Semaphore(pipelines)
+        return await asyncio.gather(*(refresh_group(group, slots) for group in _group_by_bank_field(jobs)))
+
+    try:
+        for results in asyncio.run(refresh_all()):
+            for topic, cfg, ok in results:
+                summary["refreshed" if ok else "failed"].append(label(topic, cfg))
+    finally:
+        collector.close()
+
+    summary["batches"] = collector.batches_submitted
+    logger.info(
+        f"🌙 Batch quiz refresh done: {len(summary['refreshed'])} refreshed, {len(summary['failed'])} failed "
+        f"in {summary['batches']} batches. Failed: {summary['failed']}"
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    run_batch_quiz_refresh()
@@ -10,6 +10,8 @@ from src.utils.logger import logger
 from src.jobs.daily_report import run_daily_report
 from src.jobs.study_assistant import run_study_assistant
 from src.jobs.update_study_status import run_update_study_status
+from src.services.quiz_warmer import warm_quiz_cache
+from src.jobs.batch_quiz_refresh import run_batch_quiz_refresh
 
 def main():
     parser = argparse.ArgumentParser(description="UEH Notion Bot CLI")
@@ -17,9 +19,10 @@ def main():
 
     # Run command
     run_parser = subparsers.add_parser("run", help="Run a specific job")
-    run_parser.add_argument("job", choices=["daily-report", "study-assistant", "mark-mastered", "mark-review"], help="Job name")
+    run_parser.add_argument("job", choices=["daily-report", "study-assistant", "mark-mastered", "mark-review", "warm-quizzes", "batch-refresh-quizzes"], help="Job name")
     run_parser.add_argument("--chat_id", default=None, help="Telegram Chat ID (from Telegram trigger)")
     run_parser.add_argument("--topic_id", default=None, help="Specific Notion Page ID to study")
+    run_parser.add_argument("--max_topics", type=int, default=None, help="Limit topics processed by quiz refresh jobs")
 
     args = parser.parse_args()
 
@@ -37,6 +40,10 @@ def main():
             run_update_study_status(topic_id=args.topic_id, status="🟢 Đã nắm vững")
         elif args.job == "mark-review":
             run_update_study_status(topic_id=args.topic_id, status="🔴 Cần xem lại")
+        elif args.job == "warm-quizzes":
+            warm_quiz_cache(max_topics=args.max_topics)
+        elif args.job == "batch-refresh-quizzes":
+            run_batch_quiz_refresh(max_topics=args.max_topics)
     else:
         parser.print_help()
 
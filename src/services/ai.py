@@ -1,22 +1,80 @@
+import asyncio
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta, timezone
-from openai import OpenAI
 from src.config.settings import Config
 from src.utils.logger import logger
+from src.utils.ai_client import get_ai_client, get_async_ai_client, llm_slot, llm_slot_async
+from src.utils.circuit_breaker import breaker
+from src.utils.ai_metrics import record_llm_call, run_in_context, current_stage
 
+from src.services.notion import NotionService
 from src.services.prompt_service import PromptService
 from src.services.telegram import TelegramService
 
+# Tools MODEL_BRAIN may call while running as an agent
+AGENT_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "fetch_notion_tasks",
+            "description": "Lấy danh sách tất cả các nhiệm vụ (tasks) hiện tại chưa hoàn thành (trạng thái 'Not started' hoặc 'In progress') từ cơ sở dữ liệu Notion của người dùng. Trả về mảng các đối tượng chứa: tên nhiệm vụ, hạn chót, trạng thái, loại nhiệm vụ, và độ ưu tiên. Thích hợp dùng khi lập kế hoạch ngày hoặc báo cáo tiến độ."
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "fetch_notion_review_notes",
+            "description": "Lấy danh sách các bài học hoặc ghi chép học tập cần ôn tập (có trạng thái 'Cần xem lại' / '🔴 Cần xem lại') từ cơ sở dữ liệu Notion. Trả về mảng các trang chứa ID và tiêu đề trang. Dùng để xác định bài học nào cần làm trắc nghiệm ôn tập."
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "fetch_notion_page_content",
+            "description": "Tải toàn bộ nội dung chi tiết của một trang Notion cụ thể (dựa vào page_id). Trả về danh sách các chuỗi văn bản (các khối nội dung) đã được định dạng cơ bản. Phải dùng tool này để lấy nội dung bài viết trước khi biên soạn câu hỏi trắc nghiệm hoặc phân tích sâu nội dung bài học.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "page_id": {
+                        "type": "string",
+                        "description": "ID của trang Notion cần đọc nội dung."
+                    }
+                },
+                "required": ["page_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "delegate_to_worker",
+            "description": "Ủy quyền/Giao việc cho mô hình phụ (MODEL_WORKER) để thực hiện các tác vụ xử lý văn bản cơ bản không đòi hỏi tư duy logic phức tạp hay đưa ra quyết định hệ thống. Các việc phù hợp: tóm tắt văn bản dài, viết kịch bản đọc giọng nói (voice script) từ bản tóm tắt, định dạng văn bản thành Markdown/HTML, dịch ngôn ngữ, trích xuất dữ liệu thô. KHÔNG giao cho Worker các việc như tự quyết định chọn bài học, tự phân tích chiến lược, hoặc tự tổng hợp kế hoạch ngày lớn.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "instruction": {
+                        "type": "string",
+                        "description": "Yêu cầu chi tiết, chỉ dẫn định dạng và đầy đủ dữ liệu/ngữ cảnh đầu vào để MODEL_WORKER thực hiện độc lập mà không cần hỏi lại."
+                    }
+                },
+                "required": ["instruction"]
+            }
+        }
+    }
+]
+
+# Runs the racing primary/fallback requests of hedged generations
+_hedge_executor = ThreadPoolExecutor(max_workers=max(4, Config.AI_MAX_CONCURRENCY * 2), thread_name_prefix="ai-hedge")
+
 class AIService:
     def __init__(self):
         self.prompt_service = PromptService()
         self.telegram = TelegramService()
 
         if Config.USE_CUSTOM_AI:
-            self.client = OpenAI(
-                base_url=Config.CUSTOM_AI_BASE_URL,
-                api_key=Config.CUSTOM_AI_API_KEY
-            )
+            self.client = get_ai_client()
         else:
             logger.error("❌ Legacy Gemini config used but google-genai is removed!")
             self.client = None
@@ -24,48 +82,85 @@ class AIService:
     def _get_vn_time(self):
         return datetime.now(timezone(timedelta(hours=7))).strftime("%Y-%m-%d %H:%M:%S")
 
-    def generate_content(self, prompt, model=Config.MODEL_WORKER):
-        if not self.client: return "AI Service Unavailable"
-
+    def _complete(self, prompt, model, is_fallback=False):
+        """Run one chat completion on model, feeding the circuit breaker and usage metrics. Raises on failure."""
+        start, started_at = time.monotonic(), time.time()
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                reasoning_effort=Config.REASONING_EFFORT,
-                stream=False
-            )
-
+            with llm_slot():
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    reasoning_effort=Config.REASONING_EFFORT,
+                    stream=False
+                )
             content = response.choices[0].message.content
             if not content:
-                raise ValueError("Empty response from AI model")
-            return content.strip()
+                raise ValueError(f"Empty response from AI model {model}")
+        except Exception:
+            breaker.record_failure(model)
+            record_llm_call(model, 0, 0, time.monotonic() - start, fallback=is_fallback, success=False)
+            raise
+        latency = time.monotonic() - start
+        breaker.record_success(model, latency, started_at=started_at)
+        usage = getattr(response, "usage", None)
+        record_llm_call(
+            model,
+            getattr(usage, "prompt_tokens", 0),
+            getattr(usage, "completion_tokens", 0),
+            latency,
+            fallback=is_fallback,
+        )
+        return content.strip()
 
-        except Exception as e:
-            logger.warning(f"⚠️ Generation failed for model {model}: {e}. Retrying with CUSTOM_AI_MODEL ({Config.CUSTOM_AI_MODEL})...")
-            if model != Config.CUSTOM_AI_MODEL:
+    def _complete_hedged(self, prompt, model, fallback):
+        """Start model, and if it has not answered within AI_HEDGE_DELAY also start fallback; first good answer wins."""
+        primary = run_in_context(_hedge_executor, self._complete, prompt, model)
+        done, _ = wait([primary], timeout=Config.AI_HEDGE_DELAY)
+        if done:
+            try:
+                return primary.result()
+            except Exception as e:
+                logger.warning(f"⚠️ Generation failed for model {model}: {e}. Retrying with CUSTOM_AI_MODEL ({fallback})...")
+                return self._complete(prompt, fallback, is_fallback=True)
+
+        logger.info(f"⏱️ {model} has not answered after {Config.AI_HEDGE_DELAY}s, hedging with {fallback}")
+        pending = {primary, run_in_context(_hedge_executor, self._complete, prompt, fallback, is_fallback=True)}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
                 try:
-                    response = self.client.chat.completions.create(
-                        model=Config.CUSTOM_AI_MODEL,
-                        messages=[
-                            {"role": "user", "content": prompt}
-                        ],
-                        reasoning_effort=Config.REASONING_EFFORT,
-                        stream=False
-                    )
-                    content = response.choices[0].message.content
-                    if not content:
-                        raise ValueError("Empty response from fallback model")
-                    return content.strip()
-                except Exception as fe:
-                    logger.error(f"❌ Fallback generation also failed: {fe}")
-                    self.telegram.send_message(f"❌ Lỗi khi gọi AI Router: {str(fe)}", disable_notification=True)
-                    return f"Error: {str(fe)}"
-            else:
-                logger.error(f"❌ AI Generation Error: {e}")
-                self.telegram.send_message(f"❌ Lỗi khi gọi AI Router: {str(e)}", disable_notification=True)
-                return f"Error: {str(e)}"
+                    # The losing request keeps running in the background; its latency still feeds the breaker
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+        raise last_error
+
+    def generate_content(self, prompt, model=Config.MODEL_WORKER):
+        if not self.client: return "AI Service Unavailable"
+
+        fallback = Config.CUSTOM_AI_MODEL if model != Config.CUSTOM_AI_MODEL else None
+        rerouted = False
+        if fallback and not breaker.allow(model):
+            logger.warning(f"🔌 Circuit open for {model}, routing straight to CUSTOM_AI_MODEL ({fallback})")
+            model, fallback, rerouted = fallback, None, True
+
+        try:
+            if fallback and Config.AI_HEDGE_DELAY > 0:
+                return self._complete_hedged(prompt, model, fallback)
+            try:
+                return self._complete(prompt, model, is_fallback=rerouted)
+            except Exception as e:
+                if not fallback:
+                    raise
+                logger.warning(f"⚠️ Generation failed for model {model}: {e}. Retrying with CUSTOM_AI_MODEL ({fallback})...")
+                return self._complete(prompt, fallback, is_fallback=True)
+        except Exception as e:
+            logger.error(f"❌ AI Generation Error: {e}")
+            self.telegram.send_message(f"❌ Lỗi khi gọi AI Router: {str(e)}", disable_notification=True)
+            return f"Error: {str(e)}"
 
     def _execute_tool(self, name, arguments):
         logger.info(f"[Tool] Execution: {name} with args {arguments}")
@@ -112,6 +207,53 @@ class AIService:
             logger.error(f"[Error] executing tool {name}: {e}")
             return f"Error executing tool: {str(e)}"
 
+    def _run_tool_calls(self, tool_calls, tool_cache):
+        """Execute one turn's tool calls concurrently, reusing results already computed in this run."""
+        parsed = []
+        for tool_call in tool_calls:
+            tool_name = tool_call.function.name
+            try:
+                tool_args = json.loads(tool_call.function.arguments or "{}")
+            except Exception as e:
+                logger.error(f"Failed to parse tool arguments: {e}")
+                tool_args = {}
+            parsed.append((tool_call, tool_name, (tool_name, json.dumps(tool_args, sort_keys=True)), tool_args))
+
+        def timed_execute(name, args):
+            start = time.monotonic()
+            result = self._execute_tool(name, args)
+            logger.info(f"[Tool] {name} finished in {time.monotonic() - start:.2f}s")
+            return result
+
+        # Identical calls in the same turn are executed once
+        pending = {}
+        for _, tool_name, key, tool_args in parsed:
+            if key in tool_cache:
+                logger.info(f"[Tool] Cache hit: {tool_name} with args {tool_args}")
+            elif key not in pending:
+                pending[key] = (tool_name, tool_args)
+
+        fresh = {}
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                futures = {key: run_in_context(executor, timed_execute, name, args) for key, (name, args) in pending.items()}
+                for key, future in futures.items():
+                    fresh[key] = future.result()
+                    # Errors are not memoized so the model can retry the call later in the run
+                    if not str(fresh[key]).startswith("Error"):
+                        tool_cache[key] = fresh[key]
+
+        results = []
+        for tool_call, tool_name, key, _ in parsed:
+            content = fresh[key] if key in fresh else tool_cache[key]
+            results.append({
+                "role": "tool",
+                "tool_call_id": tool_call.id,
+                "name": tool_name,
+                "content": content
+            })
+        return results
+
     def run_agent(self, system_prompt, user_prompt, model=Config.MODEL_BRAIN):
         """Runs MODEL_BRAIN as an agent with access to tools."""
         if not self.client: return "AI Service Unavailable"
@@ -121,70 +263,30 @@ class AIService:
             {"role": "user", "content": user_prompt}
         ]
 
-        tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "fetch_notion_tasks",
-                    "description": "Lấy danh sách tất cả các nhiệm vụ (tasks) hiện tại chưa hoàn thành (trạng thái 'Not started' hoặc 'In progress') từ cơ sở dữ liệu Notion của người dùng. Trả về mảng các đối tượng chứa: tên nhiệm vụ, hạn chót, trạng thái, loại nhiệm vụ, và độ ưu tiên. Thích hợp dùng khi lập kế hoạch ngày hoặc báo cáo tiến độ."
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "fetch_notion_review_notes",
-                    "description": "Lấy danh sách các bài học hoặc ghi chép học tập cần ôn tập (có trạng thái 'Cần xem lại' / '🔴 Cần xem lại') từ cơ sở dữ liệu Notion. Trả về mảng các trang chứa ID và tiêu đề trang. Dùng để xác định bài học nào cần làm trắc nghiệm ôn tập."
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "fetch_notion_page_content",
-                    "description": "Tải toàn bộ nội dung chi tiết của một trang Notion cụ thể (dựa vào page_id). Trả về danh sách các chuỗi văn bản (các khối nội dung) đã được định dạng cơ bản. Phải dùng tool này để lấy nội dung bài viết trước khi biên soạn câu hỏi trắc nghiệm hoặc phân tích sâu nội dung bài học.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "page_id": {
-                                "type": "string",
-                                "description": "ID của trang Notion cần đọc nội dung."
-                            }
-                        },
-                        "required": ["page_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "delegate_to_worker",
-                    "description": "Ủy quyền/Giao việc cho mô hình phụ (MODEL_WORKER) để thực hiện các tác vụ xử lý văn bản cơ bản không đòi hỏi tư duy logic phức tạp hay đưa ra quyết định hệ thống. Các việc phù hợp: tóm tắt văn bản dài, viết kịch bản đọc giọng nói (voice script) từ bản tóm tắt, định dạng văn bản thành Markdown/HTML, dịch ngôn ngữ, trích xuất dữ liệu thô. KHÔNG giao cho Worker các việc như tự quyết định chọn bài học, tự phân tích chiến lược, hoặc tự tổng hợp kế hoạch ngày lớn.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "instruction": {
-                                "type": "string",
-                                "description": "Yêu cầu chi tiết, chỉ dẫn định dạng và đầy đủ dữ liệu/ngữ cảnh đầu vào để MODEL_WORKER thực hiện độc lập mà không cần hỏi lại."
-                            }
-                        },
-                        "required": ["instruction"]
-                    }
-                }
-            }
-        ]
-
         max_steps = 10
         step = 0
+        tool_cache = {}  # (name, args) -> result, lives for this agent run only
         try:
             while step < max_steps:
                 step += 1
                 logger.info(f"[Agent] Loop Step {step} calling model...")
-                response = self.client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    tools=tools,
-                    tool_choice="auto",
-                    reasoning_effort=Config.REASONING_EFFORT,
-                    stream=False
+                call_start = time.monotonic()
+                with llm_slot():
+                    response = self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        tools=AGENT_TOOLS,
+                        tool_choice="auto",
+                        reasoning_effort=Config.REASONING_EFFORT,
+                        stream=False
+                    )
+                usage = getattr(response, "usage", None)
+                record_llm_call(
+                    model,
+                    getattr(usage, "prompt_tokens", 0),
+                    getattr(usage, "completion_tokens", 0),
+                    time.monotonic() - call_start,
+                    stage=current_stage() if current_stage() != "other" else "agent",
                 )
 
                 choice = response.choices[0]
@@ -192,21 +294,7 @@ class AIService:
                 messages.append(message)
 
                 if message.tool_calls:
-                    for tool_call in message.tool_calls:
-                        tool_name = tool_call.function.name
-                        try:
-                            tool_args = json.loads(tool_call.function.arguments)
-                        except Exception as e:
-                            logger.error(f"Failed to parse tool arguments: {e}")
-                            tool_args = {}
-
-                        tool_result = self._execute_tool(tool_name, tool_args)
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "name": tool_name,
-                            "content": tool_result
-                        })
+                    messages.extend(self._run_tool_calls(message.tool_calls, tool_cache))
                 else:
                     content = message.content
                     if not content:
@@ -232,7 +320,10 @@ class AIService:
         """Generates the daily report analysis using prompts from Notion."""
         if not tasks:
             return "Chào buổi sáng! 🌞 Hôm nay bạn không có task nào phải làm. Hãy tận hưởng ngày nghỉ nhé! 🚀"
+        agent_system_prompt, user_prompt = self._analyze_tasks_prompts(tasks, db_options)
+        return self.run_agent(system_prompt=agent_system_prompt, user_prompt=user_prompt, model=Config.MODEL_BRAIN)
 
+    def _analyze_tasks_prompts(self, tasks, db_options):
         prompt_data = self.prompt_service.get_prompt("UEH-Notion", "task_planner")
 
         if not prompt_data:
@@ -267,8 +358,7 @@ class AIService:
             "- Bạn có quyền điều phối MODEL_WORKER thông qua công cụ `delegate_to_worker` để xử lý các việc không cần suy nghĩ sâu như: tóm tắt văn bản thô, trích xuất thông tin đơn giản, định dạng lại dữ liệu thành Markdown/HTML, hoặc xử lý chuyển đổi chữ viết.\n"
             "Hãy giữ vai trò điều phối tối cao, tập trung tư duy chiến lược và giao phó triệt để việc cơ khí cho MODEL_WORKER."
         )
-
-        return self.run_agent(system_prompt=agent_system_prompt, user_prompt=user_prompt, model=Config.MODEL_BRAIN)
+        return agent_system_prompt, user_prompt
 
     def summarize_timeline(self, timeline_data, is_raw_text=False):
         """Analyze timeline / raw text => structured deadline overview.
@@ -279,7 +369,9 @@ class AIService:
         """
         if not timeline_data:
             return "📭 Không có dữ liệu timeline để tổng hợp."
+        return self.generate_content(self._timeline_summary_prompt(timeline_data, is_raw_text), model=Config.MODEL_BRAIN)
 
+    def _timeline_summary_prompt(self, timeline_data, is_raw_text):
         vn_time = self._get_vn_time()
 
         prompt_data = self.prompt_service.get_prompt("UEH-Notion", "timeline_summary")
@@ -349,11 +441,13 @@ class AIService:
         user_prompt = user_template.replace("{timeline_str}", timeline_str)
         user_prompt = user_prompt.replace("{time}", vn_time)
 
-        final_prompt = f"{system_prompt}\n\n{user_prompt}"
-        return self.generate_content(final_prompt, model=Config.MODEL_BRAIN)
+        return f"{system_prompt}\n\n{user_prompt}"
 
     def generate_timeline_json(self, raw_data):
         """Analyze raw checklist data and return structured JSON timeline list."""
+        return self.generate_content(self._timeline_json_prompt(raw_data), model=Config.MODEL_WORKER)
+
+    def _timeline_json_prompt(self, raw_data):
         vn_time = self._get_vn_time()
         system_prompt = (
             "Bạn là trợ lý phân tích dữ liệu deadline học tập tại UEH.\n"
@@ -381,15 +475,22 @@ class AIService:
             "]"
         )
         user_prompt = f"Mốc thời gian hiện tại: {vn_time}\n\nDữ liệu thô:\n{raw_data}\n\nHãy trả về mảng JSON timeline:"
-        return self.generate_content(f"{system_prompt}\n\n{user_prompt}", model=Config.MODEL_WORKER)
+        return f"{system_prompt}\n\n{user_prompt}"
 
 
     def generate_voice_script(self, original_text):
         """Rewrites text for voice generation using Notion prompt."""
-        prompt_data = self.prompt_service.get_prompt("UEH-Notion", "voice_script")
+        final_prompt = self._voice_script_prompt(original_text)
+        if not final_prompt:
+            return "Error: Could not fetch voice script prompt."
 
+        # Voice script generation is a simple text rewriting job - run it directly on MODEL_WORKER
+        return self.generate_content(final_prompt, model=Config.MODEL_WORKER)
+
+    def _voice_script_prompt(self, original_text):
+        prompt_data = self.prompt_service.get_prompt("UEH-Notion", "voice_script")
         if not prompt_data:
-            return "Error: Could not fetch voice script prompt."
+            return None
 
         system_prompt = prompt_data["system_prompt"]
         user_template = prompt_data["user_template"]
@@ -398,14 +499,14 @@ class AIService:
         final_prompt = final_prompt.replace("{time}", self._get_vn_time())
         final_prompt = final_prompt.replace("{user_label}", "Khôi")
         final_prompt = final_prompt.replace("{original_text}", original_text)
+        return final_prompt
 
-        # Voice script generation is a simple text rewriting job - run it directly on MODEL_WORKER
-        return self.generate_content(final_prompt, model=Config.MODEL_WORKER)
-
-    def generate_quiz(self, content, num_questions=15, difficulty='medium', question_type='balanced'):
+    def generate_quiz(self, content, num_questions=15, difficulty='medium', question_type='balanced', exclude_questions=None):
         """Generates quiz questions from review notes using Notion prompt with custom config."""
         if not content: return "Nội dung trống."
+        return self.generate_content(self._quiz_prompt(content, num_questions, difficulty, question_type, exclude_questions), model=Config.MODEL_BRAIN)
 
+    def _quiz_prompt(self, content, num_questions, difficulty, question_type, exclude_questions):
         prompt_data = self.prompt_service.get_prompt("UEH-Notion", "study_assistant")
 
         difficulty_text = {
@@ -435,16 +536,24 @@ class AIService:
         - TỶ LỆ DẠNG CÂU HỎI: {type_text}.
         """
 
-        user_prompt = user_template.replace("{content}", content)
-        final_prompt = f"{system_prompt}\n\n{additional_instructions}\n\n{user_prompt}"
+        if exclude_questions:
+            # Questions already in the topic's bank: ask for new ones instead of repeats
+            existing = "\n".join(f"- {q[:200]}" for q in exclude_questions if q)
+            additional_instructions += f"""
+        - KHÔNG lặp lại hoặc diễn đạt lại các câu hỏi đã có dưới đây, hãy khai thác khía cạnh khác của bài học:
+{existing}
+        """
 
-        return self.generate_content(final_prompt, model=Config.MODEL_BRAIN)
+        user_prompt = user_template.replace("{content}", content)
+        return f"{system_prompt}\n\n{additional_instructions}\n\n{user_prompt}"
 
     def enhance_quiz(self, raw_quiz, content, num_questions=15, difficulty='medium', question_type='balanced'):
         """Enhances raw quiz questions to be higher quality, more engaging, and rigorous for college-level exams using MODEL_BRAIN."""
         if not raw_quiz or not content:
             return raw_quiz
+        return self.generate_content(self._enhance_prompt(raw_quiz, content, num_questions, difficulty, question_type), model=Config.MODEL_BRAIN)
 
+    def _enhance_prompt(self, raw_quiz, content, num_questions, difficulty, question_type):
         difficulty_text = {
             'easy': 'Mức độ cơ bản / nhận biết / thông hiểu (nắm chắc khái niệm nền tảng)',
             'medium': 'Mức độ vận dụng / chuẩn đề thi đại học UEH (kết hợp lý thuyết và suy luận)',
@@ -475,13 +584,14 @@ class AIService:
             f"Hãy nâng cấp toàn bộ câu hỏi trên theo yêu cầu cấu trúc ({num_questions} câu, độ khó: {difficulty}, dạng: {question_type}) và trả về danh sách câu hỏi dưới dạng JSON:"
         )
 
-        final_prompt = f"{system_prompt}\n\n{user_prompt}"
-        return self.generate_content(final_prompt, model=Config.MODEL_BRAIN)
+        return f"{system_prompt}\n\n{user_prompt}"
 
     def review_quiz(self, raw_quiz, content):
         """Reviews and self-corrects the generated quiz using Notion prompt or a robust fallback."""
         if not raw_quiz or not content: return raw_quiz
+        return self.generate_content(*self._review_quiz_prompt(raw_quiz, content))
 
+    def _review_quiz_prompt(self, raw_quiz, content):
         prompt_data = self.prompt_service.get_prompt("UEH-Notion", "study_assistant_review")
 
         if not prompt_data:
@@ -531,14 +641,15 @@ Hãy đánh giá, chỉnh sửa, bổ sung và xuất ra danh sách 15 câu hỏ
         final_prompt = f"{user_template}\n\n{system_prompt}"
         final_prompt = final_prompt.replace("{content}", content)
         final_prompt = final_prompt.replace("{raw_quiz}", raw_quiz)
-
-        return self.generate_content(final_prompt, model=model)
+        return final_prompt, model
 
     def review_latex_quiz(self, quiz_json_str):
         """Dedicated final AI step to review and perfect ONLY KaTeX/LaTeX math formatting in quiz JSON."""
         if not quiz_json_str:
             return quiz_json_str
+        return self.generate_content(self._latex_review_prompt(quiz_json_str), model=Config.MODEL_WORKER)
 
+    def _latex_review_prompt(self, quiz_json_str):
         system_prompt = r"""Bạn là một Chuyên gia Kiểm định Định dạng KaTeX và LaTeX cho hệ thống trắc nghiệm.
 Nhiệm vụ DUY NHẤT của bạn là nhận vào danh sách câu hỏi trắc nghiệm dưới dạng JSON và CHUẨN HÓA TOÀN BỘ ĐỊNH DẠNG KaTeX / LaTeX trong tất cả các trường văn bản (`q`, `options`, `explanation`).
 
@@ -567,4 +678,274 @@ CÁC QUY TẮC CHUẨN HÓA LATEX / KATEX BẮT BUỘC:
 
 Hãy kiểm tra toàn bộ định dạng KaTeX/LaTeX, kiểm soát chặt chẽ ký tự xuống dòng (\n) và xuất ra mảng JSON duy nhất đã được chuẩn hóa hoàn toàn."""
 
-        return self.generate_content(f"{user_prompt}\n\n{system_prompt}", model=Config.MODEL_WORKER)
+        return f"{user_prompt}\n\n{system_prompt}"
+
+
+
+class AsyncAIService(AIService):
+    """Coroutine counterpart of AIService on the shared AsyncOpenAI client.
+
+    Prompts are built by the AIService helpers; generation, fallback, hedging
+    and circuit-breaker semantics match the sync service. The LLM methods below
+    are coroutines and must be awaited; blocking helpers (Notion tools,
+    Telegram alerts) are pushed to worker threads.
+    """
+
+    def __init__(self):
+        self.prompt_service = PromptService()
+        self.telegram = TelegramService()
+        self.client = None  # resolved per event loop by _client()
+
+    def _client(self):
+        return self.client or get_async_ai_client()
+
+    async def _complete(self, prompt, model, is_fallback=False):
+        start, started_at = time.monotonic(), time.time()
+        try:
+            async with llm_slot_async():
+                response = await self._client().chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    reasoning_effort=Config.REASONING_EFFORT,
+                    stream=False
+                )
+            content = response.choices[0].message.content
+            if not content:
+                raise ValueError(f"Empty response from AI model {model}")
+        except Exception:
+            # The breaker keeps its state in Redis; keep those round-trips off the shared event loop
+            await asyncio.to_thread(breaker.record_failure, model)
+            record_llm_call(model, 0, 0, time.monotonic() - start, fallback=is_fallback, success=False)
+            raise
+        latency = time.monotonic() - start
+        await asyncio.to_thread(breaker.record_success, model, latency, started_at=started_at)
+        usage = getattr(response, "usage", None)
+        record_llm_call(
+            model,
+            getattr(usage, "prompt_tokens", 0),
+            getattr(usage, "completion_tokens", 0),
+            latency,
+            fallback=is_fallback,
+        )
+        return content.strip()
+
+    async def _complete_hedged(self, prompt, model, fallback):
+        primary = asyncio.ensure_future(self._complete(prompt, model))
+        done, _ = await asyncio.wait({primary}, timeout=Config.AI_HEDGE_DELAY)
+        if done:
+            try:
+                return primary.result()
+            except Exception as e:
+                logger.warning(f"⚠️ Generation failed for model {model}: {e}. Retrying with CUSTOM_AI_MODEL ({fallback})...")
+                return await self._complete(prompt, fallback, is_fallback=True)
+
+        logger.info(f"⏱️ {model} has not answered after {Config.AI_HEDGE_DELAY}s, hedging with {fallback}")
+        pending = {primary, asyncio.ensure_future(self._complete(prompt, fallback, is_fallback=True))}
+        last_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    # The losing request keeps running in the background; its latency still feeds the breaker
+                    return task.result()
+                except Exception as e:
+                    last_error = e
+        raise last_error
+
+    async def generate_content(self, prompt, model=Config.MODEL_WORKER):
+        if not Config.USE_CUSTOM_AI and not self.client: return "AI Service Unavailable"
+
+        fallback = Config.CUSTOM_AI_MODEL if model != Config.CUSTOM_AI_MODEL else None
+        rerouted = False
+        if fallback and not await asyncio.to_thread(breaker.allow, model):
+            logger.warning(f"🔌 Circuit open for {model}, routing straight to CUSTOM_AI_MODEL ({fallback})")
+            model, fallback, rerouted = fallback, None, True
+
+        try:
+            if fallback and Config.AI_HEDGE_DELAY > 0:
+                return await self._complete_hedged(prompt, model, fallback)
+            try:
+                return await self._complete(prompt, model, is_fallback=rerouted)
+            except Exception as e:
+                if not fallback:
+                    raise
+                logger.warning(f"⚠️ Generation failed for model {model}: {e}. Retrying with CUSTOM_AI_MODEL ({fallback})...")
+                return await self._complete(prompt, fallback, is_fallback=True)
+        except Exception as e:
+            logger.error(f"❌ AI Generation Error: {e}")
+            await asyncio.to_thread(self.telegram.send_message, f"❌ Lỗi khi gọi AI Router: {str(e)}", disable_notification=True)
+            return f"Error: {str(e)}"
+
+    async def generate_quiz(self, content, num_questions=15, difficulty='medium', question_type='balanced', exclude_questions=None):
+        if not content: return "Nội dung trống."
+        prompt = await asyncio.to_thread(self._quiz_prompt, content, num_questions, difficulty, question_type, exclude_questions)
+        return await self.generate_content(prompt, model=Config.MODEL_BRAIN)
+
+    async def enhance_quiz(self, raw_quiz, content, num_questions=15, difficulty='medium', question_type='balanced'):
+        if not raw_quiz or not content:
+            return raw_quiz
+        return await self.generate_content(self._enhance_prompt(raw_quiz, content, num_questions, difficulty, question_type), model=Config.MODEL_BRAIN)
+
+    async def review_latex_quiz(self, quiz_json_str):
+        if not quiz_json_str:
+            return quiz_json_str
+        return await self.generate_content(self._latex_review_prompt(quiz_json_str), model=Config.MODEL_WORKER)
+
+    async def review_quiz(self, raw_quiz, content):
+        if not raw_quiz or not content: return raw_quiz
+        prompt, model = await asyncio.to_thread(self._review_quiz_prompt, raw_quiz, content)
+        return await self.generate_content(prompt, model=model)
+
+    async def analyze_tasks(self, tasks, db_options=None):
+        if not tasks:
+            return "Chào buổi sáng! 🌞 Hôm nay bạn không có task nào phải làm. Hãy tận hưởng ngày nghỉ nhé! 🚀"
+        agent_system_prompt, user_prompt = await asyncio.to_thread(self._analyze_tasks_prompts, tasks, db_options)
+        return await self.run_agent(system_prompt=agent_system_prompt, user_prompt=user_prompt, model=Config.MODEL_BRAIN)
+
+    async def generate_voice_script(self, original_text):
+        final_prompt = await asyncio.to_thread(self._voice_script_prompt, original_text)
+        if not final_prompt:
+            return "Error: Could not fetch voice script prompt."
+        return await self.generate_content(final_prompt, model=Config.MODEL_WORKER)
+
+    async def summarize_timeline(self, timeline_data, is_raw_text=False):
+        if not timeline_data:
+            return "📭 Không có dữ liệu timeline để tổng hợp."
+        prompt = await asyncio.to_thread(self._timeline_summary_prompt, timeline_data, is_raw_text)
+        return await self.generate_content(prompt, model=Config.MODEL_BRAIN)
+
+    async def generate_timeline_json(self, raw_data):
+        return await self.generate_content(self._timeline_json_prompt(raw_data), model=Config.MODEL_WORKER)
+
+    async def _execute_tool_async(self, name, arguments):
+        if name == "delegate_to_worker":
+            instruction = arguments.get("instruction")
+            if not instruction:
+                return "Error: instruction is required"
+            return await self.generate_content(instruction, model=Config.MODEL_WORKER)
+        # Notion tools are blocking HTTP calls
+        return await asyncio.to_thread(AIService._execute_tool, self, name, arguments)
+
+    async def _run_tool_calls(self, tool_calls, tool_cache):
+        """Execute one turn's tool calls concurrently, reusing results already computed in this run."""
+        parsed = []
+        for tool_call in tool_calls:
+            tool_name = tool_call.function.name
+            try:
+                tool_args = json.loads(tool_call.function.arguments or "{}")
+            except Exception as e:
+                logger.error(f"Failed to parse tool arguments: {e}")
+                tool_args = {}
+            parsed.append((tool_call, tool_name, (tool_name, json.dumps(tool_args, sort_keys=True)), tool_args))
+
+        async def timed_execute(name, args):
+            start = time.monotonic()
+            result = await self._execute_tool_async(name, args)
+            logger.info(f"[Tool] {name} finished in {time.monotonic() - start:.2f}s")
+            return result
+
+        # Identical calls in the same turn are executed once
+        pending = {}
+        for _, tool_name, key, tool_args in parsed:
+            if key in tool_cache:
+                logger.info(f"[Tool] Cache hit: {tool_name} with args {tool_args}")
+            elif key not in pending:
+                pending[key] = (tool_name, tool_args)
+
+        fresh = dict(zip(pending, await asyncio.gather(*(timed_execute(name, args) for name, args in pending.values()))))
+        for key, result in fresh.items():
+            # Errors are not memoized so the model can retry the call later in the run
+            if not str(result).startswith("Error"):
+                tool_cache[key] = result
+
+        return [{
+            "role": "tool",
+            "tool_call_id": tool_call.id,
+            "name": tool_name,
+            "content": fresh[key] if key in fresh else tool_cache[key]
+        } for tool_call, tool_name, key, _ in parsed]
+
+    async def run_agent(self, system_prompt, user_prompt, model=Config.MODEL_BRAIN):
+        if not Config.USE_CUSTOM_AI and not self.client: return "AI Service Unavailable"
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        max_steps = 10
+        tool_cache = {}  # (name, args) -> result, lives for this agent run only
+        try:
+            for step in range(1, max_steps + 1):
+                logger.info(f"[Agent] Loop Step {step} calling model...")
+                call_start = time.monotonic()
+                async with llm_slot_async():
+                    response = await self._client().chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        tools=AGENT_TOOLS,
+                        tool_choice="auto",
+                        reasoning_effort=Config.REASONING_EFFORT,
+                        stream=False
+                    )
+                usage = getattr(response, "usage", None)
+                record_llm_call(
+                    model,
+                    getattr(usage, "prompt_tokens", 0),
+                    getattr(usage, "completion_tokens", 0),
+                    time.monotonic() - call_start,
+                    stage=current_stage() if current_stage() != "other" else "agent",
+                )
+
+                message = response.choices[0].message
+                messages.append(message)
+                if message.tool_calls:
+                    messages.extend(await self._run_tool_calls(message.tool_calls, tool_cache))
+                else:
+                    if not message.content:
+                        raise ValueError("Empty response from AI Agent")
+                    return message.content.strip()
+
+            logger.error("[Error] Agent exceeded max tool call steps.")
+            return "Error: Agent loop exceeded maximum steps."
+
+        except Exception as e:
+            logger.error(f"[Error] Agent Execution Error: {e}")
+            logger.warning(f"⚠️ Falling back to simple content generation using CUSTOM_AI_MODEL ({Config.CUSTOM_AI_MODEL})...")
+            return await self.generate_content(f"{system_prompt}\n\n{user_prompt}", model=Config.CUSTOM_AI_MODEL)
+
+class BatchAIService(AIService):
+    """AIService whose completions go through a BatchCollector instead of the interactive router path.
+
+    Used by offline jobs: calls block until their batch finishes, hold no
+    interactive LLM slot and do not feed the circuit breaker.
+    """
+
+    def __init__(self, collector):
+        super().__init__()
+        self.collector = collector
+
+    def _complete_batched(self, prompt, model, is_fallback=False):
+        result = self.collector.submit(prompt, model).result()
+        usage = result.get("usage") or {}
+        content = result.get("content")
+        ok = bool(content) and not result.get("error")
+        record_llm_call(model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), result.get("latency", 0.0), fallback=is_fallback, success=ok)
+        if not ok:
+            raise RuntimeError(result.get("error") or f"Empty response from AI model {model}")
+        return content.strip()
+
+    def generate_content(self, prompt, model=Config.MODEL_WORKER):
+        fallback = Config.CUSTOM_AI_MODEL if model != Config.CUSTOM_AI_MODEL else None
+        try:
+            try:
+                return self._complete_batched(prompt, model)
+            except Exception as e:
+                if not fallback:
+                    raise
+                logger.warning(f"⚠️ Batch generation failed for model {model}: {e}. Resubmitting with CUSTOM_AI_MODEL ({fallback})...")
+                return self._complete_batched(prompt, fallback, is_fallback=True)
+        except Exception as e:
+            logger.error(f"❌ Batch AI Generation Error: {e}")
+            return f"Error: {str(e)}"
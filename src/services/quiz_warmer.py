@@ -0,0 +1,251 @@
+"""Background pre-generation of quizzes for due review topics so interactive opens hit the cache."""
+import json
+import threading
+import time
+import uuid
+
+from src.config.settings import Config
+from src.utils.logger import logger
+from src.utils.ai_client import llm_limiter
+from src.utils.cache import get_redis, cache_generations, release_lock, versioned_key
+from src.utils.compression import loads_cached
+
+DEFAULT_QUIZ_CONFIG = {"num_questions": 15, "difficulty": "medium", "question_type": "balanced"}
+LAST_CONFIG_KEY = "quiz_last_config"
+WARMER_LOCK_KEY = "quiz_warmer_lock"
+LLM_LOAD_KEY = "llm_load"
+LLM_LOAD_REPORT_INTERVAL = 2
+LLM_LOAD_STALE_AFTER = 10
+
+_running = threading.Lock()  # one warm-up pass per process at a time
+_scheduler_started = False
+_load_reporter_started = False
+_process_id = uuid.uuid4().hex
+
+
+def save_last_quiz_config(num_questions: int, difficulty: str, question_type: str):
+    """Remember the configuration the user last opened so the warmer can prepare it too."""
+    r = get_redis()
+    if not r:
+        return
+    try:
+        r.set(LAST_CONFIG_KEY, json.dumps({
+            "num_questions": num_questions,
+            "difficulty": difficulty,
+            "question_type": question_type,
+        }))
+    except Exception as e:
+        logger.warning(f"Failed to save last quiz config: {e}")
+
+
+def warm_configs(r) -> list[dict]:
+    """Quiz configurations to prepare for each due topic: the default plus the last one a user opened."""
+    configs = [DEFAULT_QUIZ_CONFIG]
+    if Config.QUIZ_WARM_LAST_CONFIG and r:
+        try:
+            last = r.get(LAST_CONFIG_KEY)
+            if last:
+                last = json.loads(last)
+                if last != DEFAULT_QUIZ_CONFIG:
+                    configs.append(last)
+        except Exception as e:
+            logger.warning(f"Failed to read last quiz config: {e}")
+    return configs
+
+
+def publish_llm_load(r):
+    """Report this process's limiter load under its own field of the shared LLM_LOAD_KEY hash."""
+    stats = llm_limiter.stats()
+    pipe = r.pipeline()
+    pipe.hset(LLM_LOAD_KEY, _process_id, json.dumps({
+        "in_flight": stats["in_flight"],
+        "queued": stats["queued"],
+        "max_in_flight": stats["max_in_flight"],
+        "ts": time.time(),
+    }))
+    pipe.expire(LLM_LOAD_KEY, LLM_LOAD_STALE_AFTER)
+    pipe.execute()
+
+
+def shared_llm_load(r) -> dict:
+    """Sum LLM limiter load across every worker that reported within LLM_LOAD_STALE_AFTER seconds.
+
+    This process contributes its live stats; stale fields from dead workers are dropped.
+    """
+    stats = llm_limiter.stats()
+    load = {key: stats[key] for key in ("in_flight", "queued", "max_in_flight")}
+    if not r:
+        return load
+    try:
+        reports = r.hgetall(LLM_LOAD_KEY) or {}
+        stale = []
+        for worker, raw in reports.items():
+            if worker == _process_id:
+                continue
+            report = json.loads(raw)
+            if time.time() - report.get("ts", 0) > LLM_LOAD_STALE_AFTER:
+                stale.append(worker)
+                continue
+            for key in load:
+                load[key] += report.get(key, 0)
+        if stale:
+            r.hdel(LLM_LOAD_KEY, *stale)
+    except Exception as e:
+        logger.warning(f"Failed to read shared LLM load: {e}")
+    return load
+
+
+def _wait_for_idle_ai(deadline, r=None):
+    """Yield to interactive traffic: hold off while the LLM limiters of all workers are busy."""
+    while time.monotonic() < deadline:
+        load = shared_llm_load(r)
+        if load["queued"] == 0 and load["in_flight"] < max(1, load["max_in_flight"] // 2):
+            return True
+        time.sleep(2)
+    return False
+
+
+def warm_quiz_cache(candidates=None, max_topics=None) -> dict:
+    """Pre-generate missing quizzes for due candidates within the warm-up concurrency and time budget.
+
+    Returns:
+        summary dict with warmed / skipped / failed topic lists.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from src.services.study_logic import get_candidates, generate_quiz
+
+    summary = {"warmed": [], "cached": 0, "failed": [], "skipped": 0}
+    if not _running.acquire(blocking=False):
+        logger.info("Quiz warm-up already running in this process, skipping")
+        return summary
+
+    r = get_redis()
+    lock_token = str(uuid.uuid4())
+    lock_acquired = False
+    try:
+        if r:
+            lock_acquired = r.set(WARMER_LOCK_KEY, lock_token, nx=True, ex=Config.QUIZ_WARM_BUDGET_SECONDS)
+            if not lock_acquired:
+                logger.info("Quiz warm-up already running on another worker, skipping")
+                return summary
+
+        if candidates is None:
+            candidates = get_candidates()
+        candidates = (candidates or [])[: max_topics or Config.QUIZ_WARM_MAX_TOPICS]
+
+        jobs = [(c, cfg) for c in candidates for cfg in warm_configs(r)]
+        if r and jobs:
+            # Two round trips (quiz generations, then EXISTS + bank) to find topic/config pairs already cached, banked or being generated
+            generations = dict(zip(
+                [c["id"] for c in candidates],
+                cache_generations(r, [f"quiz_{c['id']}" for c in candidates]),
+            ))
+            pipe = r.pipeline()
+            for c, cfg in jobs:
+                suffix = f"{c['id']}_{cfg['num_questions']}_{cfg['difficulty']}_{cfg['question_type']}"
+                keys = [versioned_key(f"quiz_{suffix}", generations[c["id"]]), f"quiz_lock_{suffix}"]
+                if cfg == DEFAULT_QUIZ_CONFIG:
+                    # Interactive opens of the default config still fall back to the legacy key
+                    keys.append(f"quiz_{c['id']}")
+                pipe.exists(*keys)
+                pipe.hget(f"quiz_bank_{c['id']}", f"{cfg['difficulty']}:{cfg['question_type']}")
+            results = pipe.execute()
+            present = []
+            for (c, cfg), exists, banked in zip(jobs, results[0::2], results[1::2]):
+                # A bank that can fill the config is assembled on open without an AI call
+                present.append(bool(exists) or (bool(banked) and len(loads_cached(banked)) >= cfg["num_questions"]))
+            summary["cached"] = sum(1 for p in present if p)
+            jobs = [job for job, p in zip(jobs, present) if not p]
+
+        deadline = time.monotonic() + Config.QUIZ_WARM_BUDGET_SECONDS
+        summary_lock = threading.Lock()
+
+        def warm_one(job):
+            topic, cfg = job
+            if not _wait_for_idle_ai(deadline, r):
+                with summary_lock:
+                    summary["skipped"] += 1
+                return
+            outcome = "failed"
+            try:
+                quiz = generate_quiz(topic["id"], **cfg)
+                if quiz and quiz.get("questions") and quiz["questions"][0].get("q") != "Lỗi tạo câu hỏi trắc nghiệm":
+                    outcome = "warmed"
+            except Exception as e:
+                logger.error(f"❌ Quiz warm-up failed for {topic['id']}: {e}")
+            with summary_lock:
+                if outcome == "warmed":
+                    summary["warmed"].append(f"{topic.get('title', topic['id'])} ({cfg['num_questions']}q, {cfg['difficulty']}, {cfg['question_type']})")
+                else:
+                    summary["failed"].append(topic["id"])
+
+        if jobs:
+            with ThreadPoolExecutor(max_workers=max(1, Config.QUIZ_WARM_CONCURRENCY), thread_name_prefix="quiz-warmer") as executor:
+                list(executor.map(warm_one, jobs))
+
+        logger.info(
+            f"🔥 Quiz warm-up done: {len(summary['warmed'])} warmed, {summary['cached']} already cached, "
+            f"{len(summary['failed'])} failed, {summary['skipped']} skipped (budget). Warmed: {summary['warmed']}"
+        )
+        return summary
+    finally:
+        if lock_acquired:
+            try:
+                # Running generations can outlast the lock TTL; never delete a lock another worker took since
+                release_lock(r, WARMER_LOCK_KEY, lock_token)
+            except Exception as e:
+                logger.warning(f"Failed to release quiz warmer lock: {e}")
+        _running.release()
+
+
+def trigger_quiz_warmup(candidates=None):
+    """Start a warm-up pass in a background thread without blocking the caller."""
+    if not Config.QUIZ_WARM_ENABLED or _running.locked():
+        return
+
+    def run():
+        try:
+            warm_quiz_cache(candidates)
+        except Exception as e:
+            logger.error(f"❌ Quiz warm-up crashed: {e}")
+
+    threading.Thread(target=run, name="quiz-warmup", daemon=True).start()
+
+
+def start_warm_scheduler():
+    """Run a warm-up pass every QUIZ_WARM_INTERVAL seconds for the life of the process."""
+    global _scheduler_started
+    if _scheduler_started or not Config.QUIZ_WARM_ENABLED or Config.QUIZ_WARM_INTERVAL <= 0:
+        return
+    _scheduler_started = True
+
+    def loop():
+        while True:
+            try:
+                warm_quiz_cache()
+            except Exception as e:
+                logger.error(f"❌ Scheduled quiz warm-up crashed: {e}")
+            time.sleep(Config.QUIZ_WARM_INTERVAL)
+
+    threading.Thread(target=loop, name="quiz-warm-scheduler", daemon=True).start()
+    logger.info(f"Quiz warm-up scheduler started (every {Config.QUIZ_WARM_INTERVAL}s)")
+
+
+def start_load_reporter():
+    """Publish this process's LLM limiter load every LLM_LOAD_REPORT_INTERVAL seconds for the warm-up idle check."""
+    global _load_reporter_started
+    if _load_reporter_started or not Config.QUIZ_WARM_ENABLED:
+        return
+    _load_reporter_started = True
+
+    def loop():
+        while True:
+            try:
+                r = get_redis()
+                if r:
+                    publish_llm_load(r)
+            except Exception as e:
+                logger.warning(f"Failed to publish LLM load: {e}")
+            time.sleep(LLM_LOAD_REPORT_INTERVAL)
+
+    threading.Thread(target=loop, name="llm-load-reporter", daemon=True).start()
@@ -1,19 +1,47 @@
+import asyncio
 import datetime
+import inspect
 import json
 import pytz
+import re
+import time
 import uuid
 from src.services.notion import NotionService
-from src.services.ai import AIService
+from src.services.ai import AsyncAIService
+from src.config.settings import Config
 from src.utils.logger import logger
+from src.utils.chunker import plan_quiz_chunks
+from src.utils.dedup import remove_near_duplicates
+from src.utils.json_extract import parse_json_array
+from src.utils.katex_validator import validate_quiz_katex
+from src.utils.latex_normalizer import normalize_quiz_latex, strip_markdown_math
+from src.utils.ai_client import run_ai_coroutine
+from src.utils.compression import dumps_cached, loads_cached
+from src.utils.swr import read_swr, refresh_in_background, write_swr
+from src.utils.ai_metrics import track_usage, ai_stage
 from src.utils.cache import (
     get_redis,
     CACHE_PAGE_TITLE_TTL,
     CACHE_CANDIDATES_TTL,
     CACHE_QUIZ_TTL,
     CACHE_QUIZ_PROGRESS_TTL,
+    CACHE_QUICK_REVIEW_SESSION_TTL,
     LOCK_QUIZ_TTL,
+    bump_cache_generation,
+    cache_generation,
+    cache_generations,
+    release_lock,
+    versioned_key,
 )
 
+CANDIDATES_NAMESPACE = "study_candidates"
+# Lock holders publish here when a quiz generation ends; waiters subscribe instead of polling
+QUIZ_READY_CHANNEL_PREFIX = "quiz_ready_"
+QUIZ_WAIT_GRACE_SECONDS = 5
+# Per bank field lock around the question bank read-modify-write
+BANK_LOCK_TTL = 30
+BANK_LOCK_WAIT = 10
+
 def get_page_title(page_id):
     """Retrieve title of a page by ID, using Redis cache if available."""
     cache_key = f"page_title_{page_id}"
@@ -46,25 +74,57 @@ def get_page_title(page_id):
 
     return None
 
+def _quiz_namespace(topic_id) -> str:
+    return f"quiz_{topic_id}"
+
+
+def _versioned_cache_key(base, namespace, r=None) -> str:
+    """Key for base under the namespace's current generation (the plain base when Redis is unavailable)."""
+    try:
+        r = r or get_redis()
+        if r:
+            return versioned_key(base, cache_generation(r, namespace))
+    except Exception as e:
+        logger.warning(f"Redis cache generation lookup failed for {namespace}: {e}")
+    return base
+
+
+def _quiz_cache_key(topic_id, num_questions, difficulty, question_type, r=None) -> str:
+    return _versioned_cache_key(f"quiz_{topic_id}_{num_questions}_{difficulty}_{question_type}", _quiz_namespace(topic_id), r=r)
+
+
 def get_candidates(limit=None, force_refresh=False):
     """Fetch review notes, sort by 'Last Review At', return top candidates with metadata."""
-    cache_key = f"study_candidates_{limit if limit is not None else 'all'}"
-    r = None
+    return get_candidates_snapshot(limit=limit, force_refresh=force_refresh)[0]
+
+
+def get_candidates_snapshot(limit=None, force_refresh=False) -> tuple[list, bool]:
+    """Return (candidates, stale).
+
+    A cached list past its soft expiry is returned at once with stale=True while a
+    single background refresh rebuilds it. After update_status moves the list to a
+    new generation nothing is cached under it yet, so the list is rebuilt inline.
+    """
+    base_key = f"study_candidates_{limit if limit is not None else 'all'}"
     if not force_refresh:
         try:
             r = get_redis()
             if r:
-                cached = r.get(cache_key)
-                if cached:
-                    logger.info(f"Using cached study candidates list (limit={limit})")
-                    return json.loads(cached)
+                generation = cache_generation(r, CANDIDATES_NAMESPACE)
+                cached, stale = read_swr(r.get(versioned_key(base_key, generation)))
+                if cached is not None:
+                    if stale:
+                        refresh_in_background(r, versioned_key(base_key, generation), lambda: _build_candidates(limit), name="candidates-refresh")
+                    logger.info(f"Using cached study candidates list (limit={limit}, stale={stale})")
+                    return cached, stale
         except Exception as e:
             logger.warning(f"Redis get candidates cache error: {e}")
 
-    # Fallback to check if smaller limit cache exists when force_refresh=False is requested
-    # But wait, if force_refresh is True, we bypass cache.
-    # If limit=10 was cached previously under 'study_candidates_5', no, cache keys are distinct.
+    return _build_candidates(limit), False
 
+
+def _build_candidates(limit=None):
+    """Rebuild the candidate list from Notion and cache it (fresh for CANDIDATES_SOFT_TTL)."""
     notion = NotionService()
     candidates = notion.get_review_notes()
 
@@ -140,325 +200,525 @@ def get_candidates(limit=None, force_refresh=False):
     # Save to Redis cache
     if results:
         try:
-            r = r or get_redis()
+            r = get_redis()
             if r:
-                r.setex(cache_key, CACHE_CANDIDATES_TTL, json.dumps(results))
+                cache_key = _versioned_cache_key(f"study_candidates_{limit if limit is not None else 'all'}", CANDIDATES_NAMESPACE, r=r)
+                write_swr(r, cache_key, results, Config.CANDIDATES_SOFT_TTL, CACHE_CANDIDATES_TTL)
                 logger.info("Saved study candidates list to cache")
         except Exception as e:
             logger.warning(f"Redis set candidates cache error: {e}")
 
+        # Prepare quizzes for the freshly listed topics before anyone opens them
+        from src.services.quiz_warmer import trigger_quiz_warmup
+        trigger_quiz_warmup(results)
+
     return results
 
-def split_into_3_chunks(text: str) -> list[str]:
-    """Split text into 3 chunks using Markdown H1 (#) headings if possible."""
-    import math
-    import re
-
-    sections = [s.strip() for s in re.split(r'\n(?=#\s)|^(?=#\s)', text) if s.strip()]
-    if len(sections) >= 3:
-        group_size = math.ceil(len(sections) / 3)
-        return [
-            "\n\n".join(sections[i : i + group_size])
-            for i in range(0, len(sections), group_size)
-        ]
-
-    # Fallback to H2 (##) if H1 is less than 3
-    h2_sections = [s.strip() for s in re.split(r'\n(?=##\s)|^(?=##\s)', text) if s.strip()]
-    if len(h2_sections) >= 3:
-        group_size = math.ceil(len(h2_sections) / 3)
-        return [
-            "\n\n".join(h2_sections[i : i + group_size])
-            for i in range(0, len(h2_sections), group_size)
-        ]
-
-    # Final fallback for plain text or very short notes
-    lines = text.splitlines()
-    if len(lines) >= 3:
-        group_size = math.ceil(len(lines) / 3)
-        return [
-            "\n".join(lines[i : i + group_size])
-            for i in range(0, len(lines), group_size)
-        ]
-
-    return [text]
+_JSON_STRING_PATTERN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+# Group 1 keeps an escaped backslash, \uXXXX or a JSON escape; group 2 is a lone LaTeX backslash to double
+_ESCAPE_REPAIR_PATTERN = re.compile(r'(\\\\|\\u[0-9a-fA-F]{4}|\\["/]|\\[bfnrt](?![A-Za-z]))|(\\)')
+# \b \f \n \r \t before a non-ASCII character: isalpha() decides, which a regex class cannot mirror exactly
+_NON_ASCII_AFTER_ESCAPE = re.compile(r'\\[bfnrt][^\x00-\x7f]')
+_STRING_REPAIR_PATTERN = re.compile(r'\\(?:\\|u[0-9a-fA-F]{4}|["/bfnrt])?|[\n\t]')
+_LATEX_ESCAPE_LETTERS = frozenset("ntfbr")
+
+def _repair_string_token(match):
+    token = match.group(0)
+    if token == "\n":
+        return "\\n"
+    if token == "\t":
+        return "\\t"
+    if len(token) == 1 or token == "\\\\":
+        # Lone backslash of a LaTeX command, or an already escaped one
+        return "\\\\"
+    escaped = token[1]
+    if escaped in _LATEX_ESCAPE_LETTERS:
+        # \nu, \theta, \times, \frac, \rho: a LaTeX command, not a JSON escape
+        content, end = match.string, match.end()
+        if end < len(content) and content[end].isalpha():
+            return "\\\\" + escaped
+    return token
+
+def _repair_string_literal(match):
+    literal = match.group(0)
+    if "\\" not in literal:
+        if "\n" not in literal and "\t" not in literal:
+            return literal
+        return literal.replace("\n", "\\n").replace("\t", "\\t")
+    content = literal[1:-1]
+    if _NON_ASCII_AFTER_ESCAPE.search(content):
+        return '"' + _STRING_REPAIR_PATTERN.sub(_repair_string_token, content) + '"'
+    return '"' + _ESCAPE_REPAIR_PATTERN.sub(r'\1\2\2', content).replace("\n", "\\n").replace("\t", "\\t") + '"'
 
 def clean_json_string(json_str):
     """Clean unescaped LaTeX backslashes and invalid escape sequences inside JSON string literals."""
-    import re
-    pattern = re.compile(r'"(?:[^"\\]|\\.)*"')
-    def replace_string(match):
-        s = match.group(0)
-        content = s[1:-1]
-        fixed = []
-        i = 0
-        n = len(content)
-        in_math = False
-        while i < n:
-            if content[i] == '$':
-                if i + 1 < n and content[i+1] == '$':
-                    in_math = not in_math
-                    fixed.append('$$')
-                    i += 2
-                else:
-                    in_math = not in_math
-                    fixed.append('$')
-                    i += 1
-                continue
-            if content[i] == '\\':
-                is_double = (i + 1 < n and content[i+1] == '\\')
-                next_char = content[i+2] if is_double and i + 2 < n else (content[i+1] if i + 1 < n else '')
-
-                # In JSON strings, \n and \t might be literal escapes or intended as \n / \t LaTeX commands (\nu, \theta, \times)
-                # If followed by letters (e.g. \frac, \nu, \theta, \times), treat as LaTeX backslash -> escape as \\
-                if not is_double and next_char in ['n', 't', 'f', 'b', 'r'] and i + 2 < n and content[i+2].isalpha():
-                    fixed.append('\\\\')
-                    i += 1
-                elif not is_double and next_char in ['"', '\\', '/', 'b', 'f', 'n', 'r', 't']:
-                    fixed.append('\\')
-                    fixed.append(next_char)
-                    i += 2
-                elif not is_double and next_char == 'u' and i + 5 < n and all(c in '0123456789abcdefABCDEF' for c in content[i+2:i+6]):
-                    fixed.append('\\')
-                    fixed.append('u')
-                    fixed.extend(content[i+2:i+6])
-                    i += 6
-                else:
-                    # Escape raw single backslash for LaTeX commands so JSON parsing succeeds without corrupting TeX
-                    fixed.append('\\\\')
-                    i += (2 if is_double else 1)
-            elif content[i] == '\n':
-                fixed.append('\\n')
-                i += 1
-            elif content[i] == '\t':
-                fixed.append('\\t')
-                i += 1
-            else:
-                fixed.append(content[i])
-                i += 1
-        return '"' + "".join(fixed) + '"'
-    return pattern.sub(replace_string, json_str)
+    return _JSON_STRING_PATTERN.sub(_repair_string_literal, json_str)
+
+def _loads_quiz_json(json_str: str):
+    return json.loads(clean_json_string(json_str))
+
+def _parse_question_array(text: str) -> list[dict] | None:
+    """Extract the JSON question array from an AI response; None if no well-formed question list is found."""
+    items = parse_json_array(text, loads=_loads_quiz_json)
+    if items is None:
+        return None
+    return [q for q in items if isinstance(q, dict) and ("q" in q or "question" in q) and "options" in q]
+
+def get_question_bank(topic_id: str, difficulty: str, question_type: str, r=None) -> list[dict]:
+    """Return all banked questions generated for a topic at a given difficulty and question type."""
+    r = r or get_redis()
+    if not r:
+        return []
+    try:
+        banked = r.hget(f"quiz_bank_{topic_id}", f"{difficulty}:{question_type}")
+        return loads_cached(banked) if banked else []
+    except Exception as e:
+        logger.warning(f"Redis question bank read failed for topic {topic_id}: {e}")
+        return []
+
+def _acquire_bank_lock(r, lock_key, token) -> bool:
+    """Spin on the bank field's SET NX lock for up to BANK_LOCK_WAIT seconds."""
+    deadline = time.monotonic() + BANK_LOCK_WAIT
+    while True:
+        if r.set(lock_key, token, nx=True, ex=BANK_LOCK_TTL):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+
+def add_to_question_bank(topic_id: str, difficulty: str, question_type: str, questions: list[dict], r=None, replace=False) -> list[dict]:
+    """Append newly generated questions to the topic's bank (or replace it) and return the resulting bank.
+
+    The read-modify-write runs under a per-field lock: generations of different
+    sizes share the bank field but not the generation lock.
+    """
+    field = f"{difficulty}:{question_type}"
+    lock_key = f"quiz_bank_lock_{topic_id}_{field}"
+    lock_token = str(uuid.uuid4())
+    lock_acquired = False
+    r = r or get_redis()
+    if r:
+        try:
+            lock_acquired = _acquire_bank_lock(r, lock_key, lock_token)
+            if not lock_acquired:
+                logger.warning(f"Question bank lock for topic {topic_id} ({field}) still busy, writing without it")
+        except Exception as e:
+            logger.warning(f"Redis question bank lock failed (non-fatal): {e}")
+
+    try:
+        bank = [] if replace else get_question_bank(topic_id, difficulty, question_type, r=r)
+        known = {(q.get("q") or q.get("question") or "").strip() for q in bank}
+        for q in questions:
+            text = (q.get("q") or q.get("question") or "").strip()
+            if text and text not in known:
+                known.add(text)
+                bank.append({**q, "difficulty": difficulty, "question_type": question_type})
+
+        if r:
+            try:
+                bank_key = f"quiz_bank_{topic_id}"
+                r.hset(bank_key, field, dumps_cached(bank))
+                r.expire(bank_key, CACHE_QUIZ_TTL)
+            except Exception as e:
+                logger.warning(f"Redis question bank save failed for topic {topic_id}: {e}")
+        return bank
+    finally:
+        if lock_acquired:
+            try:
+                release_lock(r, lock_key, lock_token)
+            except Exception as e:
+                logger.warning(f"Failed to release question bank lock: {e}")
+
+def _assemble_quiz(topic_id, note_title, num_questions, difficulty, question_type, bank):
+    """Build a quiz result from the first num_questions banked questions."""
+    questions = [{**q, "id": idx} for idx, q in enumerate(bank[:num_questions], 1)]
+    return {
+        "id": topic_id,
+        "title": note_title,
+        "url": f"https://notion.so/{topic_id.replace('-', '')}",
+        "num_questions": len(questions),
+        "difficulty": difficulty,
+        "question_type": question_type,
+        "questions": questions
+    }
+
+def rebuild_quiz_from_bank(topic_id, num_questions=15, difficulty='medium', question_type='balanced') -> dict | None:
+    """Overwrite one configuration's cached quiz with questions from the topic's current bank, without calling the AI.
+
+    Returns None when Redis is unavailable or the bank holds fewer than num_questions questions.
+    """
+    r = get_redis()
+    if not r:
+        return None
+    bank = get_question_bank(topic_id, difficulty, question_type, r=r)
+    if len(bank) < num_questions:
+        return None
+    result = _assemble_quiz(topic_id, get_page_title(topic_id) or "Bài học đã chọn", num_questions, difficulty, question_type, bank)
+    try:
+        r.set(_quiz_cache_key(topic_id, num_questions, difficulty, question_type, r=r), dumps_cached(result), ex=CACHE_QUIZ_TTL)
+    except Exception as e:
+        logger.warning(f"Redis cache save failed: {e}")
+        return None
+    return result
+
+async def _review_invalid_latex(ai, questions, report):
+    """Send only the questions the local normalizer could not fix to MODEL_WORKER and merge the answers back."""
+    # Map by list position: ids come from the model and may be missing or repeated
+    indices = sorted({issue["index"] for issue in report["issues"]})
+    if not indices:
+        return questions
+    try:
+        reviewed = await _call_ai(ai, "review_latex_quiz", json.dumps([questions[i] for i in indices], ensure_ascii=False))
+        reviewed = parse_json_array(reviewed or "", loads=_loads_quiz_json)
+    except Exception as e:
+        logger.error(f"❌ Failed in MODEL_WORKER LaTeX review step: {e}")
+        return questions
+    if not reviewed or len(reviewed) != len(indices) or not all(isinstance(q, dict) for q in reviewed):
+        logger.warning(f"MODEL_WORKER LaTeX review returned {len(reviewed or [])} questions for {len(indices)} sent, keeping local fixes")
+        return questions
+    merged = list(questions)
+    fixed, _ = normalize_quiz_latex(reviewed)
+    for i, q in zip(indices, fixed):
+        merged[i] = {**questions[i], **q}
+    logger.info(f"📐 MODEL_WORKER reviewed LaTeX for {len(indices)} questions")
+    return merged
+
+def _check_quiz_katex(topic_id, quiz, source) -> int:
+    """Validate a quiz's KaTeX formatting inline and log offending fields; returns how many fields have issues."""
+    report = validate_quiz_katex(quiz)
+    if not report["valid"]:
+        logger.warning(f"⚠️ KaTeX issues in {source} quiz for topic {topic_id}: {len(report['issues'])}/{report['fields_checked']} fields, e.g. {report['issues'][:3]}")
+    return len(report["issues"])
 
 def clear_quiz_cache(topic_id: str, num_questions: int | None = None, difficulty: str | None = None, question_type: str | None = None) -> bool:
-    """Delete cached quiz for a specific topic (or specific config) from Redis."""
+    """Delete cached quiz for a specific topic (or specific config) from Redis, along with its banked questions."""
     try:
         r = get_redis()
         if r:
             if num_questions is not None and difficulty is not None and question_type is not None:
-                r.delete(f"quiz_{topic_id}_{num_questions}_{difficulty}_{question_type}")
+                r.delete(_quiz_cache_key(topic_id, num_questions, difficulty, question_type, r=r))
+                r.hdel(f"quiz_bank_{topic_id}", f"{difficulty}:{question_type}")
             else:
-                # Delete all variations of quiz cache for this topic
-                r.delete(f"quiz_{topic_id}")
-                for k in r.scan_iter(f"quiz_{topic_id}_*"):
-                    r.delete(k)
+                # Move every configured quiz of this topic to a new generation; the old keys expire on their own
+                bump_cache_generation(r, _quiz_namespace(topic_id))
+                r.delete(f"quiz_{topic_id}", f"quiz_bank_{topic_id}")
             logger.info(f"Cleared quiz cache for topic {topic_id}")
             return True
     except Exception as e:
         logger.warning(f"Redis cache delete failed for topic {topic_id}: {e}")
     return False
 
-def generate_quiz(topic_id, force_refresh=False, num_questions=15, difficulty='medium', question_type='balanced', progress_callback=None):
-    """Fetch content from Notion, call AI to generate quiz with custom configuration, parse into JSON/Dict format."""
+def _wait_for_quiz_generation(r, cache_key, lock_key, channel):
+    """Block until the generation holding lock_key finishes or its lock expires; return the cached quiz, if any.
+
+    Waiters subscribe to the generation's ready channel and wake as soon as the lock
+    holder publishes, instead of polling. The wait never outlasts the lock's TTL, so
+    a crashed generator is taken over once its lock expires. Backends without
+    pub/sub are polled once a second.
+    """
+    pubsub = None
+    try:
+        pubsub = r.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(channel)
+    except Exception as e:
+        logger.warning(f"Quiz ready channel unavailable, polling instead: {e}")
+        pubsub = None
+
+    deadline = time.monotonic() + LOCK_QUIZ_TTL + QUIZ_WAIT_GRACE_SECONDS
+    try:
+        # Subscribed before checking, so a result published in between is not missed
+        while True:
+            cached = r.get(cache_key)
+            if cached:
+                return cached
+            lock_ttl = r.ttl(lock_key)
+            if lock_ttl == -2:
+                return None  # released (or expired) without caching a quiz
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            # Wake up no later than the lock's expiry to take over from a generator that died
+            wait = min(remaining, max(lock_ttl, 1)) if lock_ttl >= 0 else remaining
+            if pubsub is not None:
+                pubsub.get_message(timeout=wait)
+            else:
+                time.sleep(min(1.0, wait))
+    finally:
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+async def _call_ai(ai, method, *args, **kwargs):
+    """Await an AsyncAIService method, or run a sync AIService's (e.g. BatchAIService) in a worker thread."""
+    fn = getattr(ai, method)
+    if inspect.iscoroutinefunction(fn):
+        return await fn(*args, **kwargs)
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+def generate_quiz(topic_id, force_refresh=False, num_questions=15, difficulty='medium', question_type='balanced', progress_callback=None, ai_service=None, refresh_in_place=False):
+    """Blocking wrapper running generate_quiz_async on the shared AI event loop."""
+    return run_ai_coroutine(generate_quiz_async(
+        topic_id,
+        force_refresh=force_refresh,
+        num_questions=num_questions,
+        difficulty=difficulty,
+        question_type=question_type,
+        progress_callback=progress_callback,
+        ai_service=ai_service,
+        refresh_in_place=refresh_in_place,
+    ))
+
+def _read_quiz_cache(r, cache_key, legacy_key=None):
+    cached = r.get(cache_key)
+    if not cached and legacy_key:
+        cached = r.get(legacy_key)
+    return cached
+
+def _release_quiz_lock(r, lock_key, token, ready_channel):
+    release_lock(r, lock_key, token)
+    # Wake every worker waiting on this generation (the quiz is cached by now if it succeeded)
+    r.publish(ready_channel, "released")
+
+async def generate_quiz_async(topic_id, force_refresh=False, num_questions=15, difficulty='medium', question_type='balanced', progress_callback=None, ai_service=None, refresh_in_place=False):
+    """Fetch content from Notion, call AI to generate quiz with custom configuration, parse into JSON/Dict format.
+
+    ai_service replaces the default AsyncAIService (e.g. a BatchAIService for offline jobs).
+    refresh_in_place regenerates like force_refresh but keeps serving the old cached quiz until the new one overwrites it.
+    """
     notion = NotionService()
-    ai = AIService()
+    ai = ai_service or AsyncAIService()
 
-    import re
     import json
 
-    # Cache key reflects configuration parameters
-    cache_key = f"quiz_{topic_id}_{num_questions}_{difficulty}_{question_type}"
+    # Cache key reflects configuration parameters (resolving it reads the topic's generation counter)
+    cache_key = await asyncio.to_thread(_quiz_cache_key, topic_id, num_questions, difficulty, question_type)
 
     # Try checking cache first
     if progress_callback:
         progress_callback("checking_cache", 5, "🔍 Đang kiểm tra bộ nhớ đệm...")
 
     r = None
-    if not force_refresh:
+    if not force_refresh and not refresh_in_place:
         try:
-            r = get_redis()
+            r = await asyncio.to_thread(get_redis)
             if r:
-                cached = r.get(cache_key)
-                if not cached:
-                    # Fallback to legacy unconfigured cache key if num_questions is 15 and default config
-                    if num_questions == 15 and difficulty == 'medium' and question_type == 'balanced':
-                        cached = r.get(f"quiz_{topic_id}")
+                # Fallback to legacy unconfigured cache key if num_questions is 15 and default config
+                legacy_key = f"quiz_{topic_id}" if num_questions == 15 and difficulty == 'medium' and question_type == 'balanced' else None
+                cached = await asyncio.to_thread(_read_quiz_cache, r, cache_key, legacy_key)
                 if cached:
                     logger.info(f"Using cached quiz for topic {topic_id} ({num_questions}q, {difficulty}, {question_type})")
                     if progress_callback:
                         progress_callback("parsing_quiz", 100, "✨ Đã tải trắc nghiệm thành công!")
-                    return json.loads(cached)
+                    quiz = loads_cached(cached)
+                    _check_quiz_katex(topic_id, quiz, "cached")
+                    return quiz
         except Exception as e:
             logger.warning(f"Redis cache check failed: {e}")
-    else:
-        clear_quiz_cache(topic_id, num_questions, difficulty, question_type)
+    elif force_refresh:
+        await asyncio.to_thread(clear_quiz_cache, topic_id, num_questions, difficulty, question_type)
+
+    # Assemble from the topic's question bank when it already holds enough questions for this config
+    bank = [] if force_refresh or refresh_in_place else await asyncio.to_thread(get_question_bank, topic_id, difficulty, question_type, r=r)
+    if len(bank) >= num_questions:
+        logger.info(f"Assembling quiz for topic {topic_id} from question bank ({len(bank)} banked, {num_questions} requested)")
+        note_title = await asyncio.to_thread(get_page_title, topic_id)
+        result = _assemble_quiz(topic_id, note_title or "Bài học đã chọn", num_questions, difficulty, question_type, bank)
+        try:
+            r = r or await asyncio.to_thread(get_redis)
+            if r:
+                await asyncio.to_thread(r.set, cache_key, dumps_cached(result), ex=CACHE_QUIZ_TTL)
+        except Exception as e:
+            logger.warning(f"Redis cache save failed: {e}")
+        if progress_callback:
+            progress_callback("parsing_quiz", 100, "✨ Đã tải trắc nghiệm thành công!")
+        return result
 
     # Acquire Redis lock to prevent concurrent generation for same topic and config
-    lock_key = f"quiz_lock_{topic_id}_{num_questions}_{difficulty}_{question_type}"
+    lock_suffix = f"{topic_id}_{num_questions}_{difficulty}_{question_type}"
+    lock_key = f"quiz_lock_{lock_suffix}"
+    ready_channel = f"{QUIZ_READY_CHANNEL_PREFIX}{lock_suffix}"
     lock_token = str(uuid.uuid4())
     lock_acquired = False
     try:
-        r = r or get_redis()
+        r = r or await asyncio.to_thread(get_redis)
         if r:
-            lock_acquired = r.set(lock_key, lock_token, nx=True, ex=LOCK_QUIZ_TTL)
+            lock_acquired = await asyncio.to_thread(r.set, lock_key, lock_token, nx=True, ex=LOCK_QUIZ_TTL)
             if not lock_acquired:
                 logger.info(f"⏳ Quiz generation already in progress for {topic_id} ({num_questions}q), waiting...")
                 if progress_callback:
                     progress_callback("checking_cache", 10, "⏳ Đợi lượt tạo câu hỏi trước đó...")
-                # Poll until lock released or timeout
-                import time as time_mod
-                waited = 0
-                while waited < 30:
-                    time_mod.sleep(2)
-                    waited += 2
-                    cached = r.get(cache_key)
-                    if cached:
-                        logger.info(f"✅ Found cached quiz after waiting for {topic_id}")
-                        if progress_callback:
-                            progress_callback("parsing_quiz", 100, "✨ Đã tải trắc nghiệm thành công!")
-                        return json.loads(cached)
-                    if not r.get(lock_key):
-                        break
-                lock_acquired = r.set(lock_key, lock_token, nx=True, ex=LOCK_QUIZ_TTL)
+                cached = await asyncio.to_thread(_wait_for_quiz_generation, r, cache_key, lock_key, ready_channel)
+                if cached:
+                    logger.info(f"✅ Found cached quiz after waiting for {topic_id}")
+                    if progress_callback:
+                        progress_callback("parsing_quiz", 100, "✨ Đã tải trắc nghiệm thành công!")
+                    return loads_cached(cached)
+                lock_acquired = await asyncio.to_thread(r.set, lock_key, lock_token, nx=True, ex=LOCK_QUIZ_TTL)
     except Exception as e:
         logger.warning(f"Redis lock acquire failed (non-fatal): {e}")
 
     try:
-        # 1. Fetch content
-        content_lines = notion.fetch_page_content(topic_id, progress_callback=progress_callback)
-        # Pre-clean markdown input before sending to AI to strip math-breaking formatting like $*V*$ or raw currency $
-        cleaned_lines = []
-        import re
-        for line in content_lines:
-            # Strip Markdown italic/bold tags surrounding LaTeX math dollars like $*V*$ or $**V**$
-            l = re.sub(r'\$\*+(.*?)\*+\$', r'$\1$', line)
-            cleaned_lines.append(l)
-        full_content = "\n".join(cleaned_lines)
-
-        if not full_content.strip():
-            return None
-
-        # Default info
-        note_url = f"https://notion.so/{topic_id.replace('-', '')}"
-        note_title = "Bài học đã chọn"
-
-        if progress_callback:
-            progress_callback("page_info", 40, "📖 Đang đồng bộ thông tin tiêu đề...")
-
-        cached_title = get_page_title(topic_id)
-        if cached_title:
-            note_title = cached_title
+        with track_usage() as usage_tracker:
+            # 1. Fetch content
+            with ai_stage("fetch_notion"):
+                content_lines = await asyncio.to_thread(notion.fetch_page_content, topic_id, progress_callback=progress_callback)
 
-        # 2. Call AI in 3 parallel chunks
-        if progress_callback:
-            diff_vn = {'easy': 'Cơ bản', 'medium': 'Chuẩn thi UEH', 'hard': 'Nâng cao'}.get(difficulty, 'Chuẩn thi')
-            type_vn = {'theory': 'Lý thuyết', 'calculation': 'Tính toán', 'balanced': 'Cân bằng'}.get(question_type, 'Cân bằng')
-            progress_callback("calling_ai", 45, f"🧠 Đang chia 3 phần bài học và soạn {num_questions} câu [{diff_vn} - {type_vn}]...")
+            # Pre-clean markdown input before sending to AI: strip Markdown emphasis around math like $*V*$ or $**V**$
+            full_content = strip_markdown_math("\n".join(content_lines))
 
-        chunks = split_into_3_chunks(full_content)
-        from concurrent.futures import ThreadPoolExecutor
-
-        def generate_single_chunk(chunk_text):
-            try:
-                return ai.generate_quiz(chunk_text, num_questions=num_questions, difficulty=difficulty, question_type=question_type)
-            except Exception as e:
-                logger.error(f"❌ Worker failed to generate quiz for chunk: {e}")
-                return ""
+            if not full_content.strip():
+                return None
 
-        with ThreadPoolExecutor(max_workers=min(len(chunks), 3)) as executor:
-            raw_results = list(executor.map(generate_single_chunk, chunks))
+            # Default info
+            note_title = "Bài học đã chọn"
 
-        raw_content = "\n\n".join([r for r in raw_results if r.strip()])
-        if not raw_content.strip():
-            raw_content = ai.generate_quiz(full_content, num_questions=num_questions, difficulty=difficulty, question_type=question_type)
+            if progress_callback:
+                progress_callback("page_info", 40, "📖 Đang đồng bộ thông tin tiêu đề...")
 
-        # 3. Enhance quiz with MODEL_BRAIN for university-level exam quality
-        if progress_callback:
-            progress_callback("enhancing_quiz", 70, f"🎯 MODEL_BRAIN đang tối ưu hóa phương án nhiễu & bẫy tư duy ({num_questions} câu)...")
+            cached_title = await asyncio.to_thread(get_page_title, topic_id)
+            if cached_title:
+                note_title = cached_title
 
-        try:
-            enhanced_content = ai.enhance_quiz(raw_content, full_content, num_questions=num_questions, difficulty=difficulty, question_type=question_type)
-            if enhanced_content and enhanced_content.strip():
-                raw_content = enhanced_content
-        except Exception as e:
-            logger.error(f"❌ Failed to enhance quiz with MODEL_BRAIN: {e}")
+            # Only the questions the bank is missing for this config need generating
+            shortfall = num_questions - len(bank)
+            existing_questions = [q.get("q") or q.get("question") or "" for q in bank]
 
-        # 4. Standardize KaTeX / LaTeX math formatting using MODEL_WORKER
-        if progress_callback:
-            progress_callback("reviewing_latex", 88, "📐 MODEL_WORKER đang rà soát KaTeX & định dạng công thức toán...")
+            # 2. Call AI in parallel token-balanced chunks, each asked only for its share of questions
+            chunks = plan_quiz_chunks(full_content, shortfall)
+            logger.info(f"Split topic {topic_id} into {len(chunks)} chunks with quotas {[quota for _, quota in chunks]}")
 
-        try:
-            final_latex_content = ai.review_latex_quiz(raw_content)
-        except Exception as e:
-            logger.error(f"❌ Failed in MODEL_WORKER LaTeX review step: {e}")
-            final_latex_content = raw_content
+            if progress_callback:
+                diff_vn = {'easy': 'Cơ bản', 'medium': 'Chuẩn thi UEH', 'hard': 'Nâng cao'}.get(difficulty, 'Chuẩn thi')
+                type_vn = {'theory': 'Lý thuyết', 'calculation': 'Tính toán', 'balanced': 'Cân bằng'}.get(question_type, 'Cân bằng')
+                progress_callback("calling_ai", 45, f"🧠 Đang chia {len(chunks)} phần bài học và soạn {shortfall} câu [{diff_vn} - {type_vn}]...")
 
-        # 5. Parse into structured Dict format
-        if progress_callback:
-            progress_callback("parsing_quiz", 96, "✨ Đang đối chiếu cấu trúc câu hỏi hoàn tất...")
+            async def generate_single_chunk(chunk):
+                chunk_text, quota = chunk
+                try:
+                    return await _call_ai(ai, "generate_quiz", chunk_text, num_questions=quota, difficulty=difficulty, question_type=question_type, exclude_questions=existing_questions)
+                except Exception as e:
+                    logger.error(f"❌ Worker failed to generate quiz for chunk: {e}")
+                    return ""
+
+            with ai_stage("chunk_generation"):
+                raw_results = list(await asyncio.gather(*(generate_single_chunk(chunk) for chunk in chunks)))
+
+                raw_content = "\n\n".join([r for r in raw_results if r.strip()])
+                if not raw_content.strip():
+                    raw_content = await _call_ai(ai, "generate_quiz", full_content, num_questions=shortfall, difficulty=difficulty, question_type=question_type, exclude_questions=existing_questions)
+                    raw_results = [raw_content]
+
+            # Drop overlapping questions between chunks (and against the bank) locally instead of leaving it to the enhancer
+            with ai_stage("dedup"):
+                parsed_chunks, unparsed_chunks = [], []
+                for raw in raw_results:
+                    items = _parse_question_array(raw) if raw and raw.strip() else None
+                    if items is not None:
+                        parsed_chunks.extend(items)
+                    elif raw and raw.strip():
+                        unparsed_chunks.append(raw)
+                duplicates_removed = 0
+                if parsed_chunks:
+                    unique_items, duplicates_removed = remove_near_duplicates(parsed_chunks, existing=bank)
+                    raw_content = "\n\n".join([json.dumps(unique_items, ensure_ascii=False)] + unparsed_chunks)
+                    logger.info(f"🧹 Removed {duplicates_removed} near-duplicate questions for topic {topic_id} ({len(unique_items)} left before enhancement)")
+
+            # 3. Enhance quiz with MODEL_BRAIN for university-level exam quality
+            if progress_callback:
+                progress_callback("enhancing_quiz", 70, f"🎯 MODEL_BRAIN đang tối ưu hóa phương án nhiễu & bẫy tư duy ({shortfall} câu)...")
+
+            with ai_stage("enhance"):
+                try:
+                    enhanced_content = await _call_ai(ai, "enhance_quiz", raw_content, full_content, num_questions=shortfall, difficulty=difficulty, question_type=question_type)
+                    if enhanced_content and enhanced_content.strip():
+                        raw_content = enhanced_content
+                except Exception as e:
+                    logger.error(f"❌ Failed to enhance quiz with MODEL_BRAIN: {e}")
+
+            # 4. Standardize KaTeX / LaTeX math formatting: local rules first, MODEL_WORKER only for what they cannot fix
+            if progress_callback:
+                progress_callback("reviewing_latex", 88, "📐 Đang rà soát KaTeX & định dạng công thức toán...")
+
+            with ai_stage("latex_review"):
+                final_latex_content = raw_content
+                normalized_questions = None
+                enhanced_questions = parse_json_array(raw_content, loads=_loads_quiz_json)
+                if enhanced_questions:
+                    normalized_questions, latex_report = normalize_quiz_latex(enhanced_questions)
+                    logger.info(f"📐 Local LaTeX normalizer fixed {latex_report['changed_fields']} fields for topic {topic_id}, {len(latex_report['issues'])} still invalid")
+                    if latex_report["issues"] and Config.QUIZ_LATEX_LLM_FALLBACK:
+                        normalized_questions = await _review_invalid_latex(ai, normalized_questions, latex_report)
+                elif Config.QUIZ_LATEX_LLM_FALLBACK:
+                    # Not parseable locally: let MODEL_WORKER repair the whole response
+                    try:
+                        final_latex_content = await _call_ai(ai, "review_latex_quiz", raw_content)
+                    except Exception as e:
+                        logger.error(f"❌ Failed in MODEL_WORKER LaTeX review step: {e}")
 
-        questions = []
-        is_valid_quiz = False
+            # 5. Parse into structured Dict format
+            if progress_callback:
+                progress_callback("parsing_quiz", 96, "✨ Đang đối chiếu cấu trúc câu hỏi hoàn tất...")
 
-        import re
-        import json
+            questions = []
+            is_valid_quiz = False
 
-        match = re.search(r'\[\s*\{.*\}\s*\]', final_latex_content, re.DOTALL)
-        if match:
-            try:
-                parsed_questions = json.loads(clean_json_string(match.group(0)))
-                if isinstance(parsed_questions, list) and len(parsed_questions) > 0:
+            with ai_stage("parse"):
+                parsed_questions = normalized_questions if normalized_questions else parse_json_array(final_latex_content, loads=_loads_quiz_json)
+                if parsed_questions:
                     valid_items = []
                     for idx, q in enumerate(parsed_questions, 1):
                         if isinstance(q, dict) and ("q" in q or "question" in q) and "options" in q:
                             q["id"] = idx
                             valid_items.append(q)
                     if valid_items:
-                        # Limit to requested num_questions if AI returned slightly more
-                        questions = valid_items[:num_questions]
-                        is_valid_quiz = True
-            except Exception as e:
-                logger.error(f"Failed to parse JSON quiz: {e}")
-
-        if not is_valid_quiz:
-            logger.error("No valid questions parsed from AI response")
-            questions = [{
-                "q": "Lỗi tạo câu hỏi trắc nghiệm",
-                "options": ["A. Lỗi phân tích cú pháp AI"],
-                "correct": 0,
-                "explanation": "Không thể phân tích mảng câu hỏi JSON hợp lệ từ phản hồi AI. Vui lòng tải lại bài học."
-            }]
-
-        result = {
-            "id": topic_id,
-            "title": note_title,
-            "url": note_url,
-            "num_questions": len(questions),
-            "difficulty": difficulty,
-            "question_type": question_type,
-            "questions": questions
-        }
-
-        # Try saving to cache only if questions are valid (never poison cache with dummy error)
-        if is_valid_quiz:
-            try:
-                r = r or get_redis()
-                if r:
-                    r.set(cache_key, json.dumps(result), ex=CACHE_QUIZ_TTL)
-                    logger.info(f"Saved quiz to cache for topic {topic_id} ({cache_key})")
-            except Exception as e:
-                logger.warning(f"Redis cache save failed: {e}")
+                        try:
+                            # Limit to the shortfall if AI returned slightly more, then top up the bank
+                            bank = await asyncio.to_thread(add_to_question_bank, topic_id, difficulty, question_type, valid_items[:shortfall], r=r, replace=refresh_in_place)
+                            questions = bank[:num_questions]
+                            is_valid_quiz = True
+                        except Exception as e:
+                            logger.error(f"Failed to store parsed quiz: {e}")
+
+            if not is_valid_quiz and bank:
+                # Serve what the bank already has rather than an error; not cached so the next open retries
+                logger.error(f"No valid questions parsed from AI response, serving {len(bank)} banked questions")
+                questions = bank[:num_questions]
+            elif not is_valid_quiz:
+                logger.error("No valid questions parsed from AI response")
+                questions = [{
+                    "q": "Lỗi tạo câu hỏi trắc nghiệm",
+                    "options": ["A. Lỗi phân tích cú pháp AI"],
+                    "correct": 0,
+                    "explanation": "Không thể phân tích mảng câu hỏi JSON hợp lệ từ phản hồi AI. Vui lòng tải lại bài học."
+                }]
+
+            result = _assemble_quiz(topic_id, note_title, num_questions, difficulty, question_type, questions)
+            result["generation_stats"] = usage_tracker.summary()
+            result["generation_stats"]["duplicates_removed"] = duplicates_removed
+            result["generation_stats"]["katex_issues"] = _check_quiz_katex(topic_id, result, "generated")
+            logger.info(f"📊 Quiz generation stats for {topic_id}: {json.dumps(result['generation_stats'])}")
+
+            # Try saving to cache only if questions are valid (never poison cache with dummy error)
+            if is_valid_quiz:
+                try:
+                    r = r or await asyncio.to_thread(get_redis)
+                    if r:
+                        await asyncio.to_thread(r.set, cache_key, dumps_cached(result), ex=CACHE_QUIZ_TTL)
+                        logger.info(f"Saved quiz to cache for topic {topic_id} ({cache_key})")
+                except Exception as e:
+                    logger.warning(f"Redis cache save failed: {e}")
 
-        return result
+            return result
 
     finally:
         # Guarantee release of the generation lock
         if lock_acquired:
             try:
-                r = r or get_redis()
+                r = r or await asyncio.to_thread(get_redis)
                 if r:
-                    r.eval(
-                        "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end",
-                        1, lock_key, lock_token
-                    )
+                    await asyncio.to_thread(_release_quiz_lock, r, lock_key, lock_token, ready_channel)
             except Exception as e:
                 logger.warning(f"Failed to release quiz lock: {e}")
 
@@ -529,9 +789,8 @@ def update_status(topic_id, status=None):
         try:
             r = get_redis()
             if r:
-                for k in r.scan_iter("study_candidates*"):
-                    r.delete(k)
-                logger.info("Cleared study_candidates* cache due to status update")
+                bump_cache_generation(r, CANDIDATES_NAMESPACE)
+                logger.info("Invalidated study_candidates cache due to status update")
         except Exception as e:
             logger.warning(f"Failed to clear study_candidates cache: {e}")
 
@@ -540,39 +799,148 @@ def update_status(topic_id, status=None):
         logger.error(f"❌ Failed to update Last Review At: {e}")
         return False
 
-def generate_quick_review(course=None):
-    """Fetch all candidate topics (optionally filtered by course), generate/fetch their quizzes in parallel, and combine them."""
+def _quick_review_candidates(course=None):
     candidates = get_candidates()
     if not candidates:
-        return None
-
+        return []
     if course and course.strip():
         c_filter = course.strip().lower()
         candidates = [c for c in candidates if c.get("course") and c.get("course").strip().lower() == c_filter]
-        if not candidates:
-            return None
+    return candidates
+
+
+def _tag_topic_questions(topic, quiz):
+    """Tag each question with its source topic title and ID for context."""
+    questions = (quiz or {}).get("questions") or []
+    if not questions or questions[0].get("q") == "Lỗi tạo câu hỏi trắc nghiệm":
+        return []
+    for q in questions:
+        q["topic_title"] = topic["title"]
+        q["topic_id"] = topic["id"]
+    return questions
+
+
+def _read_cached_quizzes(topics) -> dict:
+    """Look up the default-config quiz of every topic in two pipelined Redis round trips (generations, then quizzes)."""
+    r = get_redis()
+    if not r or not topics:
+        return {}
+    try:
+        generations = cache_generations(r, [_quiz_namespace(t["id"]) for t in topics])
+        pipe = r.pipeline()
+        for t, generation in zip(topics, generations):
+            pipe.get(versioned_key(f"quiz_{t['id']}_15_medium_balanced", generation))
+            pipe.get(f"quiz_{t['id']}")  # legacy unconfigured key
+        values = pipe.execute()
+    except Exception as e:
+        logger.warning(f"Redis quick review cache lookup failed: {e}")
+        return {}
 
-    from concurrent.futures import ThreadPoolExecutor
+    cached = {}
+    for i, t in enumerate(topics):
+        raw = values[2 * i] or values[2 * i + 1]
+        if raw:
+            try:
+                cached[t["id"]] = loads_cached(raw)
+            except Exception as e:
+                logger.warning(f"Corrupted cached quiz for topic {t['id']}: {e}")
+    return cached
+
+
+def iter_quick_review(course=None, time_budget=None, max_generate=None):
+    """Yield quick-review events: cached questions first, then generated ones until the budget runs out.
+
+    Events are dicts with a "type" of:
+        "meta"      - title and topic counts, sent first
+        "questions" - a shuffled batch of tagged questions ("source" is "cache" or "generated")
+        "done"      - question count, whether results are partial and which topics were left out
+    """
     import random
+    import time
+    from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+    time_budget = Config.QUICK_REVIEW_TIME_BUDGET if time_budget is None else time_budget
+    max_generate = Config.QUICK_REVIEW_MAX_GENERATE if max_generate is None else max_generate
+    deadline = time.monotonic() + time_budget
 
-    def fetch_topic_quiz(topic):
+    candidates = _quick_review_candidates(course)
+    if not candidates:
+        return
+
+    title = f"Ôn tập nhanh - {course.strip()}" if course and course.strip() else "Ôn tập tổng hợp"
+    cached = _read_cached_quizzes(candidates)
+    misses = [c for c in candidates if c["id"] not in cached]
+    to_generate, deferred = misses[:max_generate], misses[max_generate:]
+    yield {"type": "meta", "title": title, "total_topics": len(candidates), "cached_topics": len(cached), "generating_topics": len(to_generate)}
+
+    total = 0
+    cached_questions = []
+    for c in candidates:
+        if c["id"] in cached:
+            cached_questions.extend(_tag_topic_questions(c, cached[c["id"]]))
+    if cached_questions:
+        random.shuffle(cached_questions)
+        total += len(cached_questions)
+        yield {"type": "questions", "source": "cache", "questions": cached_questions}
+
+    missing = []
+    if to_generate:
+        executor = ThreadPoolExecutor(max_workers=max(1, min(Config.QUICK_REVIEW_CONCURRENCY, len(to_generate))), thread_name_prefix="quick-review")
+        futures = {executor.submit(generate_quiz, t["id"]): t for t in to_generate}
+        done = set()
         try:
-            quiz = generate_quiz(topic["id"])
-            if quiz and quiz.get("questions"):
-                # Tag each question with its source topic title and ID for context
-                for q in quiz["questions"]:
-                    q["topic_title"] = topic["title"]
-                    q["topic_id"] = topic["id"]
-                return quiz["questions"]
-        except Exception as e:
-            logger.error(f"Error fetching quiz for topic {topic['id']}: {e}")
-        return []
+            for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+                done.add(future)
+                topic = futures[future]
+                try:
+                    questions = _tag_topic_questions(topic, future.result())
+                except Exception as e:
+                    logger.error(f"Error fetching quiz for topic {topic['id']}: {e}")
+                    questions = []
+                if questions:
+                    random.shuffle(questions)
+                    total += len(questions)
+                    yield {"type": "questions", "source": "generated", "topic_id": topic["id"], "questions": questions}
+                else:
+                    missing.append(topic["id"])
+        except FuturesTimeout:
+            pending = [futures[f]["id"] for f in futures if f not in done]
+            logger.warning(f"⏱ Quick review budget of {time_budget}s exhausted, {len(pending)} topics still generating in background")
+            missing.extend(pending)
+        finally:
+            # Unfinished generations keep running and land in the cache for the next quick review
+            executor.shutdown(wait=False)
+
+    if deferred:
+        from src.services.quiz_warmer import trigger_quiz_warmup
+        trigger_quiz_warmup(deferred)
+        missing.extend(t["id"] for t in deferred)
+
+    logger.info(f"⚡ Quick review served {total} questions ({len(cached)} cached topics, {len(to_generate)} generated, {len(missing)} missing)")
+    yield {"type": "done", "question_count": total, "partial": bool(missing), "missing_topics": missing}
+
+
+def generate_quick_review_stream(course=None):
+    """NDJSON wrapper around iter_quick_review for streaming responses."""
+    found = False
+    for event in iter_quick_review(course=course):
+        found = True
+        yield json.dumps(event, ensure_ascii=False) + "\n"
+    if not found:
+        yield json.dumps({"type": "error", "message": "Không có chủ đề nào cần ôn tập."}, ensure_ascii=False) + "\n"
 
+
+def generate_quick_review(course=None):
+    """Collect a budgeted quick review (optionally filtered by course) into a single shuffled quiz."""
+    import random
+
+    title = None
     all_questions = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        results = executor.map(fetch_topic_quiz, candidates)
-        for questions in results:
-            all_questions.extend(questions)
+    for event in iter_quick_review(course=course):
+        if event["type"] == "meta":
+            title = event["title"]
+        elif event["type"] == "questions":
+            all_questions.extend(event["questions"])
 
     if not all_questions:
         return None
@@ -580,8 +948,6 @@ def generate_quick_review(course=None):
     # Shuffle all combined questions
     random.shuffle(all_questions)
 
-    title = f"Ôn tập nhanh - {course.strip()}" if course and course.strip() else "Ôn tập tổng hợp"
-
     return {
         "id": "quick_review",
         "title": title,
@@ -589,21 +955,253 @@ def generate_quick_review(course=None):
     }
 
 
+def _quick_review_page(session_id, meta, questions, page, page_size):
+    total = int(meta["total"])
+    total_pages = max(1, -(-total // page_size))
+    return {
+        "id": "quick_review",
+        "session_id": session_id,
+        "title": meta["title"],
+        "seed": int(meta["seed"]),
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "total_pages": total_pages,
+        "next_page": page + 1 if page + 1 < total_pages else None,
+        "complete": meta.get("complete", "1") == "1",
+        "questions": questions,
+    }
+
+
+def _shuffle_quick_review_batch(questions, rng):
+    # Canonical order first so the seed alone determines the shuffle, whatever order generation finished in
+    questions.sort(key=lambda q: (q.get("topic_id", ""), q.get("id") or 0, q.get("q") or q.get("question") or ""))
+    rng.shuffle(questions)
+    return questions
+
+
+def _append_quick_review_batch(r, key, questions, meta):
+    pipe = r.pipeline()
+    pipe.rpush(f"{key}_questions", *[json.dumps(q, ensure_ascii=False) for q in questions])
+    pipe.hset(key, mapping=meta)
+    pipe.expire(key, CACHE_QUICK_REVIEW_SESSION_TTL)
+    pipe.expire(f"{key}_questions", CACHE_QUICK_REVIEW_SESSION_TTL)
+    pipe.execute()
+
+
+def _fill_quick_review_session(r, key, events, meta, rng):
+    """Append the remaining (generated) quick review batches to a stored session as they finish."""
+    try:
+        for event in events:
+            if event["type"] == "questions":
+                batch = _shuffle_quick_review_batch(event["questions"], rng)
+                meta["total"] += len(batch)
+                _append_quick_review_batch(r, key, batch, meta)
+    except Exception as e:
+        logger.error(f"❌ Quick review session fill failed for {key}: {e}")
+    finally:
+        meta["complete"] = "1"
+        try:
+            r.hset(key, mapping=meta)
+        except Exception as e:
+            logger.warning(f"Redis quick review session save failed: {e}")
+    logger.info(f"⚡ Quick review session {key} complete with {meta['total']} questions")
+
+
+def create_quick_review_session(course=None, page_size=None, seed=None) -> dict | None:
+    """Start a quick review session and return its first page as soon as the first batch is ready.
+
+    Cached questions usually form that first batch, so the response does not wait
+    for generation. A background thread keeps appending generated batches (each
+    given a seeded shuffle) to the session's Redis list; "complete" turns true once
+    generation is over, and every later page is a single LRANGE. Without Redis the
+    whole quiz is collected and returned as one page with no session_id.
+    """
+    import random
+    import threading
+
+    page_size = max(1, page_size or Config.QUICK_REVIEW_PAGE_SIZE)
+    seed = random.randrange(2 ** 32) if seed is None else seed
+    rng = random.Random(seed)
+    events = iter_quick_review(course=course)
+
+    title = None
+    questions = []
+    for event in events:
+        if event["type"] == "meta":
+            title = event["title"]
+        elif event["type"] == "questions":
+            questions = _shuffle_quick_review_batch(event["questions"], rng)
+            break
+    if not questions:
+        return None
+
+    meta = {"title": title, "seed": seed, "total": len(questions), "course": course or "", "complete": "0"}
+    r = get_redis()
+    if r:
+        session_id = uuid.uuid4().hex
+        key = f"quick_review_session_{session_id}"
+        try:
+            _append_quick_review_batch(r, key, questions, meta)
+        except Exception as e:
+            logger.warning(f"Redis quick review session save failed: {e}")
+        else:
+            threading.Thread(
+                target=_fill_quick_review_session, args=(r, key, events, meta, rng),
+                name="quick-review-session", daemon=True,
+            ).start()
+            logger.info(f"⚡ Created quick review session {session_id} with {len(questions)} ready questions (seed {seed})")
+            return _quick_review_page(session_id, dict(meta), questions[:page_size], 0, page_size)
+
+    for event in events:
+        if event["type"] == "questions":
+            questions.extend(_shuffle_quick_review_batch(event["questions"], rng))
+    meta.update(total=len(questions), complete="1")
+    return _quick_review_page(None, meta, questions, 0, len(questions))
+
+
+def get_quick_review_page(session_id: str, page: int = 0, page_size: int | None = None) -> dict | None:
+    """Return one page of a stored quick review session, or None if it expired or does not exist."""
+    page_size = max(1, page_size or Config.QUICK_REVIEW_PAGE_SIZE)
+    page = max(0, page)
+    r = get_redis()
+    if not r:
+        return None
+    key = f"quick_review_session_{session_id}"
+    try:
+        pipe = r.pipeline()
+        pipe.hgetall(key)
+        pipe.lrange(f"{key}_questions", page * page_size, (page + 1) * page_size - 1)
+        meta, raw_questions = pipe.execute()
+    except Exception as e:
+        logger.warning(f"Redis quick review session read failed: {e}")
+        return None
+    if not meta:
+        return None
+    return _quick_review_page(session_id, meta, [json.loads(q) for q in raw_questions], page, page_size)
+
+
+# Progress lives in one hash per user (field = topic id), so loading every topic is a single HGETALL
+QUIZ_PROGRESS_KEY_PREFIX = "quiz_progress_user_"
+QUIZ_PROGRESS_MIGRATED_KEY = "quiz_progress_migrated"
+QUIZ_PROGRESS_MIGRATION_LOCK = "quiz_progress_migration_lock"
+# Legacy formats: quiz_progress_{telegram_id} (one object) and quiz_progress_{telegram_id}:{topic_id}
+_LEGACY_PROGRESS_KEY_PATTERN = re.compile(r'^quiz_progress_(?!user_|migrat)([^:]+)(?::(.+))?$')
+_progress_migrated = False
+
+
+def _quiz_progress_key(telegram_id) -> str:
+    return f"{QUIZ_PROGRESS_KEY_PREFIX}{telegram_id}"
+
+
+def _progress_topic_id(progress_data, topic_id=None) -> str:
+    if topic_id:
+        return topic_id
+    if isinstance(progress_data, dict):
+        topic_obj = progress_data.get("topic")
+        if isinstance(topic_obj, dict) and topic_obj.get("id"):
+            return topic_obj["id"]
+    return "default"
+
+
+def migrate_legacy_quiz_progress(r) -> int:
+    """Move progress stored under the legacy per-key formats into the per-user hashes.
+
+    Runs once for the whole deployment: a marker key records completion and a
+    lock keeps concurrent workers from scanning at the same time. Progress
+    already in a hash wins over a legacy copy. Returns the number of keys moved.
+    """
+    global _progress_migrated
+    if _progress_migrated:
+        return 0
+    if r.get(QUIZ_PROGRESS_MIGRATED_KEY):
+        _progress_migrated = True
+        return 0
+    lock_token = uuid.uuid4().hex
+    if not r.set(QUIZ_PROGRESS_MIGRATION_LOCK, lock_token, nx=True, ex=300):
+        return 0  # another worker is migrating; readers fall back to the legacy keys meanwhile
+
+    moved = 0
+    try:
+        legacy = []
+        for k in r.scan_iter("quiz_progress_*"):
+            key_str = k if isinstance(k, str) else k.decode('utf-8')
+            match = _LEGACY_PROGRESS_KEY_PATTERN.match(key_str)
+            if match:
+                legacy.append((key_str, match.group(1), match.group(2)))
+
+        for i in range(0, len(legacy), 100):
+            batch = legacy[i:i + 100]
+            pipe = r.pipeline()
+            for key_str, _, _ in batch:
+                pipe.get(key_str)
+            values = pipe.execute()
+
+            pipe = r.pipeline()
+            for (key_str, telegram_id, tid), val in zip(batch, values):
+                if val:
+                    try:
+                        tid = tid or _progress_topic_id(loads_cached(val))
+                    except Exception:
+                        tid = tid or "default"
+                    pipe.hsetnx(_quiz_progress_key(telegram_id), tid, val)
+                    pipe.expire(_quiz_progress_key(telegram_id), CACHE_QUIZ_PROGRESS_TTL)
+                    moved += 1
+                pipe.delete(key_str)
+            pipe.execute()
+
+        r.set(QUIZ_PROGRESS_MIGRATED_KEY, "1")
+        _progress_migrated = True
+        logger.info(f"📦 Migrated {moved} legacy quiz progress keys into per-user hashes")
+    except Exception as e:
+        logger.warning(f"Legacy quiz progress migration failed: {e}")
+    finally:
+        try:
+            release_lock(r, QUIZ_PROGRESS_MIGRATION_LOCK, lock_token)
+        except Exception:
+            pass
+    return moved
+
+
+def _legacy_quiz_progress(r, telegram_id) -> dict:
+    """Progress of one user still stored under the legacy keys: {topic_id: (key, raw value)}.
+
+    Only consulted while the one-time migration has not finished.
+    """
+    keys = [f"quiz_progress_{telegram_id}"]
+    keys.extend(k if isinstance(k, str) else k.decode('utf-8') for k in r.scan_iter(f"quiz_progress_{telegram_id}:*"))
+    pipe = r.pipeline()
+    for key in keys:
+        pipe.get(key)
+    legacy = {}
+    for key, val in zip(keys, pipe.execute()):
+        if not val:
+            continue
+        match = _LEGACY_PROGRESS_KEY_PATTERN.match(key)
+        tid = match.group(2) if match else None
+        try:
+            tid = tid or _progress_topic_id(loads_cached(val))
+        except Exception:
+            tid = tid or "default"
+        legacy[tid] = (key, val)
+    return legacy
+
+
 def save_quiz_progress(telegram_id: str | int, progress_data: dict, topic_id: str | None = None) -> bool:
-    """Save quiz progress for a user and topic into Redis."""
+    """Save quiz progress for a user and topic into the user's progress hash.
+
+    The hash expires CACHE_QUIZ_PROGRESS_TTL after the user's last save.
+    """
     r = get_redis()
     if not r:
         return False
     try:
-        tid = topic_id
-        if not tid and isinstance(progress_data, dict):
-            topic_obj = progress_data.get("topic")
-            if isinstance(topic_obj, dict):
-                tid = topic_obj.get("id")
-        if not tid:
-            tid = "default"
-        cache_key = f"quiz_progress_{telegram_id}:{tid}"
-        r.setex(cache_key, CACHE_QUIZ_PROGRESS_TTL, json.dumps(progress_data, ensure_ascii=False))
+        migrate_legacy_quiz_progress(r)
+        key = _quiz_progress_key(telegram_id)
+        pipe = r.pipeline()
+        pipe.hset(key, _progress_topic_id(progress_data, topic_id), dumps_cached(progress_data))
+        pipe.expire(key, CACHE_QUIZ_PROGRESS_TTL)
+        pipe.execute()
         return True
     except Exception as e:
         logger.warning(f"Failed to save quiz progress for user {telegram_id}, topic {topic_id}: {e}")
@@ -619,45 +1217,21 @@ def get_quiz_progress(telegram_id: str | int, topic_id: str | None = None) -> di
     if not r:
         return None
     try:
+        migrate_legacy_quiz_progress(r)
+        key = _quiz_progress_key(telegram_id)
+        # Until the migration has finished, progress not moved yet still lives under the legacy keys
+        legacy = {} if _progress_migrated else {tid: val for tid, (_, val) in _legacy_quiz_progress(r, telegram_id).items()}
         if topic_id:
-            cache_key = f"quiz_progress_{telegram_id}:{topic_id}"
-            cached = r.get(cache_key)
-            if cached:
-                return json.loads(cached)
-            # Fallback to old format key quiz_progress_{telegram_id}
-            old_cached = r.get(f"quiz_progress_{telegram_id}")
-            if old_cached:
-                try:
-                    data = json.loads(old_cached)
-                    if isinstance(data, dict) and data.get("topic", {}).get("id") == topic_id:
-                        return data
-                except Exception:
-                    pass
-            return None
-        else:
-            result = {}
-            pattern = f"quiz_progress_{telegram_id}:*"
-            for k in r.scan_iter(pattern):
-                key_str = k if isinstance(k, str) else k.decode('utf-8')
-                val = r.get(key_str)
-                if val:
-                    try:
-                        pdata = json.loads(val)
-                        tid = key_str.split(":", 1)[1]
-                        result[tid] = pdata
-                    except Exception:
-                        pass
-            # Also check old key format if any
-            old_cached = r.get(f"quiz_progress_{telegram_id}")
-            if old_cached:
-                try:
-                    pdata = json.loads(old_cached)
-                    old_tid = pdata.get("topic", {}).get("id") if isinstance(pdata, dict) else None
-                    if old_tid and old_tid not in result:
-                        result[old_tid] = pdata
-                except Exception:
-                    pass
-            return result if result else None
+            cached = r.hget(key, topic_id) or legacy.get(topic_id)
+            return loads_cached(cached) if cached else None
+
+        result = {}
+        for tid, val in {**legacy, **r.hgetall(key)}.items():
+            try:
+                result[tid] = loads_cached(val)
+            except Exception:
+                pass
+        return result if result else None
     except Exception as e:
         logger.warning(f"Failed to get quiz progress for user {telegram_id}: {e}")
     return None
@@ -671,25 +1245,18 @@ def clear_quiz_progress(telegram_id: str | int, topic_id: str | None = None) ->
     if not r:
         return False
     try:
+        migrate_legacy_quiz_progress(r)
+        key = _quiz_progress_key(telegram_id)
+        legacy = {} if _progress_migrated else _legacy_quiz_progress(r, telegram_id)
+        # Drop legacy copies too, or a migration finishing later would bring the progress back
+        legacy_keys = [k for tid, (k, _) in legacy.items() if not topic_id or tid == topic_id]
         if topic_id:
-            r.delete(f"quiz_progress_{telegram_id}:{topic_id}")
-            # Also clean old key if matched
-            old_cached = r.get(f"quiz_progress_{telegram_id}")
-            if old_cached:
-                try:
-                    pdata = json.loads(old_cached)
-                    if isinstance(pdata, dict) and pdata.get("topic", {}).get("id") == topic_id:
-                        r.delete(f"quiz_progress_{telegram_id}")
-                except Exception:
-                    pass
-            return True
+            r.hdel(key, topic_id)
         else:
-            pattern = f"quiz_progress_{telegram_id}:*"
-            keys = list(r.scan_iter(pattern))
-            if keys:
-                r.delete(*keys)
-            r.delete(f"quiz_progress_{telegram_id}")
-            return True
+            r.delete(key)
+        if legacy_keys:
+            r.delete(*legacy_keys)
+        return True
     except Exception as e:
         logger.warning(f"Failed to clear quiz progress for user {telegram_id}: {e}")
         return False
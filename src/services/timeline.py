@@ -1,10 +1,19 @@
 """Timeline service: fetch In Progress tasks, parse content, send raw blocks to AI for intelligent analysis."""
+import hashlib
+import threading
 import httpx
 from datetime import datetime, timezone, timedelta
 from src.config.settings import Config
 from src.utils.logger import logger
 from src.services.notion import NotionService
 from src.services.ai import AIService
+from src.utils.ai_metrics import ai_stage
+from src.utils.json_extract import parse_json_array
+from src.utils.swr import read_swr, refresh_in_background, write_swr
+
+def _vn_now():
+    return datetime.now(timezone(timedelta(hours=7)))
+
 
 def _resolve_date_shortcuts(raw_text):
     """Replace @Today, @Tomorrow, @Monday (or @ThứHai) in raw_text with concrete dd/mm dates."""
@@ -27,7 +36,7 @@ def _resolve_date_shortcuts(raw_text):
         }
         if day in weekday_map:
             idx = weekday_map[day]
-            now = datetime.now(timezone(timedelta(hours=7)))
+            now = _vn_now()
             current_weekday = now.weekday()
             days_ahead = idx - current_weekday
             if days_ahead <= 0:
@@ -39,11 +48,11 @@ def _resolve_date_shortcuts(raw_text):
     result = raw_text
 
     # @Today /
-    today_str = datetime.now(timezone(timedelta(hours=7))).strftime("%d/%m %H:%M")
+    today_str = _vn_now().strftime("%d/%m %H:%M")
     result = result.replace("@Today", today_str)
 
     # @Tomorrow
-    tomorrow = datetime.now(timezone(timedelta(hours=7))) + timedelta(days=1)
+    tomorrow = _vn_now() + timedelta(days=1)
     result = result.replace("@Tomorrow", tomorrow.strftime(date_format))
 
     # @Weekday patterns
@@ -77,6 +86,52 @@ def _resolve_date_shortcuts(raw_text):
     return result
 
 
+def _timeline_content_hash(raw_data):
+    return hashlib.sha256(raw_data.encode("utf-8")).hexdigest()[:32]
+
+
+def _timeline_ai_cache_key(kind, raw_data):
+    """Cache key for an AI timeline output: today's date plus a hash of the to-do text.
+
+    The text is hashed before _resolve_date_shortcuts, which stamps @Today and
+    friends with the current minute; the date in the key covers what resolution
+    depends on, so results roll over at midnight (UTC+7).
+    """
+    return f"timeline_ai_{kind}_{_vn_now().strftime('%Y-%m-%d')}_{_timeline_content_hash(raw_data)}"
+
+
+def _read_timeline_ai_cache(r, cache_key):
+    if not r:
+        return None
+    try:
+        return r.get(cache_key)
+    except Exception as e:
+        logger.warning(f"Failed to read timeline AI cache: {e}")
+        return None
+
+
+def _cached_timeline_ai(kind, raw_data, generate, is_valid=lambda result: bool(result)):
+    """Return generate(resolved raw_data), reusing the cached output while the to-dos and the date are unchanged."""
+    from src.utils.cache import get_redis
+
+    cache_key = _timeline_ai_cache_key(kind, raw_data)
+    r = get_redis()
+    cached = _read_timeline_ai_cache(r, cache_key)
+    if cached:
+        logger.info(f"Using cached timeline AI output ({kind}), to-dos unchanged")
+        return cached
+
+    result = generate(_resolve_date_shortcuts(raw_data))
+    if r and is_valid(result):
+        now = _vn_now()
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        try:
+            r.setex(cache_key, max(1, int((midnight - now).total_seconds())), result)
+        except Exception as e:
+            logger.warning(f"Failed to write timeline AI cache: {e}")
+    return result
+
+
 def _get_source_id(client, container_id):
     resp = client.get(
         f"https://api.notion.com/v1/databases/{container_id}",
@@ -159,10 +214,13 @@ def get_timeline_summary():
         for t in task_texts
     )
 
-    # Preprocess @date shortcuts -> actual dd/mm dates
-    raw_data = _resolve_date_shortcuts(raw_data)
-
-    ai_summary = AIService().summarize_timeline(raw_data, is_raw_text=True)
+    # Preprocess @date shortcuts -> actual dd/mm dates, skipping the AI call when the to-dos are unchanged today
+    with ai_stage("timeline_summary"):
+        ai_summary = _cached_timeline_ai(
+            "summary", raw_data,
+            lambda resolved: AIService().summarize_timeline(resolved, is_raw_text=True),
+            is_valid=lambda result: bool(result) and not result.startswith("Error"),
+        )
 
     return ai_summary
 
@@ -206,23 +264,157 @@ def _parse_date_for_sorting(date_str):
     return datetime.max
 
 
+WEEKDAY_SHORT = ["T2", "T3", "T4", "T5", "T6", "T7", "CN"]
+STRUCTURED_TIMELINE_KEY = "structured_timeline"
+STRUCTURED_TIMELINE_HASH_KEY = "structured_timeline_hash"  # content hash of the to-dos the cached timeline was built from
+TIMELINE_ENRICH_PENDING_KEY = "structured_timeline_enriching"  # suffixed with the content hash being enriched
+TIMELINE_ENRICH_TIMEOUT = 300  # seconds a background enrichment may hold the pending marker
+
+_enriching = set()  # AI cache keys of the to-do sets being enriched in this process
+_enriching_lock = threading.Lock()
+
+
+def _finalize_timeline(items):
+    """Sort items chronologically and fill in missing weekdays from their dates."""
+    for item in items:
+        if not item.get("weekday"):
+            when = _parse_date_for_sorting(item.get("date"))
+            item["weekday"] = WEEKDAY_SHORT[when.weekday()] if when != datetime.max else ""
+    items.sort(key=lambda x: _parse_date_for_sorting(x.get("date")))
+    return items
+
+
+def _save_structured_timeline(r, items, content_hash):
+    from src.utils.cache import CACHE_TIMELINE_TTL
+
+    if not r:
+        return
+    try:
+        pipe = r.pipeline()
+        write_swr(pipe, STRUCTURED_TIMELINE_KEY, items, Config.TIMELINE_SOFT_TTL, CACHE_TIMELINE_TTL)
+        pipe.setex(STRUCTURED_TIMELINE_HASH_KEY, CACHE_TIMELINE_TTL, content_hash)
+        pipe.execute()
+        logger.info("Saved structured timeline to cache")
+    except Exception as e:
+        logger.warning(f"Failed to write timeline cache: {e}")
+
+
+def _current_timeline_hash(r):
+    try:
+        return r.get(STRUCTURED_TIMELINE_HASH_KEY)
+    except Exception as e:
+        logger.warning(f"Failed to read timeline content hash: {e}")
+        return None
+
+
+def _parse_timeline_json(ai_resp):
+    items = parse_json_array(ai_resp or "")
+    return _finalize_timeline([i for i in items if isinstance(i, dict)]) if items else None
+
+
+def _enrich_structured_timeline(raw_data):
+    """Ask the AI for the enriched timeline and swap it into the cache; the deterministic one stays on failure.
+
+    The swap only happens while the cached timeline still belongs to the same to-dos,
+    so a slow enrichment of an older set never overwrites a newer timeline.
+    """
+    from src.utils.cache import get_redis
+
+    r = get_redis()
+    content_hash = _timeline_content_hash(raw_data)
+    try:
+        with ai_stage("timeline_json"):
+            ai_resp = _cached_timeline_ai(
+                "json", raw_data, lambda resolved: AIService().generate_timeline_json(resolved),
+                is_valid=lambda result: parse_json_array(result or "") is not None,
+            )
+        enriched = _parse_timeline_json(ai_resp)
+        if enriched and r and _current_timeline_hash(r) != content_hash:
+            logger.info("To-dos changed while the AI enrichment ran, discarding the outdated enriched timeline")
+        elif enriched:
+            _save_structured_timeline(r, enriched, content_hash)
+            logger.info(f"✨ Swapped AI-enriched timeline into cache ({len(enriched)} items)")
+        else:
+            logger.warning("AI timeline enrichment returned no usable items, keeping deterministic timeline")
+    except Exception as e:
+        logger.error(f"❌ Structured timeline AI enrichment failed: {e}. Keeping deterministic timeline.")
+    finally:
+        if r:
+            try:
+                r.delete(f"{TIMELINE_ENRICH_PENDING_KEY}_{content_hash}")
+            except Exception as e:
+                logger.warning(f"Failed to clear timeline enrichment marker: {e}")
+
+
+def _start_timeline_enrichment(r, raw_data):
+    if not r:
+        # Without a cache the enriched timeline could never be served: skip the AI call
+        return
+    key = _timeline_ai_cache_key("json", raw_data)
+    with _enriching_lock:
+        if key in _enriching:
+            return
+        _enriching.add(key)
+    try:
+        r.set(f"{TIMELINE_ENRICH_PENDING_KEY}_{_timeline_content_hash(raw_data)}", "1", ex=TIMELINE_ENRICH_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Failed to set timeline enrichment marker: {e}")
+
+    def run():
+        try:
+            _enrich_structured_timeline(raw_data)
+        finally:
+            with _enriching_lock:
+                _enriching.discard(key)
+
+    threading.Thread(target=run, name="timeline-enrich", daemon=True).start()
+
+
+def is_timeline_enrichment_pending() -> bool:
+    """True while a background AI enrichment of the currently cached timeline's to-dos is running."""
+    from src.utils.cache import get_redis
+
+    r = get_redis()
+    if r:
+        try:
+            content_hash = r.get(STRUCTURED_TIMELINE_HASH_KEY)
+            return bool(content_hash and r.exists(f"{TIMELINE_ENRICH_PENDING_KEY}_{content_hash}"))
+        except Exception as e:
+            logger.warning(f"Failed to read timeline enrichment marker: {e}")
+    return bool(_enriching)
+
+
 def get_structured_timeline(force_refresh: bool = False):
-    """Fetch tasks and return structured JSON representation of deadlines using AI or a Python fallback."""
-    from src.utils.block_parser import fetch_blocks_recursive, parse_block
-    from src.utils.cache import get_redis, CACHE_TIMELINE_TTL
-    import json
-    import re
+    """Fetch tasks and return structured JSON representation of deadlines.
+
+    The deterministic timeline is returned straight after the Notion fetch; the
+    AI-enriched version replaces it in the cache once a background job finishes,
+    unless an enriched result for the same to-dos is already cached today.
+    """
+    return get_structured_timeline_snapshot(force_refresh=force_refresh)[0]
+
+
+def get_structured_timeline_snapshot(force_refresh: bool = False):
+    """Return (timeline, stale); a cached timeline past TIMELINE_SOFT_TTL is served at once and rebuilt in the background."""
+    from src.utils.cache import get_redis
 
-    cache_key = "structured_timeline"
     r = get_redis()
     if r and not force_refresh:
         try:
-            cached = r.get(cache_key)
-            if cached:
-                logger.info("Using cached structured timeline")
-                return json.loads(cached)
+            cached, stale = read_swr(r.get(STRUCTURED_TIMELINE_KEY))
+            if cached is not None:
+                if stale:
+                    refresh_in_background(r, STRUCTURED_TIMELINE_KEY, lambda: _build_structured_timeline(r), name="timeline-refresh")
+                logger.info(f"Using cached structured timeline (stale={stale})")
+                return cached, stale
         except Exception as e:
             logger.warning(f"Failed to read timeline cache: {e}")
+    return _build_structured_timeline(r), False
+
+
+def _build_structured_timeline(r):
+    from src.utils.block_parser import fetch_blocks_recursive, parse_block
+    import re
 
     tasks = fetch_in_progress_tasks()
     if not tasks:
@@ -231,6 +423,7 @@ def get_structured_timeline(force_refresh: bool = False):
     # Gather raw blocks per task
     task_texts = []
     structured_fallback = []
+    now = _vn_now()
     with httpx.Client(timeout=60.0) as client:
         for task in tasks:
             raw = fetch_blocks_recursive(client, NotionService.headers, task["page_id"])
@@ -242,17 +435,20 @@ def get_structured_timeline(force_refresh: bool = False):
                     if text:
                         lines.append(text)
 
-                        # Build fallback item in parallel
+                        # Build the deterministic item in parallel
                         resolved_text = _resolve_date_shortcuts(text)
                         deadline = pb.get("deadline")
-                        urgency = "normal"
-                        if "gấp" in text.lower() or "deadline" in text.lower() or "🔴" in text:
-                            urgency = "high"
 
-                        # Guess weekday and clean date representation (ponytail: keep simple parser, upgrade if needed)
                         date_match = re.search(r'(\d{2}/\d{2}(?:\s+\d{2}:\d{2})?)', resolved_text)
                         display_date = date_match.group(1) if date_match else (deadline[:10] if deadline else "")
 
+                        urgency = "normal"
+                        due = _parse_date_for_sorting(display_date)
+                        if "gấp" in text.lower() or "deadline" in text.lower() or "🔴" in text:
+                            urgency = "high"
+                        elif due != datetime.max and due - now.replace(tzinfo=None) <= timedelta(days=2):
+                            urgency = "high"
+
                         structured_fallback.append({
                             "date": display_date,
                             "course": task["name"],
@@ -275,33 +471,15 @@ def get_structured_timeline(force_refresh: bool = False):
         f"## {t['task_name']} (PageID: {t['page_id']})\n" + "\n".join(f"- {b}" for b in t["blocks"])
         for t in task_texts
     )
-    raw_data = _resolve_date_shortcuts(raw_data)
 
-    result_list = None
-    try:
-        ai_resp = AIService().generate_timeline_json(raw_data)
-        # Parse JSON block from AI output
-        match = re.search(r'\[\s*\{.*\}\s*\]', ai_resp, re.DOTALL)
-        if match:
-            parsed = json.loads(match.group(0))
-            if isinstance(parsed, list) and len(parsed) > 0:
-                result_list = parsed
-    except Exception as e:
-        logger.error(f"❌ Structured timeline AI generation failed: {e}. Using fallback.")
-
-    if result_list is None:
-        result_list = structured_fallback
-
-    # Chronologically sort the list
-    result_list.sort(key=lambda x: _parse_date_for_sorting(x.get("date")))
-
-    if r:
-        try:
-            r.setex(cache_key, CACHE_TIMELINE_TTL, json.dumps(result_list))
-            logger.info("Saved structured timeline to cache")
-        except Exception as e:
-            logger.warning(f"Failed to write timeline cache: {e}")
+    # Same to-dos already enriched today: serve that without waiting on the AI
+    content_hash = _timeline_content_hash(raw_data)
+    enriched = _parse_timeline_json(_read_timeline_ai_cache(r, _timeline_ai_cache_key("json", raw_data)))
+    if enriched:
+        _save_structured_timeline(r, enriched, content_hash)
+        return enriched
 
+    result_list = _finalize_timeline(structured_fallback)
+    _save_structured_timeline(r, result_list, content_hash)
+    _start_timeline_enrichment(r, raw_data)
     return result_list
-
-
@@ -0,0 +1,206 @@
+"""Offline batch submission of LLM prompts, used by the nightly quiz refresh instead of the interactive path."""
+import io
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from src.config.settings import Config
+from src.utils.ai_client import get_ai_client, llm_limiter
+from src.utils.logger import logger
+
+
+def _chat_body(prompt, model):
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "reasoning_effort": Config.REASONING_EFFORT,
+    }
+
+
+class OpenAIBatchBackend:
+    """Uploads requests as a JSONL file to the router's /v1/batches endpoint and reads back the output file."""
+
+    def __init__(self, client=None):
+        self.client = client or get_ai_client()
+
+    def submit(self, requests: list[dict]) -> str:
+        lines = [
+            json.dumps({"custom_id": req["custom_id"], "method": "POST", "url": "/v1/chat/completions", "body": _chat_body(req["prompt"], req["model"])}, ensure_ascii=False)
+            for req in requests
+        ]
+        upload = self.client.files.create(file=("quiz_batch.jsonl", io.BytesIO("\n".join(lines).encode("utf-8"))), purpose="batch")
+        batch = self.client.batches.create(input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window="24h")
+        return batch.id
+
+    def poll(self, batch_id: str) -> dict | None:
+        """Return {custom_id: {"content", "usage", "error"}} once the batch has finished, else None."""
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status in ("validating", "in_progress", "finalizing"):
+            return None
+        if batch.status != "completed":
+            raise RuntimeError(f"Batch {batch_id} ended with status {batch.status}")
+
+        results = {}
+        for file_id in (batch.output_file_id, getattr(batch, "error_file_id", None)):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                body = (item.get("response") or {}).get("body") or {}
+                choices = body.get("choices") or []
+                results[item["custom_id"]] = {
+                    "content": choices[0]["message"]["content"] if choices else None,
+                    "usage": body.get("usage") or {},
+                    "error": item.get("error"),
+                }
+        return results
+
+
+class LocalBatchBackend:
+    """Stand-in for a batch endpoint: works through a batch in the background with low concurrency.
+
+    Each request takes a background slot from the shared LLM limiter, so it counts
+    against the router's concurrency and only runs when no interactive call is
+    waiting. complete_fn(prompt, model) ->
+    (content, usage) can be swapped out in tests.
+    """
+
+    def __init__(self, complete_fn=None, concurrency=None):
+        self.complete_fn = complete_fn or self._complete
+        self.executor = ThreadPoolExecutor(max_workers=max(1, concurrency or Config.AI_BATCH_LOCAL_CONCURRENCY), thread_name_prefix="ai-batch")
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _complete(prompt, model):
+        response = get_ai_client().chat.completions.create(stream=False, **_chat_body(prompt, model))
+        usage = getattr(response, "usage", None)
+        return response.choices[0].message.content, {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0),
+            "completion_tokens": getattr(usage, "completion_tokens", 0),
+        }
+
+    def _run_one(self, req):
+        try:
+            with llm_limiter.slot(background=True):
+                content, usage = self.complete_fn(req["prompt"], req["model"])
+            return {"content": content, "usage": usage or {}, "error": None}
+        except Exception as e:
+            return {"content": None, "usage": {}, "error": str(e)}
+
+    def submit(self, requests: list[dict]) -> str:
+        batch_id = f"local_{uuid.uuid4().hex}"
+        futures = {req["custom_id"]: self.executor.submit(self._run_one, req) for req in requests}
+        with self._lock:
+            self._batches[batch_id] = futures
+        return batch_id
+
+    def poll(self, batch_id: str) -> dict | None:
+        with self._lock:
+            futures = self._batches[batch_id]
+        if not all(f.done() for f in futures.values()):
+            return None
+        with self._lock:
+            self._batches.pop(batch_id, None)
+        return {custom_id: f.result() for custom_id, f in futures.items()}
+
+
+def get_batch_backend():
+    if Config.AI_BATCH_BACKEND == "openai":
+        return OpenAIBatchBackend()
+    return LocalBatchBackend()
+
+
+class BatchCollector:
+    """Gathers prompts from many concurrent callers into batches and resolves each caller's Future.
+
+    A batch is submitted once AI_BATCH_MAX_SIZE prompts are waiting or
+    AI_BATCH_WINDOW seconds after the first one arrived; a poller thread then
+    waits for it to finish. Results are dicts with "content", "usage", "error"
+    and "latency".
+    """
+
+    def __init__(self, backend=None, max_size=None, window=None, poll_interval=None):
+        self.backend = backend or get_batch_backend()
+        self.max_size = max(1, max_size or Config.AI_BATCH_MAX_SIZE)
+        self.window = Config.AI_BATCH_WINDOW if window is None else window
+        self.poll_interval = Config.AI_BATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+        self._cond = threading.Condition()
+        self._pending = []  # (custom_id, prompt, model, future)
+        self._first_at = None
+        self._closed = False
+        self.batches_submitted = 0
+        self._flusher = threading.Thread(target=self._flush_loop, name="ai-batch-flusher", daemon=True)
+        self._flusher.start()
+
+    def submit(self, prompt, model) -> Future:
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BatchCollector is closed")
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append((uuid.uuid4().hex, prompt, model, future))
+            self._cond.notify_all()
+        return future
+
+    def close(self):
+        """Flush what is still pending and stop accepting prompts."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+
+    def _take_batch(self):
+        with self._cond:
+            while True:
+                if self._pending and (len(self._pending) >= self.max_size or self._closed or time.monotonic() - self._first_at >= self.window):
+                    batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+                    self._first_at = time.monotonic() if self._pending else None
+                    return batch
+                if self._closed:
+                    return None
+                timeout = None if not self._pending else max(0.0, self.window - (time.monotonic() - self._first_at))
+                self._cond.wait(timeout)
+
+    def _flush_loop(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            try:
+                batch_id = self.backend.submit([{"custom_id": cid, "prompt": prompt, "model": model} for cid, prompt, model, _ in batch])
+            except Exception as e:
+                logger.error(f"❌ Batch submission failed: {e}")
+                for *_, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches_submitted += 1
+            logger.info(f"📦 Submitted AI batch {batch_id} with {len(batch)} prompts")
+            threading.Thread(target=self._await_batch, args=(batch_id, batch, time.monotonic()), name="ai-batch-poller", daemon=True).start()
+
+    def _await_batch(self, batch_id, batch, submitted_at):
+        deadline = submitted_at + Config.AI_BATCH_TIMEOUT
+        try:
+            while True:
+                results = self.backend.poll(batch_id)
+                if results is not None:
+                    break
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Batch {batch_id} did not finish within {Config.AI_BATCH_TIMEOUT}s")
+                time.sleep(self.poll_interval)
+        except Exception as e:
+            logger.error(f"❌ AI batch {batch_id} failed: {e}")
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+
+        latency = time.monotonic() - submitted_at
+        logger.info(f"📦 AI batch {batch_id} finished in {latency:.1f}s")
+        for cid, _, _, future in batch:
+            result = results.get(cid) or {"content": None, "usage": {}, "error": "missing from batch output"}
+            future.set_result({**result, "latency": latency})
@@ -0,0 +1,247 @@
+"""Process-wide OpenAI clients and a FIFO limiter capping in-flight LLM calls."""
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+from src.config.settings import Config
+from src.utils.logger import logger
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncOpenAI (httpx async pools are loop-bound)
+_ai_loop = None
+_ai_loop_lock = threading.Lock()
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=Config.AI_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.AI_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=60.0,
+    )
+
+
+def get_ai_client() -> OpenAI | None:
+    """Return the shared sync OpenAI client, creating it lazily."""
+    global _client
+    if _client is None and Config.USE_CUSTOM_AI:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(
+                    base_url=Config.CUSTOM_AI_BASE_URL,
+                    api_key=Config.CUSTOM_AI_API_KEY,
+                    timeout=Config.AI_REQUEST_TIMEOUT,
+                    http_client=httpx.Client(limits=_http_limits(), timeout=Config.AI_REQUEST_TIMEOUT),
+                )
+    return _client
+
+
+def get_async_ai_client() -> AsyncOpenAI | None:
+    """Return the shared AsyncOpenAI client for the running event loop, creating it lazily."""
+    if not Config.USE_CUSTOM_AI:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            base_url=Config.CUSTOM_AI_BASE_URL,
+            api_key=Config.CUSTOM_AI_API_KEY,
+            timeout=Config.AI_REQUEST_TIMEOUT,
+            http_client=httpx.AsyncClient(limits=_http_limits(), timeout=Config.AI_REQUEST_TIMEOUT),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def get_ai_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop that runs async AI pipelines, starting its thread lazily."""
+    global _ai_loop
+    if _ai_loop is None:
+        with _ai_loop_lock:
+            if _ai_loop is None:
+                loop = asyncio.new_event_loop()
+                # Blocking work offloaded from pipelines (Notion, sync AI backends) runs here
+                loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=Config.AI_LOOP_THREADS, thread_name_prefix="ai-loop-io"))
+                threading.Thread(target=loop.run_forever, name="ai-event-loop", daemon=True).start()
+                _ai_loop = loop
+    return _ai_loop
+
+
+def submit_ai_coroutine(coro) -> concurrent.futures.Future:
+    """Schedule coro on the shared AI loop with the caller's contextvars; returns a thread-safe Future."""
+    loop = get_ai_loop()
+    result = concurrent.futures.Future()
+
+    def on_done(task):
+        if result.cancelled():
+            return
+        if task.cancelled():
+            result.cancel()
+        elif task.exception() is not None:
+            result.set_exception(task.exception())
+        else:
+            result.set_result(task.result())
+
+    def start():
+        # Runs inside the caller's copied context, which create_task then inherits
+        loop.create_task(coro).add_done_callback(on_done)
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    return result
+
+
+def run_ai_coroutine(coro):
+    """Run coro on the shared AI loop and block the calling thread until it finishes."""
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is not None and running is _ai_loop:
+        coro.close()
+        raise RuntimeError("run_ai_coroutine() called from the AI event loop; await the coroutine instead")
+    return submit_ai_coroutine(coro).result()
+
+
+class _ThreadWaiter:
+    def __init__(self):
+        self.event = threading.Event()
+
+    def grant(self):
+        self.event.set()
+
+
+class _AsyncWaiter:
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def grant(self):
+        def _set():
+            if not self.future.done():
+                self.future.set_result(True)
+        self.loop.call_soon_threadsafe(_set)
+
+
+class LLMLimiter:
+    """FIFO concurrency gate shared by sync threads and asyncio tasks.
+
+    A released slot is handed directly to the longest-waiting caller, so bursts
+    drain in arrival order instead of racing each other at the router. Background
+    callers (offline batch work) queue separately and only get a slot when no
+    interactive caller is waiting; their waits are left out of the stats.
+    """
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max(1, max_in_flight)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = deque()
+        self._background_waiters = deque()
+        self._wait_samples = deque(maxlen=500)
+        self._total_calls = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _try_enter(self, waiter, background=False) -> bool:
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._waiters and not (background and self._background_waiters):
+                self._in_flight += 1
+                return True
+            (self._background_waiters if background else self._waiters).append(waiter)
+            return False
+
+    def _cancel(self, waiter) -> bool:
+        """Drop a waiter that gave up; returns False if it was already granted a slot."""
+        with self._lock:
+            for queue in (self._waiters, self._background_waiters):
+                try:
+                    queue.remove(waiter)
+                    return True
+                except ValueError:
+                    pass
+            return False
+
+    def _record(self, waited: float):
+        with self._lock:
+            self._total_calls += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            self._wait_samples.append(waited)
+        if waited >= 1.0:
+            logger.info(f"⏳ LLM call waited {waited:.2f}s in queue ({self._in_flight}/{self.max_in_flight} in flight, {len(self._waiters)} queued)")
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # Hand the slot over without decrementing so nobody can jump the queue
+                self._waiters.popleft().grant()
+            elif self._background_waiters:
+                self._background_waiters.popleft().grant()
+            else:
+                self._in_flight -= 1
+
+    @contextmanager
+    def slot(self, background=False):
+        start = time.monotonic()
+        waiter = _ThreadWaiter()
+        if not self._try_enter(waiter, background=background):
+            waiter.event.wait()
+        if not background:
+            self._record(time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self):
+        start = time.monotonic()
+        waiter = _AsyncWaiter(asyncio.get_running_loop())
+        if not self._try_enter(waiter):
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if not self._cancel(waiter):
+                    self.release()
+                raise
+        self._record(time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = sorted(self._wait_samples)
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+                "background_queued": len(self._background_waiters),
+                "total_calls": self._total_calls,
+                "avg_wait_s": round(self._total_wait / self._total_calls, 4) if self._total_calls else 0.0,
+                "p95_wait_s": round(p95, 4),
+                "max_wait_s": round(self._max_wait, 4),
+            }
+
+
+llm_limiter = LLMLimiter(Config.AI_MAX_CONCURRENCY)
+
+
+def llm_slot():
+    """Context manager holding one process-wide LLM concurrency slot (sync callers)."""
+    return llm_limiter.slot()
+
+
+def llm_slot_async():
+    """Async context manager holding one process-wide LLM concurrency slot."""
+    return llm_limiter.slot_async()
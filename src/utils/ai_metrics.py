@@ -0,0 +1,140 @@
+"""LLM call accounting: per-request usage trackers, pipeline stage timing and rolling aggregates."""
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_current_stage = contextvars.ContextVar("ai_stage", default="other")
+_current_tracker = contextvars.ContextVar("ai_usage_tracker", default=None)
+
+_recent_calls = deque(maxlen=2000)  # rolling window backing get_ai_metrics()
+_recent_lock = threading.Lock()
+
+
+def _empty_stage():
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "llm_seconds": 0.0, "fallbacks": 0, "errors": 0, "seconds": 0.0}
+
+
+class UsageTracker:
+    """Collects every LLM call and stage duration made while it is the active tracker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.stages = {}
+
+    def add_call(self, call: dict):
+        with self._lock:
+            st = self.stages.setdefault(call["stage"], _empty_stage())
+            st["calls"] += 1
+            st["prompt_tokens"] += call["prompt_tokens"]
+            st["completion_tokens"] += call["completion_tokens"]
+            st["llm_seconds"] += call["latency"]
+            st["fallbacks"] += int(call["fallback"])
+            st["errors"] += int(not call["success"])
+
+    def add_stage_time(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages.setdefault(stage, _empty_stage())["seconds"] += seconds
+
+    def summary(self) -> dict:
+        with self._lock:
+            stages = {
+                name: {k: round(v, 3) if isinstance(v, float) else v for k, v in st.items()}
+                for name, st in self.stages.items()
+            }
+        return {
+            "total_seconds": round(time.monotonic() - self._started, 3),
+            "llm_calls": sum(st["calls"] for st in stages.values()),
+            "prompt_tokens": sum(st["prompt_tokens"] for st in stages.values()),
+            "completion_tokens": sum(st["completion_tokens"] for st in stages.values()),
+            "fallbacks": sum(st["fallbacks"] for st in stages.values()),
+            "stages": stages,
+        }
+
+
+@contextmanager
+def track_usage():
+    """Make a fresh UsageTracker active for the enclosed block (and threads started with run_in_context)."""
+    tracker = UsageTracker()
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+
+
+@contextmanager
+def ai_stage(name: str):
+    """Label LLM calls made inside the block with a pipeline stage and time the stage."""
+    token = _current_stage.set(name)
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+        tracker = _current_tracker.get()
+        if tracker:
+            tracker.add_stage_time(name, time.monotonic() - start)
+
+
+def current_stage() -> str:
+    return _current_stage.get()
+
+
+def run_in_context(executor, fn, *args, **kwargs):
+    """executor.submit() that carries the caller's stage and tracker into the worker thread."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def record_llm_call(model, prompt_tokens, completion_tokens, latency, fallback=False, success=True, stage=None):
+    call = {
+        "ts": time.time(),
+        "model": model,
+        "stage": stage or _current_stage.get(),
+        "prompt_tokens": prompt_tokens or 0,
+        "completion_tokens": completion_tokens or 0,
+        "latency": latency,
+        "fallback": fallback,
+        "success": success,
+    }
+    with _recent_lock:
+        _recent_calls.append(call)
+    tracker = _current_tracker.get()
+    if tracker:
+        tracker.add_call(call)
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def get_ai_metrics(window_seconds: int = 3600) -> dict:
+    """Aggregate recent LLM calls per (stage, model) over the last window_seconds."""
+    cutoff = time.time() - window_seconds
+    with _recent_lock:
+        calls = [c for c in _recent_calls if c["ts"] >= cutoff]
+
+    groups = {}
+    for c in calls:
+        groups.setdefault((c["stage"], c["model"]), []).append(c)
+
+    aggregates = []
+    for (stage, model), items in sorted(groups.items()):
+        latencies = [c["latency"] for c in items]
+        aggregates.append({
+            "stage": stage,
+            "model": model,
+            "calls": len(items),
+            "errors": sum(1 for c in items if not c["success"]),
+            "fallbacks": sum(1 for c in items if c["fallback"]),
+            "prompt_tokens": sum(c["prompt_tokens"] for c in items),
+            "completion_tokens": sum(c["completion_tokens"] for c in items),
+            "latency_p50_s": round(_percentile(latencies, 0.5), 3),
+            "latency_p95_s": round(_percentile(latencies, 0.95), 3),
+        })
+    return {"window_seconds": window_seconds, "total_calls": len(calls), "by_stage_model": aggregates}
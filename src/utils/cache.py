@@ -1,27 +1,126 @@
 """Redis connection singleton and cache TTL constants."""
+import threading
+
 import redis
 from src.config.settings import Config
+from src.utils.cache_backends import RELEASE_LOCK_SCRIPT
+from src.utils.logger import logger
 
 _client = None
+_client_lock = threading.Lock()
 
 
-def get_redis() -> redis.Redis | None:
-    """Return a shared Redis client instance, creating it lazily."""
-    global _client
-    if _client is None and Config.REDIS_URL:
-        _client = redis.from_url(
+def _create_client():
+    backend = Config.CACHE_BACKEND
+    if backend == "auto":
+        backend = "redis" if Config.REDIS_URL else "memory"
+
+    if backend == "redis":
+        if not Config.REDIS_URL:
+            logger.warning("CACHE_BACKEND=redis but REDIS_URL is not set, caching disabled")
+            return None
+        client = redis.from_url(
             Config.REDIS_URL,
             socket_connect_timeout=5,
             socket_timeout=5,
             decode_responses=True,
         )
+        if Config.LOCAL_CACHE_ENABLED:
+            from src.utils.local_cache import TieredRedis
+            client = TieredRedis(client, LOCAL_CACHE_FAMILIES, excluded_prefixes=LOCAL_CACHE_EXCLUDED_PREFIXES)
+        return client
+
+    from src.utils.cache_backends import MemoryCacheBackend, SQLiteCacheBackend
+    if backend == "memory":
+        return MemoryCacheBackend()
+    if backend == "sqlite":
+        return SQLiteCacheBackend(Config.CACHE_SQLITE_PATH)
+    if backend != "none":
+        logger.warning(f"Unknown CACHE_BACKEND '{backend}', caching disabled")
+    return None
+
+
+def get_redis() -> redis.Redis | None:
+    """Return the shared cache client selected by CACHE_BACKEND, creating it lazily.
+
+    This is a Redis client (wrapped in a TieredRedis with LOCAL_CACHE_ENABLED so hot
+    keys are served from process memory) or a Redis-compatible in-memory / SQLite
+    backend from cache_backends. None only when caching is disabled.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_client()
     return _client
 
 
+def release_lock(r, key: str, token: str) -> bool:
+    """Delete a lock taken with SET NX only if it still holds our token."""
+    return bool(r.eval(RELEASE_LOCK_SCRIPT, 1, key, token))
+
+
+def local_cache_stats() -> dict:
+    """Hit ratios of the in-process tier and Redis per key family ({} when the local tier is off)."""
+    stats = getattr(_client, "stats", None)
+    return stats() if callable(stats) else {}
+
+
+# Namespace version counters: cached keys embed their namespace's generation, so
+# invalidating a whole namespace is a single INCR and the orphaned keys just expire
+CACHE_GENERATION_PREFIX = "cache_gen_"
+
+
+def _generation_key(namespace: str) -> str:
+    return f"{CACHE_GENERATION_PREFIX}{namespace}"
+
+
+def cache_generation(r, namespace: str) -> int:
+    """Current generation of a cache namespace (0 until it is first invalidated)."""
+    value = r.get(_generation_key(namespace))
+    if value is None:
+        # Materialize the counter so the local tier can serve it from now on
+        r.set(_generation_key(namespace), 0, nx=True)
+        return 0
+    return int(value)
+
+
+def cache_generations(r, namespaces: list[str]) -> list[int]:
+    """Generations of several namespaces in one pipelined round trip."""
+    if not namespaces:
+        return []
+    pipe = r.pipeline()
+    for namespace in namespaces:
+        pipe.get(_generation_key(namespace))
+    return [int(v) if v is not None else 0 for v in pipe.execute()]
+
+
+def bump_cache_generation(r, namespace: str) -> int:
+    """Invalidate every key of a namespace at once by moving it to a new generation."""
+    return r.incr(_generation_key(namespace))
+
+
+def versioned_key(base: str, generation: int) -> str:
+    """Cache key for a generation; generation 0 keeps the unversioned key so existing caches stay valid."""
+    return f"{base}_v{generation}" if generation else base
+
+
 # Cache TTL constants (seconds)
 CACHE_PAGE_TITLE_TTL = 30 * 24 * 3600      # 30 days
-CACHE_CANDIDATES_TTL = 24 * 3600            # 24 hours
+CACHE_CANDIDATES_TTL = 7 * 24 * 3600        # 7 days; served stale past Config.CANDIDATES_SOFT_TTL
 CACHE_QUIZ_TTL = 14 * 24 * 3600             # 14 days
-CACHE_TIMELINE_TTL = 24 * 3600             # 24 hours
+CACHE_TIMELINE_TTL = 3 * 24 * 3600         # 3 days; served stale past Config.TIMELINE_SOFT_TTL
 CACHE_QUIZ_PROGRESS_TTL = 7 * 24 * 3600     # 7 days
-LOCK_QUIZ_TTL = 120                          # 2 minutes
\ No newline at end of file
+CACHE_QUICK_REVIEW_SESSION_TTL = 12 * 3600  # 12 hours
+LOCK_QUIZ_TTL = 120                          # 2 minutes
+# In-process tier in front of Redis: family -> (key prefix, local TTL seconds, max entries)
+LOCAL_CACHE_FAMILIES = {
+    "page_title": ("page_title_", 3600, 2000),
+    "candidates": ("study_candidates", 60, 32),
+    "timeline": ("structured_timeline", 30, 8),
+    "timeline_ai": ("timeline_ai_", 300, 32),
+    "quiz": ("quiz_", 300, 256),
+    "generation": (CACHE_GENERATION_PREFIX, 30, 1024),
+}
+# Keys under those prefixes that are locks, counters or per-user state and must always hit Redis
+LOCAL_CACHE_EXCLUDED_PREFIXES = ("quiz_lock_", "quiz_progress_", "quiz_bank_", "quiz_warmer_lock", "quiz_last_config", "structured_timeline_enriching", "structured_timeline_hash")
@@ -0,0 +1,456 @@
+"""Redis-compatible cache backends for running without Redis: in-process memory and an on-disk SQLite file.
+
+Both implement the subset of redis-py commands the services use (strings, hashes,
+lists, TTLs, NX locks, pipelines) with decode_responses=True semantics, so
+get_redis() can hand out either one in place of a Redis client. Only the
+memory backend has pub/sub; callers fall back to polling without it.
+"""
+import fnmatch
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Compare-and-delete used to release locks; the only script the local backends can run
+RELEASE_LOCK_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+
+class CacheBackendError(Exception):
+    """A command the local backends do not support, or one applied to a key of the wrong type."""
+
+
+class _Entry:
+    __slots__ = ("kind", "data", "expires_at")
+
+    def __init__(self, kind, data, expires_at=None):
+        self.kind = kind  # "string", "hash" or "list"
+        self.data = data
+        self.expires_at = expires_at
+
+    def expired(self, now):
+        return self.expires_at is not None and self.expires_at <= now
+
+
+class CacheBackend:
+    """Redis command semantics on top of a key -> _Entry store; subclasses provide storage and atomicity."""
+
+    name = "base"
+
+    # Storage primitives (always called inside _transaction)
+
+    @contextmanager
+    def _transaction(self):
+        raise NotImplementedError
+
+    def _load(self, key):
+        raise NotImplementedError
+
+    def _store(self, key, entry):
+        raise NotImplementedError
+
+    def _remove(self, key):
+        raise NotImplementedError
+
+    def _keys(self, now):
+        """Keys that have not expired at time now."""
+        raise NotImplementedError
+
+    # Helpers
+
+    def _live(self, key):
+        entry = self._load(key)
+        if entry is not None and entry.expired(time.time()):
+            self._remove(key)
+            return None
+        return entry
+
+    def _typed(self, key, kind):
+        entry = self._live(key)
+        if entry is not None and entry.kind != kind:
+            raise CacheBackendError(f"WRONGTYPE Operation against a key holding the wrong kind of value: {key}")
+        return entry
+
+    @staticmethod
+    def _str(value):
+        if isinstance(value, bytes):
+            return value.decode("utf-8")
+        return value if isinstance(value, str) else str(value)
+
+    # Server
+
+    def ping(self):
+        return True
+
+    # Strings
+
+    def get(self, key):
+        with self._transaction():
+            entry = self._typed(key, "string")
+            return entry.data if entry else None
+
+    def set(self, key, value, ex=None, px=None, nx=False, xx=False):
+        with self._transaction():
+            exists = self._live(key) is not None
+            if (nx and exists) or (xx and not exists):
+                return None
+            ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+            self._store(key, _Entry("string", self._str(value), time.time() + ttl if ttl is not None else None))
+            return True
+
+    def setex(self, key, time_seconds, value):
+        return self.set(key, value, ex=time_seconds)
+
+    def getdel(self, key):
+        with self._transaction():
+            entry = self._typed(key, "string")
+            if entry is None:
+                return None
+            self._remove(key)
+            return entry.data
+
+    def incr(self, key, amount=1):
+        with self._transaction():
+            entry = self._typed(key, "string")
+            value = int(entry.data if entry else 0) + amount
+            self._store(key, _Entry("string", str(value), entry.expires_at if entry else None))
+            return value
+
+    # Keys
+
+    def delete(self, *keys):
+        with self._transaction():
+            removed = 0
+            for key in keys:
+                if self._live(key) is not None:
+                    self._remove(key)
+                    removed += 1
+            return removed
+
+    def exists(self, *keys):
+        with self._transaction():
+            return sum(1 for key in keys if self._live(key) is not None)
+
+    def expire(self, key, seconds):
+        with self._transaction():
+            entry = self._live(key)
+            if entry is None:
+                return False
+            entry.expires_at = time.time() + seconds
+            self._store(key, entry)
+            return True
+
+    def ttl(self, key):
+        with self._transaction():
+            entry = self._live(key)
+            if entry is None:
+                return -2
+            if entry.expires_at is None:
+                return -1
+            return max(0, int(round(entry.expires_at - time.time())))
+
+    def scan_iter(self, match=None, count=None, _type=None):
+        with self._transaction():
+            keys = self._keys(time.time())
+        return iter([k for k in keys if match is None or fnmatch.fnmatchcase(k, match)])
+
+    # Hashes
+
+    def hget(self, key, field):
+        with self._transaction():
+            entry = self._typed(key, "hash")
+            return entry.data.get(self._str(field)) if entry else None
+
+    def hgetall(self, key):
+        with self._transaction():
+            entry = self._typed(key, "hash")
+            return dict(entry.data) if entry else {}
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        with self._transaction():
+            entry = self._typed(key, "hash") or _Entry("hash", {})
+            items = dict(mapping or {})
+            if field is not None:
+                items[field] = value
+            added = 0
+            for f, v in items.items():
+                f = self._str(f)
+                added += int(f not in entry.data)
+                entry.data[f] = self._str(v)
+            self._store(key, entry)
+            return added
+
+    def hsetnx(self, key, field, value):
+        with self._transaction():
+            entry = self._typed(key, "hash") or _Entry("hash", {})
+            field = self._str(field)
+            if field in entry.data:
+                return 0
+            entry.data[field] = self._str(value)
+            self._store(key, entry)
+            return 1
+
+    def hdel(self, key, *fields):
+        with self._transaction():
+            entry = self._typed(key, "hash")
+            if entry is None:
+                return 0
+            removed = sum(1 for f in fields if entry.data.pop(self._str(f), None) is not None)
+            if entry.data:
+                self._store(key, entry)
+            else:
+                self._remove(key)
+            return removed
+
+    def hincrby(self, key, field, amount=1):
+        with self._transaction():
+            entry = self._typed(key, "hash") or _Entry("hash", {})
+            field = self._str(field)
+            value = int(entry.data.get(field, 0)) + amount
+            entry.data[field] = str(value)
+            self._store(key, entry)
+            return value
+
+    # Lists
+
+    def _push(self, key, values, left):
+        with self._transaction():
+            entry = self._typed(key, "list") or _Entry("list", [])
+            values = [self._str(v) for v in values]
+            entry.data = list(reversed(values)) + entry.data if left else entry.data + values
+            self._store(key, entry)
+            return len(entry.data)
+
+    def rpush(self, key, *values):
+        return self._push(key, values, left=False)
+
+    def lpush(self, key, *values):
+        return self._push(key, values, left=True)
+
+    def lrange(self, key, start, end):
+        with self._transaction():
+            entry = self._typed(key, "list")
+            if entry is None:
+                return []
+            return entry.data[start:None if end == -1 else end + 1]
+
+    def ltrim(self, key, start, end):
+        with self._transaction():
+            entry = self._typed(key, "list")
+            if entry is not None:
+                entry.data = entry.data[start:None if end == -1 else end + 1]
+                if entry.data:
+                    self._store(key, entry)
+                else:
+                    self._remove(key)
+            return True
+
+    def llen(self, key):
+        with self._transaction():
+            entry = self._typed(key, "list")
+            return len(entry.data) if entry else 0
+
+    # Scripts and pub/sub
+
+    def eval(self, script, numkeys, *args):
+        if script.strip() != RELEASE_LOCK_SCRIPT:
+            raise CacheBackendError(f"{self.name} cache backend only supports the lock release script")
+        key, token = args[0], args[1]
+        with self._transaction():
+            entry = self._typed(key, "string")
+            if entry is not None and entry.data == self._str(token):
+                self._remove(key)
+                return 1
+            return 0
+
+    def publish(self, channel, message):
+        return 0  # no subscribers outside this store
+
+    def pipeline(self, transaction=True):
+        return CachePipeline(self)
+
+
+class CachePipeline:
+    """Queues commands and runs them together in one backend transaction on execute()."""
+
+    def __init__(self, backend):
+        self._backend = backend
+        self._calls = []
+
+    def __getattr__(self, name):
+        command = getattr(self._backend, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((command, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        with self._backend._transaction():
+            return [command(*args, **kwargs) for command, args, kwargs in calls]
+
+    def reset(self):
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reset()
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Process-local store; fine for local development and single-worker deployments."""
+
+    name = "memory"
+
+    def __init__(self, sweep_every=1000):
+        self._data = {}
+        self._lock = threading.RLock()
+        self._writes = 0
+        self._sweep_every = sweep_every
+        self._subscribers = {}  # channel -> set of _MemoryPubSub
+        self._subscribers_lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber._deliver({"type": "message", "channel": channel, "data": self._str(message)})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return _MemoryPubSub(self, ignore_subscribe_messages)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            yield
+
+    def _load(self, key):
+        return self._data.get(key)
+
+    def _store(self, key, entry):
+        self._data[key] = entry
+        self._writes += 1
+        if self._writes % self._sweep_every == 0:
+            # Expired keys are otherwise only dropped when read again
+            now = time.time()
+            for k in [k for k, e in self._data.items() if e.expired(now)]:
+                del self._data[k]
+
+    def _remove(self, key):
+        self._data.pop(key, None)
+
+    def _keys(self, now):
+        return [k for k, e in self._data.items() if not e.expired(now)]
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Store in a SQLite file so cached quizzes survive restarts and are shared by workers on one host."""
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        with self._transaction():
+            self._conn().execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, kind TEXT NOT NULL, data TEXT NOT NULL, expires_at REAL)"
+            )
+        self._conn().execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        self._conn().commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # Re-entrant: pipelines wrap many commands in one BEGIN IMMEDIATE, which also locks out other processes
+        with self._lock:
+            conn = self._conn()
+            outermost = self._local.depth == 0
+            if outermost:
+                conn.execute("BEGIN IMMEDIATE")
+            self._local.depth += 1
+            try:
+                yield
+            except BaseException:
+                self._local.depth -= 1
+                if outermost:
+                    conn.execute("ROLLBACK")
+                raise
+            self._local.depth -= 1
+            if outermost:
+                conn.execute("COMMIT")
+
+    def _load(self, key):
+        row = self._conn().execute("SELECT kind, data, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        kind, data, expires_at = row
+        return _Entry(kind, data if kind == "string" else json.loads(data), expires_at)
+
+    def _store(self, key, entry):
+        data = entry.data if entry.kind == "string" else json.dumps(entry.data, ensure_ascii=False)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, kind, data, expires_at) VALUES (?, ?, ?, ?)",
+            (key, entry.kind, data, entry.expires_at),
+        )
+
+    def _remove(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def _keys(self, now):
+        return [row[0] for row in self._conn().execute("SELECT key FROM cache WHERE expires_at IS NULL OR expires_at > ?", (now,))]
+
+
+class _MemoryPubSub:
+    """In-process stand-in for redis-py's PubSub (subscribe / get_message / close)."""
+
+    def __init__(self, backend, ignore_subscribe_messages=False):
+        self._backend = backend
+        self._ignore_subscribe = ignore_subscribe_messages
+        self._messages = queue.Queue()
+        self._channels = set()
+
+    def _deliver(self, message):
+        self._messages.put(message)
+
+    def subscribe(self, *channels):
+        with self._backend._subscribers_lock:
+            for channel in channels:
+                self._backend._subscribers.setdefault(channel, set()).add(self)
+                self._channels.add(channel)
+        if not self._ignore_subscribe:
+            for channel in channels:
+                self._deliver({"type": "subscribe", "channel": channel, "data": len(self._channels)})
+
+    def unsubscribe(self, *channels):
+        with self._backend._subscribers_lock:
+            for channel in channels or list(self._channels):
+                self._backend._subscribers.get(channel, set()).discard(self)
+                self._channels.discard(channel)
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            if timeout is None:
+                return self._messages.get()
+            return self._messages.get(timeout=timeout) if timeout > 0 else self._messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.unsubscribe()
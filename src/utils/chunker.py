@@ -0,0 +1,131 @@
+"""Token-aware splitting of lesson notes into balanced chunks with per-chunk question quotas."""
+import math
+import re
+
+from src.config.settings import Config
+
+# Vietnamese syllables and LaTeX fragments tokenize at roughly 1.5 tokens per word,
+# punctuation and symbols at roughly one token each.
+_WORD_PATTERN = re.compile(r'\w+')
+_SYMBOL_PATTERN = re.compile(r'[^\w\s]')
+
+# Progressively finer boundaries used to break an oversized section apart
+_SPLIT_LEVELS = [
+    (re.compile(r'\n(?=#\s)|^(?=#\s)'), "\n\n"),
+    (re.compile(r'\n(?=##\s)|^(?=##\s)'), "\n\n"),
+    (re.compile(r'\n(?=###\s)|^(?=###\s)'), "\n\n"),
+    (re.compile(r'\n\s*\n'), "\n\n"),
+    (re.compile(r'\n'), "\n"),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap tokenizer-free estimate of how many tokens a text costs."""
+    if not text:
+        return 0
+    words = len(_WORD_PATTERN.findall(text))
+    symbols = len(_SYMBOL_PATTERN.findall(text))
+    return math.ceil(words * 1.5 + symbols)
+
+
+def _split_units(text: str, max_tokens: int, level: int = 0, joiner: str = "\n\n") -> list[tuple[str, str, int]]:
+    """Break text into (unit, joiner_before, tokens) pieces no larger than max_tokens where structure allows."""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens or level >= len(_SPLIT_LEVELS):
+        return [(text, joiner, tokens)]
+
+    pattern, level_joiner = _SPLIT_LEVELS[level]
+    parts = [p.strip() for p in pattern.split(text) if p.strip()]
+    if len(parts) <= 1:
+        return _split_units(text, max_tokens, level + 1, joiner)
+
+    units = []
+    for i, part in enumerate(parts):
+        units.extend(_split_units(part, max_tokens, level + 1, joiner if i == 0 else level_joiner))
+    return units
+
+
+def _partition(units: list[tuple[str, str, int]], num_chunks: int) -> list[list[tuple[str, str, int]]]:
+    """Group consecutive units into num_chunks groups with token totals as even as possible."""
+    groups = []
+    remaining_tokens = sum(u[2] for u in units)
+    idx = 0
+    for chunk_idx in range(num_chunks - 1):
+        chunks_left = num_chunks - chunk_idx
+        target = remaining_tokens / chunks_left
+        group = [units[idx]]
+        size = units[idx][2]
+        idx += 1
+        # Leave at least one unit for every chunk still to be filled
+        while len(units) - idx > chunks_left - 1:
+            nxt = units[idx][2]
+            # Stop once adding the next unit would overshoot the target more than stopping undershoots it
+            if size + nxt > target and (size + nxt - target) > (target - size):
+                break
+            group.append(units[idx])
+            size += nxt
+            idx += 1
+        groups.append(group)
+        remaining_tokens -= size
+    groups.append(units[idx:])
+    return groups
+
+
+def _join(group: list[tuple[str, str, int]]) -> str:
+    return group[0][0] + "".join(joiner + unit_text for unit_text, joiner, _ in group[1:])
+
+
+def allocate_quotas(sizes: list[int], num_questions: int) -> list[int]:
+    """Split num_questions across chunks proportionally to their sizes (largest remainder, at least 1 each)."""
+    if not sizes:
+        return []
+    weights = [max(1, s) for s in sizes]
+    total = sum(weights)
+    shares = [num_questions * w / total for w in weights]
+    quotas = [max(1, math.floor(s)) for s in shares]
+
+    # The at-least-one floor can overshoot; take back from chunks furthest above their share
+    while sum(quotas) > num_questions and any(q > 1 for q in quotas):
+        i = max((k for k in range(len(quotas)) if quotas[k] > 1), key=lambda k: quotas[k] - shares[k])
+        quotas[i] -= 1
+
+    # Hand out the shortfall by largest fractional remainder
+    order = sorted(range(len(quotas)), key=lambda k: shares[k] - quotas[k], reverse=True)
+    i = 0
+    while sum(quotas) < num_questions:
+        quotas[order[i % len(order)]] += 1
+        i += 1
+    return quotas
+
+
+def plan_quiz_chunks(text: str, num_questions: int) -> list[tuple[str, int]]:
+    """Split lesson text into token-balanced chunks and assign each a question quota.
+
+    The chunk count grows with the estimated token size of the note (targeting
+    Config.QUIZ_CHUNK_TOKENS per chunk, never exceeding what fits in the model
+    context) and is capped by Config.QUIZ_MAX_CHUNKS and num_questions.
+
+    Returns:
+        list of (chunk_text, question_quota); quotas sum to num_questions.
+    """
+    if not text or not text.strip() or num_questions <= 0:
+        return []
+
+    total_tokens = estimate_tokens(text)
+    usable_context = max(1, Config.AI_CONTEXT_TOKENS - Config.QUIZ_PROMPT_RESERVE_TOKENS)
+    chunk_budget = max(1, min(Config.QUIZ_CHUNK_TOKENS, usable_context))
+
+    # QUIZ_MAX_CHUNKS bounds fan-out, but never below what is needed to fit the model context
+    num_chunks = min(math.ceil(total_tokens / chunk_budget), Config.QUIZ_MAX_CHUNKS)
+    num_chunks = max(num_chunks, math.ceil(total_tokens / usable_context))
+    num_chunks = max(1, min(num_chunks, num_questions))
+
+    if num_chunks == 1:
+        return [(text.strip(), num_questions)]
+
+    units = _split_units(text.strip(), math.ceil(total_tokens / num_chunks))
+    groups = _partition(units, min(num_chunks, len(units)))
+
+    chunks = [_join(g) for g in groups]
+    quotas = allocate_quotas([sum(u[2] for u in g) for g in groups], num_questions)
+    return list(zip(chunks, quotas))
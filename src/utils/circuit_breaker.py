@@ -0,0 +1,157 @@
+"""Per-model circuit breaker for the AI router, with state shared across workers through Redis."""
+import threading
+import time
+from collections import deque
+
+from src.config.settings import Config
+from src.utils.cache import get_redis
+from src.utils.logger import logger
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+
+
+class ModelCircuitBreaker:
+    """Opens a model's circuit after repeated errors or a p95 latency breach.
+
+    While open, callers skip the model and go straight to the fallback. After
+    Config.AI_BREAKER_COOLDOWN seconds a single probe request is let through;
+    its outcome closes the circuit again or re-opens it for another cooldown.
+    When Redis is unavailable the state is kept per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = {}  # model -> {"state", "opened_at", "failures", "latencies"}
+
+    @staticmethod
+    def _key(model):
+        return f"ai_breaker:{model}"
+
+    @staticmethod
+    def _latency_key(model):
+        return f"ai_breaker_lat:{model}"
+
+    def _local_state(self, model):
+        return self._local.setdefault(model, {
+            "state": STATE_CLOSED,
+            "opened_at": 0.0,
+            "failures": 0,
+            "latencies": deque(maxlen=Config.AI_BREAKER_WINDOW),
+        })
+
+    def _open(self, model, reason):
+        logger.warning(f"🔌 Circuit opened for model {model}: {reason}")
+        r = get_redis()
+        if r:
+            try:
+                pipe = r.pipeline()
+                pipe.hset(self._key(model), mapping={"state": STATE_OPEN, "opened_at": time.time(), "failures": 0})
+                pipe.expire(self._key(model), Config.AI_BREAKER_COOLDOWN * 10)
+                pipe.delete(self._latency_key(model), f"ai_breaker_probe:{model}")
+                pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Redis breaker write failed for {model}: {e}")
+        with self._lock:
+            st = self._local_state(model)
+            st.update(state=STATE_OPEN, opened_at=time.time(), failures=0)
+            st["latencies"].clear()
+
+    def allow(self, model) -> bool:
+        """Return True if a request to model may be sent now."""
+        r = get_redis()
+        if r:
+            try:
+                data = r.hgetall(self._key(model))
+                if data.get("state") != STATE_OPEN:
+                    return True
+                if time.time() - float(data.get("opened_at", 0)) < Config.AI_BREAKER_COOLDOWN:
+                    return False
+                # Half-open: exactly one worker wins the probe for this cooldown window
+                return bool(r.set(f"ai_breaker_probe:{model}", "1", nx=True, ex=Config.AI_BREAKER_COOLDOWN))
+            except Exception as e:
+                logger.warning(f"Redis breaker read failed for {model}: {e}")
+        with self._lock:
+            st = self._local_state(model)
+            if st["state"] != STATE_OPEN:
+                return True
+            if time.time() - st["opened_at"] < Config.AI_BREAKER_COOLDOWN:
+                return False
+            st["opened_at"] = time.time()  # let one probe through, hold the rest for another cooldown
+            return True
+
+    def record_success(self, model, latency, started_at=None):
+        """Record a successful call that started at started_at (epoch seconds, default now - latency).
+
+        Only a call started after the circuit opened (the half-open probe) may close
+        it; a slow call or a hedge loser that began earlier leaves it open.
+        """
+        started_at = time.time() - latency if started_at is None else started_at
+        p95 = None
+        r = get_redis()
+        if r:
+            try:
+                data = r.hgetall(self._key(model))
+                if data.get("state") == STATE_OPEN and started_at < float(data.get("opened_at", 0)):
+                    return
+                pipe = r.pipeline()
+                mapping = {"failures": 0}
+                if data.get("state") == STATE_OPEN:
+                    mapping["state"] = STATE_CLOSED
+                    logger.info(f"🔌 Circuit closed for model {model} after a successful probe")
+                pipe.hset(self._key(model), mapping=mapping)
+                pipe.expire(self._key(model), Config.AI_BREAKER_COOLDOWN * 10)
+                pipe.lpush(self._latency_key(model), round(latency, 3))
+                pipe.ltrim(self._latency_key(model), 0, Config.AI_BREAKER_WINDOW - 1)
+                pipe.lrange(self._latency_key(model), 0, -1)
+                samples = [float(x) for x in pipe.execute()[-1]]
+                p95 = self._p95(samples)
+            except Exception as e:
+                logger.warning(f"Redis breaker write failed for {model}: {e}")
+                r = None
+        if not r:
+            with self._lock:
+                st = self._local_state(model)
+                if st["state"] == STATE_OPEN and started_at < st["opened_at"]:
+                    return
+                st.update(state=STATE_CLOSED, failures=0)
+                st["latencies"].append(latency)
+                p95 = self._p95(list(st["latencies"]))
+
+        if p95 is not None and p95 > Config.AI_BREAKER_P95_SECONDS:
+            self._open(model, f"p95 latency {p95:.1f}s > {Config.AI_BREAKER_P95_SECONDS}s")
+
+    def record_failure(self, model):
+        failures, state = 0, STATE_CLOSED
+        r = get_redis()
+        if r:
+            try:
+                pipe = r.pipeline()
+                pipe.hincrby(self._key(model), "failures", 1)
+                pipe.hget(self._key(model), "state")
+                pipe.expire(self._key(model), Config.AI_BREAKER_COOLDOWN * 10)
+                failures, state, _ = pipe.execute()
+            except Exception as e:
+                logger.warning(f"Redis breaker write failed for {model}: {e}")
+                r = None
+        if not r:
+            with self._lock:
+                st = self._local_state(model)
+                st["failures"] += 1
+                failures, state = st["failures"], st["state"]
+
+        if state == STATE_OPEN:
+            self._open(model, "half-open probe failed")
+        elif failures >= Config.AI_BREAKER_FAILURE_THRESHOLD:
+            self._open(model, f"{failures} consecutive failures")
+
+    @staticmethod
+    def _p95(samples):
+        if len(samples) < Config.AI_BREAKER_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+breaker = ModelCircuitBreaker()
@@ -0,0 +1,63 @@
+"""Transparent zlib compression of large cached JSON values, with byte counters for the metrics API."""
+import base64
+import json
+import threading
+import zlib
+
+from src.config.settings import Config
+
+# Compressed values are text (the Redis client decodes responses) and start with this marker;
+# plain JSON never does, so values written before compression existed still read correctly
+COMPRESSED_MARKER = "z1:"
+
+_stats_lock = threading.Lock()
+_stats = {"values_written": 0, "values_compressed": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+
+def _record(raw_bytes: int, stored_bytes: int, compressed: bool):
+    with _stats_lock:
+        _stats["values_written"] += 1
+        _stats["values_compressed"] += int(compressed)
+        _stats["raw_bytes"] += raw_bytes
+        _stats["stored_bytes"] += stored_bytes
+
+
+def compress_value(text: str) -> str:
+    """Compress text above CACHE_COMPRESSION_THRESHOLD bytes, keeping it as is when that does not make it smaller."""
+    raw = text.encode("utf-8")
+    if Config.CACHE_COMPRESSION_ENABLED and len(raw) >= Config.CACHE_COMPRESSION_THRESHOLD:
+        packed = COMPRESSED_MARKER + base64.b64encode(zlib.compress(raw, 6)).decode("ascii")
+        if len(packed) < len(raw):
+            _record(len(raw), len(packed), True)
+            return packed
+    _record(len(raw), len(raw), False)
+    return text
+
+
+def decompress_value(value):
+    """Inverse of compress_value; plain values (including legacy uncompressed ones) pass through."""
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    if isinstance(value, str) and value.startswith(COMPRESSED_MARKER):
+        return zlib.decompress(base64.b64decode(value[len(COMPRESSED_MARKER):])).decode("utf-8")
+    return value
+
+
+def dumps_cached(obj) -> str:
+    """json.dumps for a cache write, compressed when large."""
+    return compress_value(json.dumps(obj, ensure_ascii=False))
+
+
+def loads_cached(value):
+    """json.loads for a value written by dumps_cached or by older plain-JSON code."""
+    return json.loads(decompress_value(value))
+
+
+def compression_stats() -> dict:
+    """Bytes written through compress_value and how many of them compression saved in Redis."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["bytes_saved"] = stats["raw_bytes"] - stats["stored_bytes"]
+    stats["ratio"] = round(stats["stored_bytes"] / stats["raw_bytes"], 4) if stats["raw_bytes"] else 1.0
+    return stats
+
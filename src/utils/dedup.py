@@ -0,0 +1,94 @@
+"""Near-duplicate detection for generated quiz questions using word shingles and MinHash LSH."""
+import hashlib
+import random
+import re
+import unicodedata
+
+from src.config.settings import Config
+
+_NUM_PERM = 64
+_BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 Jaccard almost always share a bucket
+_ROWS = _NUM_PERM // _BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)  # fixed seed keeps signatures stable across processes
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(_NUM_PERM)]
+
+_OPTION_PREFIX = re.compile(r'^\s*[A-Da-d][\.\)]\s*')
+_NON_WORD = re.compile(r'[^\w$\\^=+\-*/]+')
+
+
+def _normalize(text: str) -> list[str]:
+    text = unicodedata.normalize("NFC", str(text or "")).lower()
+    return [w for w in _NON_WORD.split(text) if w]
+
+
+def question_shingles(question: dict, size: int = 2) -> set[str]:
+    """Word n-gram shingles over the question stem and its options (option letters ignored)."""
+    words = _normalize(question.get("q") or question.get("question") or "")
+    for opt in question.get("options") or []:
+        words.append("|")
+        words.extend(_normalize(_OPTION_PREFIX.sub("", str(opt))))
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _minhash(shingles: set[str]) -> list[int]:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles]
+    if not hashes:
+        return [0] * _NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def remove_near_duplicates(questions: list[dict], existing: list[dict] | None = None, threshold: float | None = None) -> tuple[list[dict], int]:
+    """Drop questions that are near-duplicates of an earlier question or of an existing one.
+
+    Candidate pairs come from MinHash LSH buckets and are confirmed with the exact
+    shingle Jaccard similarity, so the check stays close to linear in the number
+    of questions.
+
+    Returns:
+        (kept_questions, removed_count); kept questions keep their original order.
+    """
+    threshold = Config.QUIZ_DEDUP_THRESHOLD if threshold is None else threshold
+    buckets = {}  # (band, band_hash) -> indices of kept shingle sets
+    kept_shingles = []
+
+    def find_match(shingles, signature):
+        seen = set()
+        for band in range(_BANDS):
+            key = (band, tuple(signature[band * _ROWS:(band + 1) * _ROWS]))
+            for idx in buckets.get(key, ()):
+                if idx not in seen:
+                    seen.add(idx)
+                    if _jaccard(shingles, kept_shingles[idx]) >= threshold:
+                        return True
+        return False
+
+    def add(shingles, signature):
+        idx = len(kept_shingles)
+        kept_shingles.append(shingles)
+        for band in range(_BANDS):
+            buckets.setdefault((band, tuple(signature[band * _ROWS:(band + 1) * _ROWS])), []).append(idx)
+
+    for q in existing or []:
+        shingles = question_shingles(q)
+        add(shingles, _minhash(shingles))
+
+    kept = []
+    removed = 0
+    for q in questions:
+        shingles = question_shingles(q)
+        signature = _minhash(shingles)
+        if shingles and find_match(shingles, signature):
+            removed += 1
+            continue
+        add(shingles, signature)
+        kept.append(q)
+    return kept, removed
@@ -0,0 +1,103 @@
+"""Single-pass extraction of JSON arrays of objects embedded in LLM prose."""
+import json
+
+_WHITESPACE = " \t\r\n"
+_CLOSERS = {"]": "[", "}": "{"}
+
+
+class _Frame:
+    __slots__ = ("char", "start", "json", "candidate", "children")
+
+    def __init__(self, char, start, is_json, candidate):
+        self.char = char
+        self.start = start
+        self.json = is_json  # inside JSON structure: string literals are tracked
+        self.candidate = candidate  # '[' whose first non-space character is '{'
+        self.children = []  # completed candidate spans directly inside this frame
+
+
+def _first_non_space(text, pos):
+    n = len(text)
+    while pos < n and text[pos] in _WHITESPACE:
+        pos += 1
+    return text[pos] if pos < n else ""
+
+
+def _last_non_space(text, pos):
+    while pos >= 0 and text[pos] in _WHITESPACE:
+        pos -= 1
+    return text[pos] if pos >= 0 else ""
+
+
+def iter_json_array_spans(text: str):
+    """Yield (start, end) of every outermost balanced `[{ ... }]` span in text, in order.
+
+    One left-to-right pass with a bracket stack. Quotes are only treated as
+    string delimiters inside JSON structure, so stray quotes or brackets in the
+    surrounding prose cannot swallow the array. When the prose leaves a bracket
+    unclosed or mismatched, arrays completed inside it are still reported.
+    """
+    if not text:
+        return
+    stack = []
+    in_string = False
+    i = 0
+    n = len(text)
+
+    def flush():
+        spans = [span for frame in stack for span in frame.children]
+        stack.clear()
+        return spans
+
+    while i < n:
+        ch = text[i]
+        if in_string:
+            if ch == "\\":
+                i += 2
+                continue
+            if ch == '"':
+                in_string = False
+        elif ch == '"':
+            if stack and stack[-1].json:
+                in_string = True
+        elif ch == "[" or ch == "{":
+            parent_json = bool(stack) and stack[-1].json
+            candidate = ch == "[" and _first_non_space(text, i + 1) == "{"
+            stack.append(_Frame(ch, i, parent_json or candidate, candidate))
+        elif ch in _CLOSERS:
+            if not stack or stack[-1].char != _CLOSERS[ch]:
+                # Mismatched bracket: the open frames were prose, not JSON
+                yield from flush()
+            else:
+                frame = stack.pop()
+                spans = [(frame.start, i + 1)] if frame.candidate and _last_non_space(text, i - 1) == "}" else frame.children
+                if stack:
+                    stack[-1].children.extend(spans)
+                else:
+                    yield from spans
+        i += 1
+
+    yield from flush()
+
+
+def iter_json_arrays(text: str):
+    """Yield the text of every outermost `[{ ... }]` candidate array in text."""
+    for start, end in iter_json_array_spans(text):
+        yield text[start:end]
+
+
+def extract_json_array(text: str) -> str | None:
+    """Return the first balanced top-level array of objects in text, or None."""
+    return next(iter_json_arrays(text), None)
+
+
+def parse_json_array(text: str, loads=json.loads) -> list | None:
+    """Return the first candidate array that loads() parses into a non-empty list, or None."""
+    for candidate in iter_json_arrays(text):
+        try:
+            parsed = loads(candidate)
+        except Exception:
+            continue
+        if isinstance(parsed, list) and parsed:
+            return parsed
+    return None
@@ -14,51 +14,100 @@ VN_ACCENT_PATTERN = re.compile(
 # Splitting pattern for $...$ and $$...$$
 MATH_BLOCK_PATTERN = re.compile(r'(\$\$.*?\$\$|\$.*?\$)', re.DOTALL)
 
+# \text{...} blocks may hold Vietnamese prose inside math
+TEXT_BLOCK_PATTERN = re.compile(r'\\text\s*\{[^{}]*\}')
+
+# Quiz fields that are rendered through KaTeX
+QUIZ_TEXT_FIELDS = ("q", "question", "explanation")
+
+
+def _check_part(part: str, errors: list[str]):
+    if part.startswith('$'):
+        # INSIDE MATH DELIMITER
+        inner = part.strip('$').strip()
+
+        if not inner:
+            errors.append("Empty math delimiter ($$)")
+            return
+
+        # Rule 2: Math block should not enclose long Vietnamese prose
+        # (Exceptions: \text{...} inside math is allowed, but prose outside \text{} is invalid)
+        # Remove \text{...} blocks before checking for raw prose
+        inner_no_text = TEXT_BLOCK_PATTERN.sub('', inner) if '\\text' in inner else inner
+        if VN_ACCENT_PATTERN.search(inner_no_text):
+            errors.append(f"Vietnamese prose incorrectly enclosed in math mode: '{part}'")
+
+    elif '\\' in part:
+        # OUTSIDE MATH DELIMITER
+        # Rule 3: Raw LaTeX math commands must not appear outside $...$ or $$...$$
+        match = RAW_LATEX_CMD_PATTERN.search(part)
+        if match:
+            errors.append(
+                f"Unwrapped raw LaTeX command '\\{match.group(1)}' found outside math delimiters in segment: '{part.strip()}'"
+            )
+
+
+def katex_errors(text) -> list[str]:
+    """Return the KaTeX rule violations in one text field, scanning it once."""
+    if not isinstance(text, str) or ('$' not in text and '\\' not in text):
+        # Without '$' or a backslash there is neither math nor a LaTeX command to check
+        return []
+
+    errors = []
+
+    # Rule 1: Dollar count symmetry (must be even, no unclosed $)
+    dollars = text.count('$')
+    if dollars % 2 != 0:
+        errors.append(f"Unmatched '$' math delimiter (total count = {dollars})")
+
+    # Walk math blocks ($...$, $$...$$) and the plain text between them
+    pos = 0
+    for match in MATH_BLOCK_PATTERN.finditer(text):
+        if match.start() > pos:
+            _check_part(text[pos:match.start()], errors)
+        _check_part(match.group(0), errors)
+        pos = match.end()
+    if pos < len(text):
+        _check_part(text[pos:], errors)
+
+    return errors
+
+
 def validate_katex_formatting(text: str) -> tuple[bool, list[str]]:
     """Strictly validates if a text field correctly adheres to KaTeX rendering rules.
 
     Returns:
         (is_valid: bool, error_messages: list[str])
     """
-    if not isinstance(text, str) or not text.strip():
-        return True, []
-
-    errors = []
+    errors = katex_errors(text)
+    return len(errors) == 0, errors
 
-    # Rule 1: Dollar count symmetry (must be even, no unclosed $)
-    if text.count('$') % 2 != 0:
-        errors.append(f"Unmatched '$' math delimiter (total count = {text.count('$')})")
 
-    # Split text into math blocks ($...$, $$...$$) vs plain text
-    parts = MATH_BLOCK_PATTERN.split(text)
+def validate_quiz_katex(quiz) -> dict:
+    """Validate every rendered field of a quiz (question, options, explanation) in one pass.
 
-    for part in parts:
-        if not part:
-            continue
+    Accepts a quiz dict with a "questions" list or the list itself.
 
-        if part.startswith('$'):
-            # INSIDE MATH DELIMITER
-            inner = part.strip('$').strip()
-
-            if not inner:
-                errors.append("Empty math delimiter ($$)")
-                continue
-
-            # Rule 2: Math block should not enclose long Vietnamese prose
-            # (Exceptions: \text{...} inside math is allowed, but prose outside \text{} is invalid)
-            # Remove \text{...} blocks before checking for raw prose
-            inner_no_text = re.sub(r'\\text\s*\{[^{}]*\}', '', inner)
-            if VN_ACCENT_PATTERN.search(inner_no_text):
-                errors.append(f"Vietnamese prose incorrectly enclosed in math mode: '{part}'")
-
-        else:
-            # OUTSIDE MATH DELIMITER
-            # Rule 3: Raw LaTeX math commands must not appear outside $...$ or $$...$$
-            match = RAW_LATEX_CMD_PATTERN.search(part)
-            if match:
-                errors.append(
-                    f"Unwrapped raw LaTeX command '\\{match.group(1)}' found outside math delimiters in segment: '{part.strip()}'"
-                )
+    Returns:
+        {"valid": bool, "fields_checked": int, "issues": [{"question", "index", "field", "errors"}]}
+        where "question" is the question id (or 1-based position), "index" is the
+        0-based position in the list (ids can be missing or repeated) and "field"
+        is e.g. "q", "options[2]" or "explanation".
+    """
+    questions = quiz.get("questions") if isinstance(quiz, dict) else quiz
+    issues = []
+    fields_checked = 0
 
-    return len(errors) == 0, errors
+    for idx, question in enumerate(questions or []):
+        if not isinstance(question, dict):
+            continue
+        qid = question.get("id", idx + 1)
+        fields = [(name, question.get(name)) for name in QUIZ_TEXT_FIELDS if name in question]
+        fields.extend((f"options[{i}]", opt) for i, opt in enumerate(question.get("options") or []))
+        for field, text in fields:
+            fields_checked += 1
+            errors = katex_errors(text)
+            if errors:
+                issues.append({"question": qid, "index": idx, "field": field, "errors": errors})
 
+    return {"valid": not issues, "fields_checked": fields_checked, "issues": issues}
@@ -0,0 +1,188 @@
+"""Rule-based repair of the mechanical KaTeX mistakes LLMs make in quiz text, checked with katex_validator."""
+import re
+
+from src.utils.katex_validator import QUIZ_TEXT_FIELDS, validate_quiz_katex
+
+# $*V*$ or $**V**$: Markdown emphasis wrapped around inline math
+MARKDOWN_MATH_PATTERN = re.compile(r'\$\*+(.*?)\*+\$')
+
+# Magnitude word after an amount ($5 triệu -> 5 triệu USD) and a "USD" the model already wrote
+_AMOUNT_SUFFIX = r'(?:\s+(nghìn tỷ|nghìn tỉ|nghìn|ngàn|triệu|tỷ|tỉ)\b)?(?:\s+USD\b)?'
+AMOUNT_SUFFIX_PATTERN = re.compile(_AMOUNT_SUFFIX, re.I)
+
+# Escaped dollar currency (\$100) and stray \USD commands
+ESCAPED_CURRENCY_PATTERN = re.compile(r'\\\$\s?(\d+(?:[.,]\d+)*)' + _AMOUNT_SUFFIX, re.I)
+BACKSLASH_USD_PATTERN = re.compile(r'\\USD\b')
+
+# A '$' that opens an amount of money rather than math: $100, $1.250,5
+CURRENCY_AMOUNT_PATTERN = re.compile(r'\$(\d+(?:[.,]\d+)*)')
+VN_PROSE_PATTERN = re.compile(r'[àáảãạăằắẳẵặâầấẩẫậèéẻẽẹêềếểễệìíỉĩịòóỏõọôồốổỗộơờớởỡợùúủũụưừứửữựỳýỷỹỵđ]', re.I)
+
+TEXT_COMMAND_PATTERN = re.compile(r'\\text\s*\{([^{}]*)\}')
+MATH_SEGMENT_PATTERN = re.compile(r'(\$\$.*?\$\$|\$.*?\$)', re.DOTALL)
+
+# Tokens of prose that may belong to a formula; brace groups are tracked separately
+_MATH_TOKEN_PATTERN = re.compile(r'\\[A-Za-z]+|\\.|\d+(?:[.,]\d+)*%?|[^\W\d_]+|\s+|.', re.DOTALL)
+_MATH_OPERATORS = frozenset("=+-*/^_<>()[]{}|'%")
+_USD_IN_MATH_PATTERN = re.compile(r'(\\text\s*\{[^{}]*\})|\s*\bUSD\b')
+_UNESCAPED_PERCENT_PATTERN = re.compile(r'(?<!\\)%')
+
+
+def strip_markdown_math(text: str) -> str:
+    """Remove Markdown emphasis around inline math: $*V*$ -> $V$."""
+    return MARKDOWN_MATH_PATTERN.sub(r'$\1$', text) if '$*' in text else text
+
+
+def _usd_amount(amount, magnitude=None) -> str:
+    return f"{amount} {magnitude} USD" if magnitude else f"{amount} USD"
+
+
+def _fix_currency(text: str) -> str:
+    text = ESCAPED_CURRENCY_PATTERN.sub(lambda m: _usd_amount(m.group(1), m.group(2)), text)
+    text = BACKSLASH_USD_PATTERN.sub('USD', text)
+    if '$' not in text:
+        return text
+
+    # Walk the '$' signs: a '$' before an amount whose "math block" would run into
+    # Vietnamese prose (or never close) is currency, otherwise skip over the block
+    out = []
+    pos = 0
+    n = len(text)
+    while pos < n:
+        start = text.find('$', pos)
+        if start < 0:
+            break
+        out.append(text[pos:start])
+        if text.startswith('$$', start):
+            end = text.find('$$', start + 2)
+            end = n if end < 0 else end + 2
+            out.append(text[start:end])
+            pos = end
+            continue
+        close = text.find('$', start + 1)
+        amount = CURRENCY_AMOUNT_PATTERN.match(text, start)
+        if amount and (close < 0 or VN_PROSE_PATTERN.search(text, start, close)):
+            suffix = AMOUNT_SUFFIX_PATTERN.match(text, amount.end())
+            out.append(_usd_amount(amount.group(1), suffix.group(1)))
+            pos = suffix.end()
+            continue
+        end = n if close < 0 else close + 1
+        out.append(text[start:end])
+        pos = end
+    out.append(text[pos:])
+    return "".join(out)
+
+
+def _math_token_kinds(tokens):
+    """Classify prose tokens as formula ('math'), spacing ('space') or text ('prose')."""
+    kinds = []
+    depth = 0
+    for tok in tokens:
+        if tok == '{':
+            depth += 1
+        elif tok == '}':
+            depth = max(0, depth - 1)
+        if depth or tok in ('{', '}') or tok[0] == '\\' or tok[0].isdigit() or tok in _MATH_OPERATORS:
+            kinds.append('math')
+        elif tok.isspace():
+            kinds.append('space')
+        elif tok.isascii() and tok.isalpha() and (len(tok) == 1 or not tok.islower()):
+            # Variables and acronyms (Q, EBIT, USD); lowercase words are prose
+            kinds.append('math')
+        else:
+            kinds.append('prose')
+    return kinds
+
+
+def _wrap_formula(formula: str) -> str:
+    formula = _USD_IN_MATH_PATTERN.sub(lambda m: m.group(1) or r'\text{ USD}', formula)
+    formula = _UNESCAPED_PERCENT_PATTERN.sub(r'\\%', formula)
+    return f"${formula}$"
+
+
+def _wrap_raw_commands(prose: str) -> str:
+    """Wrap runs of formula tokens that contain a LaTeX command in $...$; unwrap \\text{} used as prose."""
+    if '\\' not in prose:
+        return prose
+    tokens = _MATH_TOKEN_PATTERN.findall(prose)
+    kinds = _math_token_kinds(tokens)
+    out = []
+    i = 0
+    while i < len(tokens):
+        if kinds[i] == 'prose':
+            out.append(tokens[i])
+            i += 1
+            continue
+        j = i
+        while j < len(tokens) and kinds[j] != 'prose':
+            j += 1
+        run = tokens[i:j]
+        # Leading / trailing spaces stay outside the formula
+        lead = 0
+        while lead < len(run) and run[lead].isspace():
+            lead += 1
+        trail = len(run)
+        while trail > lead and run[trail - 1].isspace():
+            trail -= 1
+        core = run[lead:trail]
+        has_command = any(tok.startswith('\\') and tok[1:].isalpha() and tok != '\\text' for tok in core)
+        text = "".join(core)
+        if has_command:
+            text = _wrap_formula(text)
+        elif '\\text' in text:
+            text = TEXT_COMMAND_PATTERN.sub(r'\1', text)
+        out.append("".join(run[:lead]) + text + "".join(run[trail:]))
+        i = j
+    return "".join(out)
+
+
+def normalize_latex_text(text):
+    """Apply the deterministic KaTeX repairs to one quiz field."""
+    if not isinstance(text, str) or ('$' not in text and '\\' not in text):
+        return text
+    text = strip_markdown_math(text)
+    text = _fix_currency(text)
+
+    out = []
+    pos = 0
+    for match in MATH_SEGMENT_PATTERN.finditer(text):
+        out.append(_wrap_raw_commands(text[pos:match.start()]))
+        block = match.group(0)
+        # Raw line breaks inside math stop KaTeX from rendering the block
+        out.append(block.replace("\n", " "))
+        pos = match.end()
+    out.append(_wrap_raw_commands(text[pos:]))
+    return "".join(out)
+
+
+def normalize_question(question: dict) -> dict:
+    """Return a copy of the question with every rendered field normalized."""
+    fixed = dict(question)
+    for name in QUIZ_TEXT_FIELDS:
+        if name in fixed:
+            fixed[name] = normalize_latex_text(fixed[name])
+    if isinstance(fixed.get("options"), list):
+        fixed["options"] = [normalize_latex_text(opt) for opt in fixed["options"]]
+    return fixed
+
+
+def normalize_quiz_latex(questions: list[dict]) -> tuple[list[dict], dict]:
+    """Normalize every question locally and validate the result.
+
+    Returns:
+        (normalized_questions, report) where report is validate_quiz_katex's
+        output for the normalized questions plus "changed_fields".
+    """
+    normalized = []
+    changed = 0
+    for question in questions:
+        if not isinstance(question, dict):
+            normalized.append(question)
+            continue
+        fixed = normalize_question(question)
+        changed += sum(1 for name in QUIZ_TEXT_FIELDS if fixed.get(name) != question.get(name))
+        changed += sum(1 for a, b in zip(fixed.get("options") or [], question.get("options") or []) if a != b)
+        normalized.append(fixed)
+    report = validate_quiz_katex(normalized)
+    report["changed_fields"] = changed
+    return normalized, report
@@ -0,0 +1,269 @@
+"""In-process TTL LRU tier in front of Redis for hot string keys, kept coherent across workers with pub/sub."""
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from src.config.settings import Config
+from src.utils.logger import logger
+
+_PROCESS_ID = uuid.uuid4().hex
+
+
+class LocalTTLCache:
+    """Thread-safe LRU of (value, expires_at) with a fixed size and per-entry TTL."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Commands that modify their key(s); key positions are resolved by _written_keys
+_WRITE_COMMANDS = frozenset({
+    "set", "setex", "psetex", "setnx", "getset", "getdel", "getex", "append", "setrange",
+    "incr", "incrby", "incrbyfloat", "decr", "decrby",
+    "delete", "unlink", "rename", "renamenx",
+    "expire", "pexpire", "expireat", "pexpireat", "persist",
+    "hset", "hsetnx", "hdel", "hincrby", "hincrbyfloat", "hmset",
+    "rpush", "lpush", "ltrim", "lpop", "rpop", "lrem", "lset",
+    "sadd", "srem", "zadd", "zrem",
+    "eval", "evalsha",
+})
+
+
+def _written_keys(command, args):
+    """Keys a write command touches, given its positional arguments."""
+    if command in ("delete", "unlink"):
+        return list(args)
+    if command in ("rename", "renamenx"):
+        return list(args[:2])
+    if command in ("eval", "evalsha"):
+        numkeys = int(args[1]) if len(args) > 1 else 0
+        return list(args[2:2 + numkeys])
+    return list(args[:1])
+
+
+class _FamilyStats:
+    __slots__ = ("local_hits", "redis_hits", "misses")
+
+    def __init__(self):
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def summary(self, size):
+        total = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "local_hit_ratio": round(self.local_hits / total, 4) if total else 0.0,
+            "redis_hit_ratio": round(self.redis_hits / total, 4) if total else 0.0,
+            "size": size,
+        }
+
+
+class TieredRedis:
+    """Wraps a redis client: GETs of configured key families are answered from a local LRU first.
+
+    families maps a name to (prefix, ttl_seconds, max_size). Any write command
+    (see _WRITE_COMMANDS, including expire and eval) on those keys made through
+    this client, directly or in a pipeline, drops the local copy and is published
+    on Config.LOCAL_CACHE_CHANNEL so other workers drop theirs. Every other
+    command is passed straight to the wrapped client.
+    """
+
+    def __init__(self, client, families, excluded_prefixes=(), subscribe=True):
+        self._client = client
+        self._families = [(name, prefix) for name, (prefix, _, _) in families.items()]
+        self._excluded = tuple(excluded_prefixes)
+        self._caches = {name: LocalTTLCache(max_size, ttl) for name, (_, ttl, max_size) in families.items()}
+        self._stats = {name: _FamilyStats() for name in families}
+        self._stats_lock = threading.Lock()
+        self._invalidations = 0  # bumped on every invalidation so in-flight reads do not store stale values
+        if subscribe:
+            threading.Thread(target=self._listen, name="local-cache-invalidation", daemon=True).start()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in _WRITE_COMMANDS or not callable(attr):
+            return attr
+
+        # Writes: run against Redis, then invalidate the local tier everywhere
+        def write(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            self.invalidate(*_written_keys(name, args))
+            return result
+        return write
+
+    @property
+    def client(self):
+        return self._client
+
+    def _family(self, key):
+        if not isinstance(key, str) or key.startswith(self._excluded):
+            return None
+        for name, prefix in self._families:
+            if key.startswith(prefix):
+                return name
+        return None
+
+    def _count(self, family, field):
+        with self._stats_lock:
+            setattr(self._stats[family], field, getattr(self._stats[family], field) + 1)
+
+    def get(self, key):
+        family = self._family(key)
+        if family is None:
+            return self._client.get(key)
+        cache = self._caches[family]
+        value = cache.get(key)
+        if value is not None:
+            self._count(family, "local_hits")
+            return value
+
+        generation = self._invalidations
+        value = self._client.get(key)
+        self._count(family, "redis_hits" if value is not None else "misses")
+        if value is not None and generation == self._invalidations:
+            cache.put(key, value)
+        return value
+
+    def pipeline(self, *args, **kwargs):
+        return _TieredPipeline(self, self._client.pipeline(*args, **kwargs))
+
+    def invalidate(self, *keys, publish=True):
+        """Drop keys from the local tier of this process and, when publish is set, of every other worker."""
+        cached = [k for k in keys if self._family(k) is not None]
+        if not cached:
+            return
+        self._drop(cached)
+        if publish:
+            try:
+                self._client.publish(Config.LOCAL_CACHE_CHANNEL, json.dumps({"origin": _PROCESS_ID, "keys": cached}))
+            except Exception as e:
+                logger.warning(f"Failed to publish local cache invalidation: {e}")
+
+    def _drop(self, keys):
+        with self._stats_lock:
+            self._invalidations += 1
+        for key in keys:
+            self._caches[self._family(key)].discard(key)
+
+    def clear_local(self):
+        with self._stats_lock:
+            self._invalidations += 1
+        for cache in self._caches.values():
+            cache.clear()
+
+    def handle_invalidation(self, data):
+        """Apply an invalidation message published by any worker."""
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if message.get("origin") != _PROCESS_ID:
+            self._drop([k for k in message.get("keys") or [] if self._family(k) is not None])
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(Config.LOCAL_CACHE_CHANNEL)
+                # Anything cached before (re)subscribing may have missed an invalidation
+                self.clear_local()
+                backoff = 1
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self.handle_invalidation(message.get("data"))
+            except Exception as e:
+                logger.warning(f"Local cache invalidation listener error: {e}, retrying in {backoff}s")
+                self.clear_local()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def stats(self) -> dict:
+        """Per key family hit counts and ratios for the local tier and Redis."""
+        with self._stats_lock:
+            return {name: self._stats[name].summary(len(self._caches[name])) for name in self._stats}
+
+
+class _TieredPipeline:
+    """Pipeline proxy that invalidates locally cached keys written in the pipeline once it executes.
+
+    Chained calls (pipe.get(a).set(b, 1)) keep going through the proxy.
+    """
+
+    def __init__(self, tiered, pipe):
+        self._tiered = tiered
+        self._pipe = pipe
+        self._written = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._pipe, name)
+        if not callable(attr):
+            return attr
+
+        def command(*args, **kwargs):
+            if name in _WRITE_COMMANDS:
+                self._written.extend(_written_keys(name, args))
+            result = attr(*args, **kwargs)
+            return self if result is self._pipe else result
+        return command
+
+    def execute(self, *args, **kwargs):
+        try:
+            return self._pipe.execute(*args, **kwargs)
+        finally:
+            written, self._written = self._written, []
+            self._tiered.invalidate(*written)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        reset = getattr(self._pipe, "reset", None)
+        if reset:
+            reset()
@@ -0,0 +1,61 @@
+"""Stale-while-revalidate cache entries: a soft expiry inside the value, the hard expiry as the Redis TTL."""
+import threading
+import time
+import uuid
+
+from src.utils.compression import dumps_cached, loads_cached
+from src.utils.logger import logger
+
+SWR_LOCK_PREFIX = "swr_lock_"
+SWR_LOCK_TTL = 300  # seconds a background rebuild may hold its refresh lock
+
+
+def write_swr(r, key: str, value, soft_ttl: int, hard_ttl: int):
+    """Cache value as fresh for soft_ttl seconds; it stays servable (stale) until hard_ttl."""
+    r.setex(key, hard_ttl, dumps_cached({"value": value, "fresh_until": time.time() + soft_ttl}))
+
+
+def read_swr(raw):
+    """Decode a stored entry into (value, stale); (None, False) when there is nothing cached.
+
+    Values written before soft expiry existed (a bare JSON payload) count as stale,
+    so they are served once and refreshed in the background.
+    """
+    if not raw:
+        return None, False
+    entry = loads_cached(raw)
+    if isinstance(entry, dict) and "fresh_until" in entry:
+        return entry.get("value"), time.time() >= entry["fresh_until"]
+    return entry, True
+
+
+def refresh_in_background(r, key: str, rebuild, name: str = "swr-refresh") -> bool:
+    """Run rebuild() on a daemon thread unless another worker already holds the refresh lock for key.
+
+    Returns True when this call started the refresh.
+    """
+    from src.utils.cache import release_lock
+
+    lock_key = f"{SWR_LOCK_PREFIX}{key}"
+    token = uuid.uuid4().hex
+    try:
+        if not r.set(lock_key, token, nx=True, ex=SWR_LOCK_TTL):
+            return False
+    except Exception as e:
+        logger.warning(f"Failed to take refresh lock for {key}: {e}")
+        return False
+
+    def run():
+        try:
+            rebuild()
+            logger.info(f"🔄 Refreshed stale cache entry {key} in the background")
+        except Exception as e:
+            logger.error(f"❌ Background refresh of {key} failed: {e}. Keeping the stale value.")
+        finally:
+            try:
+                release_lock(r, lock_key, token)
+            except Exception as e:
+                logger.warning(f"Failed to release refresh lock for {key}: {e}")
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return True
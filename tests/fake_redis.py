@@ -0,0 +1,110 @@
+"""Minimal in-memory stand-in for the subset of redis-py used by the services (no TTL enforcement)."""
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.hashes = {}
+        self.lists = {}
+        self.published = []
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+        return True
+
+    def incr(self, key, amount=1):
+        self.data[key] = str(int(self.data.get(key, 0)) + amount)
+        return int(self.data[key])
+
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            for store in (self.data, self.hashes, self.lists):
+                removed += int(store.pop(key, None) is not None)
+        return removed
+
+    def exists(self, *keys):
+        return sum(1 for k in keys if k in self.data or k in self.hashes or k in self.lists)
+
+    def expire(self, key, ttl):
+        return key in self.data or key in self.hashes or key in self.lists
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        h = self.hashes.setdefault(key, {})
+        if mapping:
+            h.update({k: str(v) for k, v in mapping.items()})
+        if field is not None:
+            h[field] = value
+        return 1
+
+    def hsetnx(self, key, field, value):
+        h = self.hashes.setdefault(key, {})
+        if field in h:
+            return 0
+        h[field] = value
+        return 1
+
+    def hdel(self, key, *fields):
+        h = self.hashes.get(key, {})
+        return sum(1 for f in fields if h.pop(f, None) is not None)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    def lrange(self, key, start, end):
+        items = self.lists.get(key, [])
+        return items[start:None if end == -1 else end + 1]
+
+    def eval(self, script, numkeys, *args):
+        # Only the compare-and-delete lock release script is used
+        key, token = args[0], args[1]
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+    def scan_iter(self, pattern):
+        import fnmatch
+        return [k for k in list(self.data) + list(self.hashes) if fnmatch.fnmatch(k, pattern)]
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues calls and runs them against the FakeRedis on execute()."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        results = [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+        self.calls = []
+        return results
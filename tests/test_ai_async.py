@@ -0,0 +1,179 @@
+import unittest
+import os
+import sys
+import asyncio
+import json
+import time
+import threading
+import uuid
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_redis import FakeRedis
+from src.config.settings import Config
+from src.services.ai import AsyncAIService
+from src.utils.ai_client import run_ai_coroutine
+from src.utils.ai_metrics import current_stage, ai_stage
+from src.utils.circuit_breaker import ModelCircuitBreaker
+
+
+def _response(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class FakeAsyncCompletions:
+    """Stand-in for AsyncOpenAI chat.completions with per-model latency and failure scripts."""
+
+    def __init__(self, delays=None, failing=()):
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.calls = []
+
+    async def create(self, model, **kwargs):
+        self.calls.append(model)
+        await asyncio.sleep(self.delays.get(model, 0))
+        if model in self.failing:
+            raise RuntimeError(f"{model} down")
+        return _response(f"answer from {model}")
+
+
+def _service(completions):
+    ai = AsyncAIService()
+    ai.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    ai.telegram = MagicMock()
+    return ai
+
+
+@patch("src.utils.circuit_breaker.get_redis", return_value=None)
+class TestAsyncModelFallback(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("src.services.ai.breaker", ModelCircuitBreaker())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_falls_back_after_primary_error(self, _):
+        fake = FakeAsyncCompletions(failing={"brain"})
+        with patch.object(Config, "CUSTOM_AI_MODEL", "fallback"), patch.object(Config, "AI_HEDGE_DELAY", 0):
+            result = asyncio.run(_service(fake).generate_content("hi", model="brain"))
+        self.assertEqual(result, "answer from fallback")
+        self.assertEqual(fake.calls, ["brain", "fallback"])
+
+    def test_hedge_returns_fallback_when_primary_is_slow(self, _):
+        fake = FakeAsyncCompletions(delays={"brain": 0.5})
+        with patch.object(Config, "CUSTOM_AI_MODEL", "fallback"), patch.object(Config, "AI_HEDGE_DELAY", 0.05):
+            start = time.monotonic()
+            result = asyncio.run(_service(fake).generate_content("hi", model="brain"))
+        self.assertEqual(result, "answer from fallback")
+        self.assertLess(time.monotonic() - start, 0.4)
+
+    def test_breaker_calls_run_off_the_event_loop(self, _):
+        breaker_threads = []
+        real = ModelCircuitBreaker()
+
+        def record(fn):
+            def wrapper(*args, **kwargs):
+                breaker_threads.append(threading.get_ident())
+                return fn(*args, **kwargs)
+            return wrapper
+
+        fake_breaker = SimpleNamespace(allow=record(real.allow), record_success=record(real.record_success), record_failure=record(real.record_failure))
+
+        async def run():
+            loop_thread = threading.get_ident()
+            result = await _service(FakeAsyncCompletions(failing={"brain"})).generate_content("hi", model="brain")
+            return loop_thread, result
+
+        with patch("src.services.ai.breaker", fake_breaker), \
+             patch.object(Config, "CUSTOM_AI_MODEL", "fallback"), patch.object(Config, "AI_HEDGE_DELAY", 0):
+            loop_thread, result = asyncio.run(run())
+        self.assertEqual(result, "answer from fallback")
+        self.assertEqual(len(breaker_threads), 3)  # allow, failure on brain, success on fallback
+        self.assertNotIn(loop_thread, breaker_threads)
+
+    def test_total_failure_returns_error_string(self, _):
+        fake = FakeAsyncCompletions(failing={"brain", "fallback"})
+        ai = _service(fake)
+        with patch.object(Config, "CUSTOM_AI_MODEL", "fallback"), patch.object(Config, "AI_HEDGE_DELAY", 0):
+            result = asyncio.run(ai.generate_content("hi", model="brain"))
+        self.assertEqual(result, "Error: fallback down")
+        ai.telegram.send_message.assert_called_once()
+
+
+class TestAsyncQuizPipeline(unittest.TestCase):
+
+    def test_chunks_are_generated_concurrently_on_one_thread(self):
+        from src.services.study_logic import generate_quiz
+
+        threads = set()
+
+        async def slow_generate(ai_self, content, num_questions=15, **kwargs):
+            threads.add(threading.get_ident())
+            await asyncio.sleep(0.3)
+            return json.dumps([{"q": f"Câu hỏi {uuid.uuid4().hex}", "options": ["A", "B"], "correct": 0} for _ in range(num_questions)])
+
+        async def passthrough(ai_self, raw, *args, **kwargs):
+            return raw
+
+        with patch("src.services.study_logic.get_redis", return_value=FakeRedis()), \
+             patch("src.services.notion.NotionService.fetch_page_content", return_value=[f"# Phần {i}\n" + "nội dung " * 400 for i in range(4)]), \
+             patch("src.services.study_logic.get_page_title", return_value="Bài"), \
+             patch("src.services.ai.AsyncAIService.generate_quiz", slow_generate), \
+             patch("src.services.ai.AsyncAIService.enhance_quiz", passthrough), \
+             patch("src.services.ai.AsyncAIService.review_latex_quiz", passthrough), \
+             patch.object(Config, "QUIZ_CHUNK_TOKENS", 700):
+            start = time.monotonic()
+            quiz = generate_quiz("topic-async", num_questions=8)
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(len(quiz["questions"]), 8)
+        self.assertLess(elapsed, 0.6)  # four 0.3s chunk calls overlapped
+        self.assertEqual(len(threads), 1)
+
+    def test_cache_round_trips_run_off_the_event_loop(self):
+        from src.services.study_logic import generate_quiz
+
+        loop_threads, redis_threads = set(), set()
+
+        class RecordingRedis(FakeRedis):
+            pass
+
+        for name in ("get", "set", "hget", "hset", "eval", "publish"):
+            def make(fn):
+                def wrapper(self, *args, **kwargs):
+                    redis_threads.add(threading.get_ident())
+                    return fn(self, *args, **kwargs)
+                return wrapper
+            setattr(RecordingRedis, name, make(getattr(FakeRedis, name)))
+
+        async def generate(ai_self, content, num_questions=15, **kwargs):
+            loop_threads.add(threading.get_ident())
+            return json.dumps([{"q": f"Câu hỏi {uuid.uuid4().hex}", "options": ["A", "B"], "correct": 0} for _ in range(num_questions)])
+
+        async def passthrough(ai_self, raw, *args, **kwargs):
+            return raw
+
+        with patch("src.services.study_logic.get_redis", return_value=RecordingRedis()), \
+             patch("src.services.notion.NotionService.fetch_page_content", return_value=["nội dung"]), \
+             patch("src.services.study_logic.get_page_title", return_value="Bài"), \
+             patch("src.services.ai.AsyncAIService.generate_quiz", generate), \
+             patch("src.services.ai.AsyncAIService.enhance_quiz", passthrough), \
+             patch("src.services.ai.AsyncAIService.review_latex_quiz", passthrough):
+            quiz = generate_quiz("topic-offloop", num_questions=3)
+
+        self.assertEqual(len(quiz["questions"]), 3)
+        self.assertTrue(redis_threads)
+        self.assertFalse(loop_threads & redis_threads)
+
+    def test_run_ai_coroutine_carries_caller_context(self):
+        async def read_stage():
+            return current_stage()
+
+        with ai_stage("outer"):
+            self.assertEqual(run_ai_coroutine(read_stage()), "outer")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import os
+import sys
+import json
+import threading
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_redis import FakeRedis
+from src.config.settings import Config
+from src.services.ai import BatchAIService
+from src.utils.ai_batch import BatchCollector, LocalBatchBackend
+from src.utils.ai_client import llm_limiter
+from src.utils.compression import loads_cached
+
+
+class RecordingBackend(LocalBatchBackend):
+    def __init__(self, complete_fn):
+        super().__init__(complete_fn=complete_fn, concurrency=4)
+        self.batch_sizes = []
+
+    def submit(self, requests):
+        self.batch_sizes.append(len(requests))
+        return super().submit(requests)
+
+
+def _service(backend, **collector_kwargs):
+    ai = BatchAIService(BatchCollector(backend=backend, window=0.2, poll_interval=0.01, **collector_kwargs))
+    ai.telegram = MagicMock()
+    return ai
+
+
+class TestBatchCollector(unittest.TestCase):
+
+    def test_concurrent_prompts_share_one_batch(self):
+        backend = RecordingBackend(lambda prompt, model: (f"answer to {prompt}", {"prompt_tokens": 3, "completion_tokens": 2}))
+        ai = _service(backend)
+        results = {}
+
+        def call(i):
+            results[i] = ai.generate_content(f"p{i}", model="m")
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        ai.collector.close()
+
+        self.assertEqual(backend.batch_sizes, [5])
+        self.assertEqual(results, {i: f"answer to p{i}" for i in range(5)})
+
+    def test_max_size_splits_batches(self):
+        backend = RecordingBackend(lambda prompt, model: ("ok", {}))
+        collector = BatchCollector(backend=backend, max_size=2, window=0.2, poll_interval=0.01)
+        futures = [collector.submit(f"p{i}", "m") for i in range(5)]
+        self.assertTrue(all(f.result(timeout=2)["content"] == "ok" for f in futures))
+        collector.close()
+        self.assertEqual(backend.batch_sizes, [2, 2, 1])
+
+    def test_failed_item_is_resubmitted_to_fallback_model(self):
+        down = {"primary"}
+
+        def complete(prompt, model):
+            if model in down:
+                raise RuntimeError(f"{model} down")
+            return f"from {model}", {}
+
+        ai = _service(RecordingBackend(complete))
+        with patch.object(Config, "CUSTOM_AI_MODEL", "backup"):
+            self.assertEqual(ai.generate_content("p", model="primary"), "from backup")
+            down.add("backup")
+            self.assertEqual(ai.generate_content("p", model="primary"), "Error: backup down")
+        ai.collector.close()
+
+
+class TestBatchQuizRefresh(unittest.TestCase):
+
+    def test_refresh_overwrites_cache_without_interactive_slots(self):
+        from src.jobs.batch_quiz_refresh import run_batch_quiz_refresh
+
+        redis = FakeRedis()
+        redis.set("quiz_t1_15_medium_balanced", json.dumps({"questions": [{"q": "old"}]}))
+        quiz = json.dumps([{"q": f"Câu mới số {i} về chủ đề {i * 7}", "options": ["A", "B"], "correct": 0} for i in range(15)])
+        backend = RecordingBackend(lambda prompt, model: (quiz, {}))
+        calls_before = llm_limiter.stats()["total_calls"]
+
+        with patch("src.services.study_logic.get_redis", return_value=redis), \
+             patch("src.jobs.batch_quiz_refresh.get_redis", return_value=redis), \
+             patch("src.jobs.batch_quiz_refresh.get_candidates", return_value=[{"id": "t1", "title": "Bài 1"}, {"id": "t2", "title": "Bài 2"}]), \
+             patch("src.services.notion.NotionService.fetch_page_content", return_value=["Nội dung"]), \
+             patch("src.services.study_logic.get_page_title", return_value="Bài"), \
+             patch.object(Config, "AI_BATCH_WINDOW", 0.2), \
+             patch.object(Config, "AI_BATCH_POLL_INTERVAL", 0.01):
+            summary = run_batch_quiz_refresh(backend=backend)
+
+        self.assertEqual(len(summary["refreshed"]), 2)
+        self.assertEqual(llm_limiter.stats()["total_calls"], calls_before)
+        # generation and enhance of both topics each travel in a shared batch; clean LaTeX needs no review call
+        self.assertEqual(backend.batch_sizes, [2, 2])
+        cached = loads_cached(redis.get("quiz_t1_15_medium_balanced"))
+        self.assertEqual(cached["questions"][0]["q"], "Câu mới số 0 về chủ đề 0")
+
+    def test_configs_sharing_a_bank_field_generate_once_off_the_shared_loop(self):
+        from src.jobs.batch_quiz_refresh import run_batch_quiz_refresh
+
+        redis = FakeRedis()
+        redis.set("quiz_last_config", json.dumps({"num_questions": 10, "difficulty": "medium", "question_type": "balanced"}))
+        quiz = json.dumps([{"q": f"Câu mới số {i} về chủ đề {i * 7}", "options": ["A", "B"], "correct": 0} for i in range(15)])
+        backend = RecordingBackend(lambda prompt, model: (quiz, {}))
+        title_threads = []
+
+        def page_title(topic_id):
+            title_threads.append(threading.current_thread().name)
+            return "Bài"
+
+        with patch("src.services.study_logic.get_redis", return_value=redis), \
+             patch("src.jobs.batch_quiz_refresh.get_redis", return_value=redis), \
+             patch.object(Config, "QUIZ_WARM_LAST_CONFIG", True), \
+             patch("src.jobs.batch_quiz_refresh.get_candidates", return_value=[{"id": "t1", "title": "Bài 1"}]), \
+             patch("src.services.notion.NotionService.fetch_page_content", return_value=["Nội dung"]), \
+             patch("src.services.study_logic.get_page_title", side_effect=page_title), \
+             patch.object(Config, "AI_BATCH_WINDOW", 0.2), \
+             patch.object(Config, "AI_BATCH_POLL_INTERVAL", 0.01):
+            summary = run_batch_quiz_refresh(backend=backend)
+
+        self.assertEqual(len(summary["refreshed"]), 2)
+        # One generate + one enhance prompt: the 10-question quiz is assembled from the refreshed bank
+        self.assertEqual(backend.batch_sizes, [1, 1])
+        small = loads_cached(redis.get("quiz_t1_10_medium_balanced"))
+        self.assertEqual([q["q"] for q in small["questions"]], [f"Câu mới số {i} về chủ đề {i * 7}" for i in range(10)])
+        self.assertTrue(title_threads)
+        self.assertTrue(all(name.startswith("batch-refresh") for name in title_threads), title_threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
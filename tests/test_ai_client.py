@@ -0,0 +1,115 @@
+import unittest
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.ai_client import LLMLimiter
+
+
+class TestLLMLimiter(unittest.TestCase):
+
+    def test_caps_in_flight_calls(self):
+        limiter = LLMLimiter(2)
+        peak = []
+        lock = threading.Lock()
+        active = [0]
+
+        def call():
+            with limiter.slot():
+                with lock:
+                    active[0] += 1
+                    peak.append(active[0])
+                time.sleep(0.02)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertLessEqual(max(peak), 2)
+        stats = limiter.stats()
+        self.assertEqual(stats["total_calls"], 8)
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["queued"], 0)
+        self.assertGreater(stats["max_wait_s"], 0)
+
+    def test_background_callers_yield_to_interactive_ones(self):
+        limiter = LLMLimiter(1)
+        order = []
+        holding = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with limiter.slot():
+                holding.set()
+                release.wait(2)
+
+        def call(name, background):
+            with limiter.slot(background=background):
+                order.append(name)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        holding.wait(2)
+        background = threading.Thread(target=call, args=("background", True))
+        background.start()
+        while limiter.stats()["background_queued"] == 0:
+            time.sleep(0.001)
+        interactive = threading.Thread(target=call, args=("interactive", False))
+        interactive.start()
+        while limiter.stats()["queued"] == 0:
+            time.sleep(0.001)
+        release.set()
+        for t in (holder, background, interactive):
+            t.join()
+
+        self.assertEqual(order, ["interactive", "background"])
+        self.assertEqual(limiter.stats()["total_calls"], 2)  # background waits stay out of the stats
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+
+    def test_waiters_are_served_in_arrival_order(self):
+        limiter = LLMLimiter(1)
+        order = []
+
+        async def main():
+            async def call(i):
+                async with limiter.slot_async():
+                    order.append(i)
+                    await asyncio.sleep(0.005)
+
+            async with limiter.slot_async():
+                tasks = []
+                for i in range(5):
+                    tasks.append(asyncio.create_task(call(i)))
+                    await asyncio.sleep(0)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(main())
+        self.assertEqual(order, [0, 1, 2, 3, 4])
+
+    def test_cancelled_async_waiter_does_not_leak_slot(self):
+        limiter = LLMLimiter(1)
+
+        async def main():
+            async with limiter.slot_async():
+                task = asyncio.create_task(limiter.slot_async().__aenter__())
+                await asyncio.sleep(0)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+            async with limiter.slot_async():
+                pass
+
+        asyncio.run(main())
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.ai_metrics import track_usage, ai_stage, record_llm_call, run_in_context, get_ai_metrics
+
+
+class TestAIMetrics(unittest.TestCase):
+
+    def test_tracker_collects_stage_usage_across_worker_threads(self):
+        with track_usage() as tracker:
+            with ai_stage("chunk_generation"):
+                with ThreadPoolExecutor(max_workers=3) as executor:
+                    futures = [run_in_context(executor, record_llm_call, "worker-model", 100, 40, 0.5) for _ in range(3)]
+                    for f in futures:
+                        f.result()
+            with ai_stage("enhance"):
+                record_llm_call("brain-model", 500, 200, 2.0, fallback=True)
+
+        summary = tracker.summary()
+        self.assertEqual(summary["llm_calls"], 4)
+        self.assertEqual(summary["prompt_tokens"], 800)
+        self.assertEqual(summary["completion_tokens"], 320)
+        self.assertEqual(summary["fallbacks"], 1)
+        self.assertEqual(summary["stages"]["chunk_generation"]["calls"], 3)
+        self.assertEqual(summary["stages"]["enhance"]["prompt_tokens"], 500)
+
+    def test_calls_outside_tracker_only_feed_rolling_aggregates(self):
+        record_llm_call("agg-model", 10, 5, 1.0, stage="agg_stage")
+        record_llm_call("agg-model", 10, 5, 3.0, stage="agg_stage", success=False)
+        metrics = get_ai_metrics()
+        row = next(a for a in metrics["by_stage_model"] if a["stage"] == "agg_stage")
+        self.assertEqual(row["calls"], 2)
+        self.assertEqual(row["errors"], 1)
+        self.assertEqual(row["latency_p95_s"], 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import unittest
+import os
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config.settings import Config
+from src.services.ai import AIService
+from src.utils.circuit_breaker import ModelCircuitBreaker
+
+
+def _response(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class FakeCompletions:
+    """Stand-in for client.chat.completions with per-model latency and failure scripts."""
+
+    def __init__(self, delays=None, failing=()):
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.calls = []
+
+    def create(self, model, **kwargs):
+        self.calls.append(model)
+        time.sleep(self.delays.get(model, 0))
+        if model in self.failing:
+            raise RuntimeError(f"{model} down")
+        return _response(f"answer from {model}")
+
+
+def _service(completions):
+    ai = AIService()
+    ai.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    ai.telegram = MagicMock()
+    return ai
+
+
+@patch("src.utils.circuit_breaker.get_redis", return_value=None)
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_consecutive_failures_and_probes_after_cooldown(self, _):
+        br = ModelCircuitBreaker()
+        with patch.object(Config, "AI_BREAKER_FAILURE_THRESHOLD", 2), patch.object(Config, "AI_BREAKER_COOLDOWN", 0.05):
+            br.record_failure("brain")
+            self.assertTrue(br.allow("brain"))
+            br.record_failure("brain")
+            self.assertFalse(br.allow("brain"))
+            time.sleep(0.06)
+            self.assertTrue(br.allow("brain"))   # single half-open probe
+            probe_started = time.time()
+            self.assertFalse(br.allow("brain"))
+            br.record_success("brain", 1.0, started_at=probe_started)
+            self.assertTrue(br.allow("brain"))
+
+    def test_success_started_before_opening_does_not_close(self, _):
+        br = ModelCircuitBreaker()
+        with patch.object(Config, "AI_BREAKER_FAILURE_THRESHOLD", 1), patch.object(Config, "AI_BREAKER_COOLDOWN", 60):
+            slow_call_started = time.time()
+            br.record_failure("brain")
+            self.assertFalse(br.allow("brain"))
+            # A slow call (or hedge loser) sent before the circuit opened finishes late
+            br.record_success("brain", 5.0, started_at=slow_call_started)
+            self.assertFalse(br.allow("brain"))
+
+    def test_success_only_closes_from_probe_with_redis(self, _):
+        from src.utils.cache_backends import MemoryCacheBackend
+
+        redis = MemoryCacheBackend()
+        br = ModelCircuitBreaker()
+        with patch("src.utils.circuit_breaker.get_redis", return_value=redis), \
+             patch.object(Config, "AI_BREAKER_FAILURE_THRESHOLD", 1), patch.object(Config, "AI_BREAKER_COOLDOWN", 0.05):
+            br.record_success("brain", 1.0)
+            self.assertNotEqual(redis.ttl("ai_breaker:brain"), -1)  # the hash it creates still expires
+            slow_call_started = time.time()
+            br.record_failure("brain")
+            br.record_success("brain", 5.0, started_at=slow_call_started)
+            self.assertEqual(redis.hget("ai_breaker:brain", "state"), "open")
+            time.sleep(0.06)
+            self.assertTrue(br.allow("brain"))
+            br.record_success("brain", 0.1, started_at=time.time())
+            self.assertEqual(redis.hget("ai_breaker:brain", "state"), "closed")
+
+    def test_opens_on_p95_latency_breach(self, _):
+        br = ModelCircuitBreaker()
+        with patch.object(Config, "AI_BREAKER_P95_SECONDS", 10), patch.object(Config, "AI_BREAKER_MIN_SAMPLES", 3):
+            br.record_success("brain", 1)
+            br.record_success("brain", 2)
+            self.assertTrue(br.allow("brain"))
+            br.record_success("brain", 30)
+            self.assertFalse(br.allow("brain"))
+
+
+@patch("src.utils.circuit_breaker.get_redis", return_value=None)
+class TestModelFallback(unittest.TestCase):
+
+    def setUp(self):
+        self.breaker = ModelCircuitBreaker()
+        patcher = patch("src.services.ai.breaker", self.breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_falls_back_after_primary_error(self, _):
+        fake = FakeCompletions(failing={"brain"})
+        with patch.object(Config, "CUSTOM_AI_MODEL", "fallback"), patch.object(Config, "AI_HEDGE_DELAY", 0):
+            result = _service(fake).generate_content("hi", model="brain")
+        self.assertEqual(result, "answer from fallback")
+        self.assertEqual(fake.calls, ["brain", "fallback"])
+
+    def test_hedge_returns_fallback_when_primary_is_slow(self, _):
+        fake = FakeCompletions(delays={"brain": 0.5})
+        with patch.object(Config, "CUSTOM_AI_MODEL", "fallback"), patch.object(Config, "AI_HEDGE_DELAY", 0.05):
+            start = time.monotonic()
+            result = _service(fake).generate_content("hi", model="brain")
+            elapsed = time.monotonic() - start
+        self.assertEqual(result, "answer from fallback")
+        self.assertLess(elapsed, 0.4)
+
+    def test_open_circuit_skips_primary(self, _):
+        fake = FakeCompletions()
+        with patch.object(Config, "CUSTOM_AI_MODEL", "fallback"), patch.object(Config, "AI_HEDGE_DELAY", 0), \
+             patch.object(Config, "AI_BREAKER_FAILURE_THRESHOLD", 1):
+            self.breaker.record_failure("brain")
+            result = _service(fake).generate_content("hi", model="brain")
+        self.assertEqual(result, "answer from fallback")
+        self.assertEqual(fake.calls, ["fallback"])
+
+
+class TestAgentToolCalls(unittest.TestCase):
+
+    @staticmethod
+    def _call(call_id, name, args):
+        return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=args))
+
+    def test_turn_runs_concurrently_and_memoizes(self):
+        executed = []
+
+        def slow_tool(name, args):
+            executed.append((name, args.get("page_id")))
+            time.sleep(0.1)
+            return f"{name}:{args.get('page_id')}"
+
+        ai = _service(FakeCompletions())
+        cache = {}
+        calls = [
+            self._call("1", "fetch_notion_tasks", "{}"),
+            self._call("2", "fetch_notion_page_content", '{"page_id": "a"}'),
+            self._call("3", "fetch_notion_page_content", '{"page_id": "b"}'),
+            self._call("4", "fetch_notion_page_content", '{"page_id": "a"}'),
+        ]
+        with patch.object(ai, "_execute_tool", side_effect=slow_tool):
+            start = time.monotonic()
+            results = ai._run_tool_calls(calls, cache)
+            elapsed = time.monotonic() - start
+            # A later turn repeating a call is served from the run cache
+            again = ai._run_tool_calls([self._call("5", "fetch_notion_page_content", '{"page_id": "b"}')], cache)
+
+        self.assertLess(elapsed, 0.25)
+        self.assertEqual(len(executed), 3)
+        self.assertEqual([r["tool_call_id"] for r in results], ["1", "2", "3", "4"])
+        self.assertEqual(results[3]["content"], "fetch_notion_page_content:a")
+        self.assertEqual(again[0]["content"], "fetch_notion_page_content:b")
+
+    def test_errors_are_not_memoized(self):
+        ai = _service(FakeCompletions())
+        cache = {}
+        with patch.object(ai, "_execute_tool", return_value="Error executing tool: boom") as tool:
+            ai._run_tool_calls([self._call("1", "fetch_notion_tasks", "{}")], cache)
+            ai._run_tool_calls([self._call("2", "fetch_notion_tasks", "{}")], cache)
+        self.assertEqual(tool.call_count, 2)
+        self.assertEqual(cache, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
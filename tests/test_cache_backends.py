@@ -0,0 +1,122 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config.settings import Config
+from src.utils import cache
+from src.utils.cache import release_lock
+from src.utils.cache_backends import CacheBackendError, MemoryCacheBackend, SQLiteCacheBackend
+
+
+class _BackendContract:
+    """Redis semantics every local backend must provide; mixed into one TestCase per backend."""
+
+    def make_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.r = self.make_backend()
+
+    def test_strings_ttl_and_nx_locks(self):
+        self.assertTrue(self.r.set("quiz_lock_t1", "token-a", nx=True, ex=60))
+        self.assertIsNone(self.r.set("quiz_lock_t1", "token-b", nx=True, ex=60))
+        self.assertFalse(release_lock(self.r, "quiz_lock_t1", "token-b"))
+        self.assertTrue(release_lock(self.r, "quiz_lock_t1", "token-a"))
+        self.assertIsNone(self.r.get("quiz_lock_t1"))
+
+        self.r.set("short", "x", px=50)
+        self.r.setex("long", 60, "y")
+        self.assertEqual(self.r.exists("short", "long", "missing"), 2)
+        self.assertEqual(self.r.ttl("long"), 60)
+        time.sleep(0.06)
+        self.assertIsNone(self.r.get("short"))
+        self.assertEqual(list(self.r.scan_iter("*")), ["long"])
+        self.assertEqual((self.r.incr("counter"), self.r.incr("counter")), (1, 2))
+        self.assertEqual(self.r.get("counter"), "2")
+
+    def test_hashes_and_lists(self):
+        self.assertEqual(self.r.hset("h", mapping={"a": 1, "b": "x"}), 2)
+        self.assertEqual(self.r.hsetnx("h", "a", "9"), 0)
+        self.assertEqual(self.r.hincrby("h", "a", 2), 3)
+        self.r.hdel("h", "b")
+        self.assertEqual(self.r.hgetall("h"), {"a": "3"})
+        with self.assertRaises(CacheBackendError):
+            self.r.get("h")
+
+        self.r.rpush("l", "b", "c")
+        self.r.lpush("l", "a")
+        self.r.ltrim("l", 0, 1)
+        self.assertEqual(self.r.lrange("l", 0, -1), ["a", "b"])
+
+    def test_pipeline_runs_commands_in_order(self):
+        pipe = self.r.pipeline()
+        pipe.hset("quiz_progress_user_1", "t1", "{}")
+        pipe.expire("quiz_progress_user_1", 60)
+        pipe.hgetall("quiz_progress_user_1")
+        self.assertEqual(pipe.execute(), [1, True, {"t1": "{}"}])
+
+
+class TestMemoryCacheBackend(_BackendContract, unittest.TestCase):
+
+    def make_backend(self):
+        return MemoryCacheBackend()
+
+
+class TestSQLiteCacheBackend(_BackendContract, unittest.TestCase):
+
+    def make_backend(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        return SQLiteCacheBackend(os.path.join(self.tmp.name, "cache.sqlite3"))
+
+    def test_values_survive_a_restart(self):
+        self.r.setex("quiz_t1_15_medium_balanced", 60, "cached")
+        reopened = SQLiteCacheBackend(self.r.path)
+        self.assertEqual(reopened.get("quiz_t1_15_medium_balanced"), "cached")
+
+
+class TestBackendSelection(unittest.TestCase):
+
+    def setUp(self):
+        p = patch.object(cache, "_client", None)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_auto_uses_memory_without_redis_url(self):
+        with patch.object(Config, "CACHE_BACKEND", "auto"), patch.object(Config, "REDIS_URL", None):
+            self.assertIsInstance(cache.get_redis(), MemoryCacheBackend)
+
+    def test_none_disables_caching(self):
+        with patch.object(Config, "CACHE_BACKEND", "none"):
+            self.assertIsNone(cache.get_redis())
+
+    def test_quiz_is_generated_once_without_redis(self):
+        from src.services.study_logic import generate_quiz
+        calls = []
+
+        async def fake_generate(ai_self, content, num_questions=15, **kwargs):
+            calls.append(num_questions)
+            return json.dumps([{"q": "Câu 1", "options": ["A", "B"], "correct": 0, "explanation": ""}])
+
+        async def passthrough(ai_self, raw, *args, **kwargs):
+            return raw
+
+        with patch.object(Config, "CACHE_BACKEND", "memory"), \
+             patch("src.services.notion.NotionService.fetch_page_content", return_value=["Nội dung"]), \
+             patch("src.services.study_logic.get_page_title", return_value="Bài 1"), \
+             patch("src.services.ai.AsyncAIService.generate_quiz", fake_generate), \
+             patch("src.services.ai.AsyncAIService.enhance_quiz", passthrough):
+            first = generate_quiz("t1", num_questions=1)
+            second = generate_quiz("t1", num_questions=1)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(first["questions"], second["questions"])
+
+
+if __name__ == '__main__':
+    unittest.main()
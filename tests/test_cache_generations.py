@@ -0,0 +1,90 @@
+import unittest
+import os
+import sys
+import json
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_redis import FakeRedis
+from src.utils.cache import LOCAL_CACHE_FAMILIES, LOCAL_CACHE_EXCLUDED_PREFIXES, cache_generation, bump_cache_generation, versioned_key
+from src.utils.local_cache import TieredRedis
+from src.services.study_logic import clear_quiz_cache, generate_quiz, get_candidates_snapshot, update_status, _read_cached_quizzes
+
+
+class _InlineThread:
+    def __init__(self, target, **kwargs):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+
+class NoScanRedis(FakeRedis):
+    def scan_iter(self, pattern):
+        raise AssertionError(f"unexpected keyspace scan for {pattern}")
+
+
+class TestCacheGenerations(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = NoScanRedis()
+        p = patch("src.services.study_logic.get_redis", return_value=self.redis)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_generation_zero_keeps_existing_keys(self):
+        self.assertEqual(cache_generation(self.redis, "quiz_t1"), 0)
+        self.assertEqual(versioned_key("quiz_t1_15_medium_balanced", 0), "quiz_t1_15_medium_balanced")
+        self.assertEqual(bump_cache_generation(self.redis, "quiz_t1"), 1)
+        self.assertEqual(versioned_key("quiz_t1_15_medium_balanced", cache_generation(self.redis, "quiz_t1")), "quiz_t1_15_medium_balanced_v1")
+
+    def test_update_status_invalidates_candidates_with_one_incr(self):
+        self.redis.set("study_candidates_all", json.dumps([{"id": "old"}]))
+        with patch("src.services.notion.NotionService.update_page_property", return_value=True), \
+             patch("src.services.notion.NotionService.get_review_notes", return_value=[]) as notes, \
+             patch("src.utils.swr.threading.Thread", _InlineThread):
+            self.assertTrue(update_status("t1", status="da_nam_vung"))
+            # The previous generation is never served again: the list is rebuilt from Notion
+            self.assertEqual(get_candidates_snapshot(), ([], False))
+        notes.assert_called_once()
+        self.assertEqual(self.redis.get("cache_gen_study_candidates"), "1")
+
+    def test_clear_quiz_cache_moves_topic_to_new_generation(self):
+        self.redis.set("quiz_t1_15_medium_balanced", json.dumps({"questions": [{"q": "old"}]}))
+        self.redis.set("quiz_t1_10_hard_theory", json.dumps({"questions": [{"q": "old"}]}))
+        self.redis.set("quiz_t2_15_medium_balanced", json.dumps({"questions": [{"q": "other"}]}))
+        self.redis.set("quiz_t1", "legacy")
+        self.assertEqual(set(_read_cached_quizzes([{"id": "t1"}, {"id": "t2"}])), {"t1", "t2"})
+
+        self.assertTrue(clear_quiz_cache("t1"))
+        self.assertIsNone(self.redis.get("quiz_t1"))
+        self.assertEqual(set(_read_cached_quizzes([{"id": "t1"}, {"id": "t2"}])), {"t2"})
+
+        async def fake_generate(ai_self, content, num_questions=15, **kwargs):
+            return json.dumps([{"q": "new", "options": ["A", "B"], "correct": 0, "explanation": ""}])
+
+        with patch("src.services.notion.NotionService.fetch_page_content", return_value=["Nội dung"]), \
+             patch("src.services.study_logic.get_page_title", return_value="Bài 1"), \
+             patch("src.services.ai.AsyncAIService.generate_quiz", fake_generate), \
+             patch("src.services.ai.AsyncAIService.enhance_quiz", _passthrough):
+            quiz = generate_quiz("t1", num_questions=1)
+        self.assertEqual(quiz["questions"][0]["q"], "new")
+        self.assertIn("quiz_t1_1_medium_balanced_v1", self.redis.data)
+
+    def test_incr_invalidates_local_tier(self):
+        tiered = TieredRedis(self.redis, LOCAL_CACHE_FAMILIES, excluded_prefixes=LOCAL_CACHE_EXCLUDED_PREFIXES, subscribe=False)
+        self.assertEqual(cache_generation(tiered, "quiz_t1"), 0)
+        self.assertEqual(cache_generation(tiered, "quiz_t1"), 0)
+        bump_cache_generation(tiered, "quiz_t1")
+        self.assertEqual(cache_generation(tiered, "quiz_t1"), 1)
+        self.assertEqual(cache_generation(tiered, "quiz_t1"), 1)
+        self.assertEqual(tiered.stats()["generation"]["local_hits"], 1)
+
+
+async def _passthrough(ai_self, raw, *args, **kwargs):
+    return raw
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config.settings import Config
+from src.utils.chunker import estimate_tokens, allocate_quotas, plan_quiz_chunks
+
+
+class TestQuizChunker(unittest.TestCase):
+
+    def test_short_note_is_single_chunk_with_full_quota(self):
+        text = "# Chương 1\nGiá trị doanh nghiệp $V = B + S$.\n# Chương 2\nChi phí vốn."
+        plan = plan_quiz_chunks(text, 15)
+        self.assertEqual(len(plan), 1)
+        self.assertEqual(plan[0][1], 15)
+
+    def test_empty_note_returns_no_chunks(self):
+        self.assertEqual(plan_quiz_chunks("   ", 10), [])
+
+    def test_quotas_sum_to_requested_questions(self):
+        for sizes, n in [([100, 100, 100], 10), ([1000, 10, 10], 5), ([0, 0, 0], 7)]:
+            quotas = allocate_quotas(sizes, n)
+            self.assertEqual(sum(quotas), n)
+            self.assertTrue(all(q >= 1 for q in quotas))
+        self.assertEqual(allocate_quotas([300, 100], 8), [6, 2])
+
+    def test_long_note_is_split_into_balanced_chunks(self):
+        sections = [f"# Phần {i}\n" + ("Nội dung bài học về cơ cấu vốn và chi phí sử dụng vốn. " * 60) for i in range(8)]
+        text = "\n".join(sections)
+        with patch.object(Config, "QUIZ_CHUNK_TOKENS", estimate_tokens(text) // 4 + 1), \
+             patch.object(Config, "QUIZ_MAX_CHUNKS", 6):
+            plan = plan_quiz_chunks(text, 20)
+
+        self.assertEqual(len(plan), 4)
+        self.assertEqual(sum(q for _, q in plan), 20)
+        sizes = [estimate_tokens(c) for c, _ in plan]
+        self.assertLess(max(sizes) / min(sizes), 1.6)
+        # No content is lost or reordered
+        self.assertEqual("".join("".join(c for c, _ in plan).split()), "".join(text.split()))
+
+    def test_chunk_count_never_exceeds_question_count(self):
+        text = "\n".join(f"Dòng {i}: " + "khái niệm " * 200 for i in range(20))
+        with patch.object(Config, "QUIZ_CHUNK_TOKENS", 100), patch.object(Config, "QUIZ_MAX_CHUNKS", 10):
+            plan = plan_quiz_chunks(text, 3)
+        self.assertEqual(len(plan), 3)
+        self.assertEqual([q for _, q in plan], [1, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
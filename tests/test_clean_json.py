@@ -0,0 +1,119 @@
+import unittest
+import json
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.study_logic import clean_json_string
+
+
+def _reference_clean_json_string(json_str):
+    """The original character-by-character implementation, kept as the oracle for the rewrite."""
+    pattern = re.compile(r'"(?:[^"\\]|\\.)*"')
+    def replace_string(match):
+        s = match.group(0)
+        content = s[1:-1]
+        fixed = []
+        i = 0
+        n = len(content)
+        in_math = False
+        while i < n:
+            if content[i] == '$':
+                if i + 1 < n and content[i+1] == '$':
+                    in_math = not in_math
+                    fixed.append('$$')
+                    i += 2
+                else:
+                    in_math = not in_math
+                    fixed.append('$')
+                    i += 1
+                continue
+            if content[i] == '\\':
+                is_double = (i + 1 < n and content[i+1] == '\\')
+                next_char = content[i+2] if is_double and i + 2 < n else (content[i+1] if i + 1 < n else '')
+                if not is_double and next_char in ['n', 't', 'f', 'b', 'r'] and i + 2 < n and content[i+2].isalpha():
+                    fixed.append('\\\\')
+                    i += 1
+                elif not is_double and next_char in ['"', '\\', '/', 'b', 'f', 'n', 'r', 't']:
+                    fixed.append('\\')
+                    fixed.append(next_char)
+                    i += 2
+                elif not is_double and next_char == 'u' and i + 5 < n and all(c in '0123456789abcdefABCDEF' for c in content[i+2:i+6]):
+                    fixed.append('\\')
+                    fixed.append('u')
+                    fixed.extend(content[i+2:i+6])
+                    i += 6
+                else:
+                    fixed.append('\\\\')
+                    i += (2 if is_double else 1)
+            elif content[i] == '\n':
+                fixed.append('\\n')
+                i += 1
+            elif content[i] == '\t':
+                fixed.append('\\t')
+                i += 1
+            else:
+                fixed.append(content[i])
+                i += 1
+        return '"' + "".join(fixed) + '"'
+    return pattern.sub(replace_string, json_str)
+
+
+# Fragments weighted towards what trips the repair: escapes, LaTeX commands, quotes, raw whitespace
+_FRAGMENTS = [
+    '\\', '\\\\', '"', '\\"', '\n', '\t', '$', '$$', '/', '\\/', ' ', ',', ':', '{', '}', '[', ']',
+    '\\n', '\\t', '\\b', '\\f', '\\r', '\\u00e9', '\\u12G4', '\\u', '\\x', '\\nu', '\\theta', '\\times',
+    '\\frac{a}{b}', '\\rho', '\\beta', '\\\\frac', '\\\\\\nu', 'n', 't', 'r', 'é', 'ß', '²', '١', '_', '0',
+    'x', 'Giá', 'Đáp', '\\nĐáp', '\\t²', '\\ ', '\\\n', '\\$', 'u00e9', 'ABCD',
+]
+
+
+def _random_text(rng, max_parts=40):
+    return "".join(rng.choice(_FRAGMENTS) for _ in range(rng.randint(0, max_parts)))
+
+
+def _quiz_payload(count):
+    question = {
+        "q": "Nếu $P = \\frac{100}{Q}$ và $\\Delta Q = 5$ thì \\text{doanh thu} thay đổi bao nhiêu?",
+        "options": ["A. $\\times 2$", "B. $\\nu + \\theta$", "C. Không đổi", "D. $\\beta \\rho$"],
+        "correct": 1,
+        "explanation": "Dùng công thức\n$$TR = P \\cdot Q$$\tvà so sánh \\u00e9 với \\\"giá\\\" cũ.",
+    }
+    body = ",\n".join(
+        "{" + ", ".join(f'"{k}": ' + (json.dumps(v, ensure_ascii=False) if not isinstance(v, str) else f'"{v}"') for k, v in question.items()) + "}"
+        for _ in range(count)
+    )
+    return f"[\n{body}\n]"
+
+
+class TestCleanJsonString(unittest.TestCase):
+
+    def test_matches_reference_on_random_inputs(self):
+        rng = random.Random(2024)
+        for _ in range(5000):
+            text = _random_text(rng)
+            self.assertEqual(clean_json_string(text), _reference_clean_json_string(text), repr(text))
+
+    def test_matches_reference_on_quiz_shaped_inputs(self):
+        rng = random.Random(7)
+        for _ in range(1000):
+            fields = [f'"{k}": "{_random_text(rng, 15)}"' for k in ("q", "explanation")]
+            text = "[{" + ", ".join(fields) + "}]"
+            self.assertEqual(clean_json_string(text), _reference_clean_json_string(text), repr(text))
+
+    def test_repaired_latex_parses(self):
+        parsed = json.loads(clean_json_string(_quiz_payload(1)))
+        self.assertIn("\\frac{100}{Q}", parsed[0]["q"])
+        self.assertEqual(parsed[0]["options"][1], "B. $\\nu + \\theta$")
+        self.assertIn("\n$$TR = P \\cdot Q$$\t", parsed[0]["explanation"])
+
+    def test_large_payload_matches_reference(self):
+        # Speed against the reference is measured by benchmarks/bench_clean_json.py, not asserted here
+        payload = _quiz_payload(200)
+        self.assertEqual(clean_json_string(payload), _reference_clean_json_string(payload))
+
+if __name__ == '__main__':
+    unittest.main()
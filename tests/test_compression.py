@@ -0,0 +1,73 @@
+import unittest
+import os
+import sys
+import json
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_redis import FakeRedis
+from src.config.settings import Config
+from src.utils.compression import COMPRESSED_MARKER, compress_value, compression_stats, decompress_value, dumps_cached, loads_cached
+from src.services.study_logic import generate_quiz, get_quiz_progress, save_quiz_progress
+
+
+def _quiz(n=30):
+    return {
+        "title": "Bài 1",
+        "questions": [
+            {"q": f"Câu {i}: Hệ số co giãn của cầu theo giá phản ánh điều gì?", "options": ["A. Mức độ phản ứng", "B. Giá", "C. Lượng", "D. Thu nhập"],
+             "correct": 0, "explanation": "Hệ số co giãn đo lường phần trăm thay đổi của lượng cầu khi giá thay đổi 1%, giữ các yếu tố khác không đổi."}
+            for i in range(n)
+        ],
+    }
+
+
+class TestCompression(unittest.TestCase):
+
+    def test_large_values_round_trip_compressed(self):
+        quiz = _quiz()
+        stored = dumps_cached(quiz)
+        self.assertTrue(stored.startswith(COMPRESSED_MARKER))
+        self.assertLess(len(stored), len(json.dumps(quiz)) / 3)
+        self.assertEqual(loads_cached(stored), quiz)
+
+    def test_small_and_legacy_values_stay_plain(self):
+        self.assertEqual(compress_value('{"a": 1}'), '{"a": 1}')
+        legacy = json.dumps(_quiz())
+        self.assertEqual(decompress_value(legacy), legacy)
+        self.assertEqual(loads_cached(legacy), _quiz())
+        with patch.object(Config, "CACHE_COMPRESSION_ENABLED", False):
+            self.assertFalse(dumps_cached(_quiz()).startswith(COMPRESSED_MARKER))
+
+    def test_stats_report_bytes_saved(self):
+        before = compression_stats()
+        stored = compress_value("x" * 5000)
+        after = compression_stats()
+        self.assertEqual(after["values_compressed"] - before["values_compressed"], 1)
+        self.assertEqual(after["bytes_saved"] - before["bytes_saved"], 5000 - len(stored))
+
+
+class TestStudyLogicCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        p = patch("src.services.study_logic.get_redis", return_value=self.redis)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_legacy_plain_quiz_is_still_served(self):
+        self.redis.set("quiz_t1_15_medium_balanced", json.dumps(_quiz()))
+        self.assertEqual(generate_quiz("t1"), _quiz())
+
+    def test_progress_is_compressed_in_the_hash(self):
+        progress = {"topic": {"id": "t1"}, "quiz": _quiz()["questions"], "currentIndex": 4}
+        with patch("src.services.study_logic._progress_migrated", True):
+            save_quiz_progress(7, progress)
+            self.assertTrue(self.redis.hashes["quiz_progress_user_7"]["t1"].startswith(COMPRESSED_MARKER))
+            self.assertEqual(get_quiz_progress(7, "t1"), progress)
+            self.assertEqual(get_quiz_progress(7), {"t1": progress})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.dedup import remove_near_duplicates
+
+
+def _q(text, options):
+    return {"q": text, "options": options, "correct": 0, "explanation": ""}
+
+
+class TestNearDuplicateRemoval(unittest.TestCase):
+
+    def test_reworded_duplicate_is_removed(self):
+        questions = [
+            _q("Chi phí cơ hội của việc đi học đại học là gì?", ["A. Học phí", "B. Thu nhập bỏ lỡ khi đi làm", "C. Tiền sách", "D. Tiền ăn"]),
+            _q("Chi phí cơ hội của việc đi học đại học là gì ?", ["A. Thu nhập bỏ lỡ khi đi làm", "B. Học phí", "C. Tiền sách", "D. Tiền ăn"]),
+            _q("Đường cầu dốc xuống thể hiện điều gì?", ["A. Quy luật cầu", "B. Quy luật cung", "C. Cân bằng", "D. Độ co giãn"]),
+        ]
+        kept, removed = remove_near_duplicates(questions)
+        self.assertEqual(removed, 1)
+        self.assertEqual([q["q"] for q in kept], [questions[0]["q"], questions[2]["q"]])
+
+    def test_distinct_calculations_are_kept(self):
+        questions = [
+            _q("Tính GDP danh nghĩa năm 2020 khi P = 2 và Q = 100", ["A. 200", "B. 100", "C. 50", "D. 400"]),
+            _q("Tỷ lệ lạm phát được đo bằng chỉ số nào phổ biến nhất?", ["A. CPI", "B. PPI", "C. GDP deflator", "D. HDI"]),
+        ]
+        kept, removed = remove_near_duplicates(questions)
+        self.assertEqual(removed, 0)
+        self.assertEqual(len(kept), 2)
+
+    def test_duplicates_of_existing_questions_are_removed(self):
+        existing = [_q("Thặng dư tiêu dùng là gì?", ["A. Phần chênh lệch giữa mức sẵn lòng trả và giá", "B. Lợi nhuận", "C. Thuế", "D. Chi phí"])]
+        kept, removed = remove_near_duplicates([dict(existing[0])], existing=existing)
+        self.assertEqual((kept, removed), ([], 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -184,25 +184,24 @@ class TestUEHNotion(unittest.TestCase):
         self.assertIsNone(UUID_PATTERN.match("invalid-uuid-format"))
 
     def test_update_status_cache_invalidation_pattern(self):
-        """Test that update_status clears all study_candidates* parameterized keys."""
-        from src.services.study_logic import update_status
+        """Test that update_status invalidates all study_candidates* parameterized keys."""
+        from src.services.study_logic import update_status, _versioned_cache_key, CANDIDATES_NAMESPACE
         from src.utils.cache import get_redis
         from unittest.mock import patch, MagicMock
 
         r = get_redis()
         if r:
-            r.set("study_candidates_all", "dummy_all")
-            r.set("study_candidates_10", "dummy_10")
-            r.set("study_candidates_5", "dummy_5")
+            limits = ("all", "10", "5")
+            for limit in limits:
+                r.set(_versioned_cache_key(f"study_candidates_{limit}", CANDIDATES_NAMESPACE), f"dummy_{limit}")
 
             with patch("src.services.notion.NotionService.update_page_property", return_value=True):
                 res = update_status("test-uuid-topic", status="da_nam_vung")
                 self.assertTrue(res)
 
-            # All candidate cache variations must be cleared
-            self.assertIsNone(r.get("study_candidates_all"))
-            self.assertIsNone(r.get("study_candidates_10"))
-            self.assertIsNone(r.get("study_candidates_5"))
+            # All candidate cache variations must now resolve to fresh, empty keys
+            for limit in limits:
+                self.assertIsNone(r.get(_versioned_cache_key(f"study_candidates_{limit}", CANDIDATES_NAMESPACE)))
 
     def test_quiz_generation_cache_poisoning_guard(self):
         """Test that invalid/failed quiz payloads are not cached into Redis."""
@@ -217,9 +216,9 @@ class TestUEHNotion(unittest.TestCase):
 
             with patch("src.services.notion.NotionService.fetch_page_content", return_value=["Some lesson content"]), \
                  patch("src.services.study_logic.get_page_title", return_value="Test Lesson"), \
-                 patch("src.services.ai.AIService.generate_quiz", return_value="Broken AI raw response"), \
-                 patch("src.services.ai.AIService.review_quiz", return_value="Still broken"), \
-                 patch("src.services.ai.AIService.review_latex_quiz", return_value="Invalid JSON response not matching schema"):
+                 patch("src.services.ai.AsyncAIService.generate_quiz", return_value="Broken AI raw response"), \
+                 patch("src.services.ai.AsyncAIService.review_quiz", return_value="Still broken"), \
+                 patch("src.services.ai.AsyncAIService.review_latex_quiz", return_value="Invalid JSON response not matching schema"):
 
                 res = generate_quiz(test_topic_id, force_refresh=True)
                 self.assertIsNotNone(res)
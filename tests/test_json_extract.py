@@ -0,0 +1,60 @@
+import unittest
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.json_extract import extract_json_array, iter_json_arrays, parse_json_array
+
+
+def _question(i):
+    return {"q": f"Câu hỏi {i}: giá trị của $x^{{{i}}}$ là [bao nhiêu]?", "options": ["A. 1", "B. 2", "C. 3", "D. 4"], "correct": 0, "explanation": "Vì \"x\" = 1"}
+
+
+class TestJsonArrayExtraction(unittest.TestCase):
+
+    def test_array_inside_prose_and_code_fence(self):
+        text = 'Dưới đây là quiz:\n```json\n[\n  {"q": "a", "options": ["A", "B]"]}\n]\n```\nChúc học tốt!'
+        self.assertEqual(parse_json_array(text), [{"q": "a", "options": ["A", "B]"]}])
+
+    def test_stray_brackets_and_quotes_in_prose_are_ignored(self):
+        text = 'Step [1 of 2] said "ok [ then: [{"a": "he said \\"[\\""}] and a trailing ] "quote'
+        self.assertEqual(parse_json_array(text), [{"a": 'he said "["'}])
+
+    def test_unclosed_prose_bracket_does_not_hide_array(self):
+        text = 'Ghi chú (xem [mục 2: [{"a": 1}] rồi tiếp tục'
+        self.assertEqual(extract_json_array(text), '[{"a": 1}]')
+
+    def test_nested_arrays_return_outermost(self):
+        text = 'x [{"a": [{"b": 1}], "c": [1, 2]}] y'
+        self.assertEqual(list(iter_json_arrays(text)), ['[{"a": [{"b": 1}], "c": [1, 2]}]'])
+
+    def test_multiple_arrays_first_parseable_wins(self):
+        text = 'Draft: [{"a": 1,}] Final: [{"a": 2}]'
+        self.assertEqual(list(iter_json_arrays(text)), ['[{"a": 1,}]', '[{"a": 2}]'])
+        self.assertEqual(parse_json_array(text), [{"a": 2}])
+
+    def test_no_array_of_objects(self):
+        self.assertIsNone(parse_json_array("no arrays [1, 2] {x}"))
+        self.assertIsNone(parse_json_array(""))
+
+    def test_matches_greedy_regex_on_well_formed_responses(self):
+        pattern = re.compile(r'\[\s*\{.*\}\s*\]', re.DOTALL)
+        payload = json.dumps([_question(i) for i in range(5)], ensure_ascii=False, indent=2)
+        for text in (payload, f"Kết quả:\n```json\n{payload}\n```\n", f"{payload}\nHết."):
+            self.assertEqual(extract_json_array(text), pattern.search(text).group(0))
+
+    def test_long_prose_with_unclosed_brackets(self):
+        # Speed against the greedy regex is measured by benchmarks/bench_json_extract.py, not asserted here
+        prose = "Xem [{mục " * 5000
+        self.assertIsNone(re.compile(r'\[\s*\{.*\}\s*\]', re.DOTALL).search(prose))
+        self.assertIsNone(extract_json_array(prose))
+
+        big = "Xem [{mục " * 50000 + json.dumps([_question(i) for i in range(300)], ensure_ascii=False)
+        self.assertEqual(len(parse_json_array(big)), 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
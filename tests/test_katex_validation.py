@@ -1,10 +1,12 @@
 import unittest
 import os
+import re
 import sys
+import time
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.utils.katex_validator import validate_katex_formatting
+from src.utils.katex_validator import validate_katex_formatting, validate_quiz_katex, MATH_BLOCK_PATTERN, RAW_LATEX_CMD_PATTERN, VN_ACCENT_PATTERN
 
 class TestKaTeXValidatorEngine(unittest.TestCase):
 
@@ -28,5 +30,74 @@ class TestKaTeXValidatorEngine(unittest.TestCase):
         valid, errors = validate_katex_formatting(sample_clean)
         self.assertTrue(valid, f"Expected valid clean KaTeX string, but got errors: {errors}")
 
+
+def _split_validate(text):
+    """The previous split-based implementation, used to check the single-pass scan gives the same answers."""
+    if not isinstance(text, str) or not text.strip():
+        return True, []
+    errors = []
+    if text.count('$') % 2 != 0:
+        errors.append(f"Unmatched '$' math delimiter (total count = {text.count('$')})")
+    for part in MATH_BLOCK_PATTERN.split(text):
+        if not part:
+            continue
+        if part.startswith('$'):
+            inner = part.strip('$').strip()
+            if not inner:
+                errors.append("Empty math delimiter ($$)")
+                continue
+            if VN_ACCENT_PATTERN.search(re.sub(r'\\text\s*\{[^{}]*\}', '', inner)):
+                errors.append(f"Vietnamese prose incorrectly enclosed in math mode: '{part}'")
+        else:
+            match = RAW_LATEX_CMD_PATTERN.search(part)
+            if match:
+                errors.append(f"Unwrapped raw LaTeX command '\\{match.group(1)}' found outside math delimiters in segment: '{part.strip()}'")
+    return len(errors) == 0, errors
+
+
+class TestQuizKaTeXBatchValidation(unittest.TestCase):
+
+    def _quiz(self):
+        return {"questions": [
+            {"id": 1, "q": r"Tính $\frac{1}{2}$?", "options": ["A. $1$", r"B. 2 \times 3", "C. $$", "D. 4"], "correct": 0, "explanation": r"Vì $\text{giá} = 1$."},
+            {"id": 2, "q": "Câu hỏi không có công thức", "options": ["A", "B"], "correct": 1, "explanation": "$giá tăng$ rồi $"},
+        ]}
+
+    def test_per_field_diagnostics(self):
+        report = validate_quiz_katex(self._quiz())
+        self.assertFalse(report["valid"])
+        self.assertEqual(report["fields_checked"], 10)
+        located = {(issue["question"], issue["field"]) for issue in report["issues"]}
+        self.assertEqual(located, {(1, "options[1]"), (1, "options[2]"), (2, "explanation")})
+        explanation = next(i for i in report["issues"] if i["question"] == 2)
+        self.assertTrue(any("Unmatched" in e for e in explanation["errors"]))
+        self.assertTrue(any("Vietnamese prose" in e for e in explanation["errors"]))
+
+    def test_accepts_question_list_and_clean_quiz(self):
+        report = validate_quiz_katex([{"q": "$x$", "options": ["A. $1$"], "explanation": r"$\text{Đúng}$"}])
+        self.assertEqual(report, {"valid": True, "fields_checked": 3, "issues": []})
+
+    def test_single_pass_matches_split_implementation(self):
+        samples = [
+            r"Giá $S = 1.250$ và \times", "a $b", "$$ $$", "$$a$$ $b$ c $", r"\frac{1}{2} $x$", "   ", "",
+            r"$\text{giá} + đ$", r"$$\frac{EBIT}{400}$$. 240 USD \times \text{EBIT} \Leftrightarrow", "$a$$b$",
+        ]
+        for text in samples:
+            self.assertEqual(validate_katex_formatting(text), _split_validate(text), repr(text))
+
+    def test_whole_quiz_validates_quickly(self):
+        quiz = {"questions": [
+            {"id": i, "q": r"Nếu $P = \frac{100}{Q}$ thì doanh thu $TR$ bằng bao nhiêu khi $Q = 5$?",
+             "options": [r"A. $20$", r"B. $\times 2$", "C. Không đổi", r"D. $100\text{ USD}$"],
+             "explanation": r"Ta có $$TR = P \cdot Q = 100$$ nên doanh thu không đổi."}
+            for i in range(1, 101)
+        ]}
+        start = time.perf_counter()
+        report = validate_quiz_katex(quiz)
+        elapsed = time.perf_counter() - start
+        self.assertTrue(report["valid"], report["issues"][:3])
+        self.assertEqual(report["fields_checked"], 600)
+        self.assertLess(elapsed, 0.05)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import os
+import sys
+import json
+import asyncio
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_redis import FakeRedis
+from src.config.settings import Config
+from src.services.ai import AsyncAIService
+from src.services.study_logic import generate_quiz, _review_invalid_latex
+from src.utils.katex_validator import validate_katex_formatting
+from src.utils.latex_normalizer import normalize_latex_text, normalize_quiz_latex
+
+
+class TestLatexNormalizer(unittest.TestCase):
+
+    def assertNormalizes(self, raw, expected):
+        fixed = normalize_latex_text(raw)
+        self.assertEqual(fixed, expected)
+        valid, errors = validate_katex_formatting(fixed)
+        self.assertTrue(valid, errors)
+
+    def test_markdown_emphasis_around_math(self):
+        self.assertNormalizes("Giá $*V*$ và $**P**$", "Giá $V$ và $P$")
+
+    def test_currency_dollars_and_escapes(self):
+        self.assertNormalizes("Cổ phiếu giá $100 mỗi cổ phần, cổ tức \\$5 và 20 \\USD.", "Cổ phiếu giá 100 USD mỗi cổ phần, cổ tức 5 USD và 20 USD.")
+        self.assertNormalizes("Giá $100 và lãi $x = 5$", "Giá 100 USD và lãi $x = 5$")
+
+    def test_currency_keeps_magnitude_before_unit(self):
+        self.assertNormalizes("Doanh thu $5 triệu", "Doanh thu 5 triệu USD")
+        self.assertNormalizes("Vốn \\$2,5 tỷ và nợ $300 nghìn USD", "Vốn 2,5 tỷ USD và nợ 300 nghìn USD")
+        self.assertNormalizes("Giá \\$7 USD mỗi cái", "Giá 7 USD mỗi cái")
+
+    def test_newlines_inside_math(self):
+        self.assertNormalizes("Công thức $$TR = P\n\\cdot Q$$ rất quan trọng", "Công thức $$TR = P \\cdot Q$$ rất quan trọng")
+
+    def test_unwrapped_commands_are_wrapped(self):
+        self.assertNormalizes(
+            r"Giải phương trình: 150.000 USD \times EBIT = 200.000 \times EBIT - 32.000.000.000 \implies EBIT = 640.000 USD",
+            r"Giải phương trình: $150.000\text{ USD} \times EBIT = 200.000 \times EBIT - 32.000.000.000 \implies EBIT = 640.000\text{ USD}$",
+        )
+        self.assertNormalizes(
+            r"Lãi vay là I = 2.000.000 \times 8% = 160.000 USD. Ta có \frac{EBIT}{400} = \frac{EBIT - 640}{240} nên EBIT = 1.600 USD.",
+            r"Lãi vay là $I = 2.000.000 \times 8\% = 160.000\text{ USD}$. Ta có $\frac{EBIT}{400} = \frac{EBIT - 640}{240}$ nên EBIT = 1.600 USD.",
+        )
+
+    def test_text_command_outside_math_is_unwrapped(self):
+        self.assertNormalizes(r"Dùng \text{giá trần} cho thị trường", "Dùng giá trần cho thị trường")
+
+    def test_valid_text_is_unchanged(self):
+        text = r"Ta có $$\frac{EBIT}{400} = 2$$ và $240\text{ USD} \times 2$."
+        self.assertEqual(normalize_latex_text(text), text)
+
+    def test_quiz_report_counts_fixes_and_remaining_issues(self):
+        questions = [
+            {"id": 1, "q": r"Tính 2 \times 3?", "options": ["A. $6$", "B. $*5*$"], "explanation": "Đúng."},
+            {"id": 2, "q": "$Hệ số s biểu thị tốc độ$", "options": ["A", "B"], "explanation": ""},
+        ]
+        fixed, report = normalize_quiz_latex(questions)
+        self.assertEqual(fixed[0]["q"], r"Tính $2 \times 3$?")
+        self.assertEqual(fixed[0]["options"][1], "B. $5$")
+        self.assertEqual(report["changed_fields"], 2)
+        self.assertEqual([(i["question"], i["field"]) for i in report["issues"]], [(2, "q")])
+        self.assertEqual(questions[0]["q"], r"Tính 2 \times 3?")
+
+
+class TestQuizLatexStage(unittest.TestCase):
+
+    def setUp(self):
+        self.reviewed = []
+
+        async def fake_generate(ai_self, content, num_questions=15, **kwargs):
+            return json.dumps([
+                {"q": r"Tính 2 \times 3 ?", "options": ["A. $6$", "B. $5$"], "correct": 0, "explanation": "Giá $100 mỗi cái"},
+                {"q": "$Hệ số s là gì$", "options": ["A. Tốc độ", "B. Mức"], "correct": 0, "explanation": "..."},
+            ][:num_questions], ensure_ascii=False)
+
+        async def passthrough(ai_self, raw, *args, **kwargs):
+            return raw
+
+        async def fake_review(ai_self, quiz_json_str):
+            sent = json.loads(quiz_json_str)
+            self.reviewed.append(sent)
+            return json.dumps([{**q, "q": "Hệ số $s$ là gì"} for q in sent], ensure_ascii=False)
+
+        patches = [
+            patch("src.services.study_logic.get_redis", return_value=FakeRedis()),
+            patch("src.services.notion.NotionService.fetch_page_content", return_value=["Nội dung bài học"]),
+            patch("src.services.study_logic.get_page_title", return_value="Bài 1"),
+            patch("src.services.ai.AsyncAIService.generate_quiz", fake_generate),
+            patch("src.services.ai.AsyncAIService.enhance_quiz", passthrough),
+            patch("src.services.ai.AsyncAIService.review_latex_quiz", fake_review),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_rule_fixable_quiz_skips_llm_review(self):
+        quiz = generate_quiz("topic-latex-1", num_questions=1)
+        self.assertEqual(self.reviewed, [])
+        self.assertEqual(quiz["questions"][0]["q"], r"Tính $2 \times 3$ ?")
+        self.assertEqual(quiz["questions"][0]["explanation"], "Giá 100 USD mỗi cái")
+        self.assertEqual(quiz["generation_stats"]["katex_issues"], 0)
+
+    def test_only_unfixable_questions_go_to_llm_review(self):
+        quiz = generate_quiz("topic-latex-2", num_questions=2)
+        self.assertEqual(len(self.reviewed), 1)
+        self.assertEqual([q["q"] for q in self.reviewed[0]], ["$Hệ số s là gì$"])
+        self.assertEqual([q["q"] for q in quiz["questions"]], [r"Tính $2 \times 3$ ?", "Hệ số $s$ là gì"])
+        self.assertEqual(quiz["generation_stats"]["katex_issues"], 0)
+
+    def test_review_maps_issues_by_position(self):
+        questions = [
+            "stray",
+            {"id": 1, "q": "Câu đúng $x$", "options": ["A"], "correct": 0},
+            {"id": 1, "q": "$Hệ số s là gì$", "options": ["A"], "correct": 0},
+        ]
+        _, report = normalize_quiz_latex(questions)
+        merged = asyncio.run(_review_invalid_latex(AsyncAIService(), questions, report))
+        self.assertEqual([q["q"] for q in self.reviewed[0]], ["$Hệ số s là gì$"])
+        self.assertEqual(merged[:2], questions[:2])
+        self.assertEqual(merged[2]["q"], "Hệ số $s$ là gì")
+
+    def test_llm_fallback_can_be_disabled(self):
+        with patch.object(Config, "QUIZ_LATEX_LLM_FALLBACK", False):
+            quiz = generate_quiz("topic-latex-3", num_questions=2)
+        self.assertEqual(self.reviewed, [])
+        self.assertEqual(quiz["generation_stats"]["katex_issues"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
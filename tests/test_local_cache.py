@@ -0,0 +1,127 @@
+import unittest
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_redis import FakeRedis
+from src.utils.cache import LOCAL_CACHE_FAMILIES, LOCAL_CACHE_EXCLUDED_PREFIXES
+from src.utils.local_cache import LocalTTLCache, TieredRedis
+
+
+class CountingRedis(FakeRedis):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return super().get(key)
+
+
+def _tiered(redis):
+    return TieredRedis(redis, LOCAL_CACHE_FAMILIES, excluded_prefixes=LOCAL_CACHE_EXCLUDED_PREFIXES, subscribe=False)
+
+
+class TestLocalTTLCache(unittest.TestCase):
+
+    def test_lru_eviction_and_ttl(self):
+        cache = LocalTTLCache(max_size=2, ttl=0.05)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("a"))
+
+
+class TestTieredRedis(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = CountingRedis()
+        self.r = _tiered(self.redis)
+
+    def test_hot_reads_skip_redis_and_report_ratios(self):
+        self.redis.set("page_title_p1", "Bài 1")
+        for _ in range(4):
+            self.assertEqual(self.r.get("page_title_p1"), "Bài 1")
+        self.assertIsNone(self.r.get("page_title_missing"))
+        self.assertEqual(self.redis.gets, 2)
+
+        stats = self.r.stats()["page_title"]
+        self.assertEqual((stats["local_hits"], stats["redis_hits"], stats["misses"]), (3, 1, 1))
+        self.assertEqual(stats["local_hit_ratio"], 0.6)
+        self.assertEqual(stats["redis_hit_ratio"], 0.2)
+
+    def test_locks_and_per_user_keys_always_hit_redis(self):
+        self.redis.set("quiz_lock_t1_15_medium_balanced", "token")
+        self.redis.set("quiz_t1_15_medium_balanced", "{}")
+        for _ in range(3):
+            self.r.get("quiz_lock_t1_15_medium_balanced")
+            self.r.get("quiz_t1_15_medium_balanced")
+        self.assertEqual(self.redis.gets, 4)
+
+    def test_writes_invalidate_locally_and_publish(self):
+        self.r.setex("study_candidates_all", 60, "[1]")
+        self.assertEqual(self.r.get("study_candidates_all"), "[1]")
+        self.r.setex("study_candidates_all", 60, "[2]")
+        self.assertEqual(self.r.get("study_candidates_all"), "[2]")
+
+        pipe = self.r.pipeline()
+        pipe.delete("study_candidates_all")
+        pipe.execute()
+        self.assertIsNone(self.r.get("study_candidates_all"))
+        self.assertEqual(len(self.redis.published), 3)
+
+    def test_every_write_path_invalidates(self):
+        from src.utils.cache_backends import MemoryCacheBackend, RELEASE_LOCK_SCRIPT
+
+        self.redis = MemoryCacheBackend()
+        self.r = _tiered(self.redis)
+
+        def cached(key, value="v"):
+            self.redis.set(key, value)
+            self.assertEqual(self.r.get(key), value)
+            self.redis.set(key, value + "2")  # changed behind the local tier's back
+            return value + "2"
+
+        fresh = cached("study_candidates_a")
+        self.r.expire("study_candidates_a", 60)
+        self.assertEqual(self.r.get("study_candidates_a"), fresh)
+
+        fresh = cached("study_candidates_b")
+        self.r.eval(RELEASE_LOCK_SCRIPT, 1, "study_candidates_b", "not-the-token")
+        self.assertEqual(self.r.get("study_candidates_b"), fresh)
+
+        cached("study_candidates_c")
+        self.r.getdel("study_candidates_c")
+        self.assertIsNone(self.r.get("study_candidates_c"))
+
+        # Chained pipeline calls stay on the proxy, so their writes are seen too
+        fresh = cached("study_candidates_d")
+        self.r.pipeline().get("page_title_x").expire("study_candidates_d", 60).execute()
+        self.assertEqual(self.r.get("study_candidates_d"), fresh)
+
+    def test_invalidation_reaches_other_workers(self):
+        other = _tiered(self.redis)
+        self.redis.set("quiz_t1_15_medium_balanced", "old")
+        self.assertEqual(other.get("quiz_t1_15_medium_balanced"), "old")
+
+        with patch("src.utils.local_cache._PROCESS_ID", "worker-a"):
+            self.r.set("quiz_t1_15_medium_balanced", "new")
+        self.assertEqual(other.get("quiz_t1_15_medium_balanced"), "old")  # not delivered yet
+
+        for _, message in self.redis.published:
+            other.handle_invalidation(message)
+        self.assertEqual(other.get("quiz_t1_15_medium_balanced"), "new")
+
+    def test_other_commands_pass_through(self):
+        self.r.hset("quiz_bank_t1", "medium:balanced", "[]")
+        self.assertEqual(self.r.hgetall("quiz_bank_t1"), {"medium:balanced": "[]"})
+
+
+if __name__ == '__main__':
+    unittest.main()
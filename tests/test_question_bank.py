@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+import json
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_redis import FakeRedis
+from src.services.study_logic import generate_quiz, get_question_bank, add_to_question_bank
+
+
+def _questions(n, start=0):
+    return json.dumps([{"q": f"Câu {i}", "options": ["A", "B"], "correct": 0, "explanation": "..."} for i in range(start, start + n)])
+
+
+class TestQuestionBank(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.generated = []
+
+        async def fake_generate(ai_self, content, num_questions=15, **kwargs):
+            self.generated.append(num_questions)
+            return _questions(num_questions, start=100 * len(self.generated))
+
+        async def passthrough(ai_self, raw, *args, **kwargs):
+            return raw
+
+        patches = [
+            patch("src.services.study_logic.get_redis", return_value=self.redis),
+            patch("src.services.notion.NotionService.fetch_page_content", return_value=["Nội dung bài học"]),
+            patch("src.services.study_logic.get_page_title", return_value="Bài 1"),
+            patch("src.services.ai.AsyncAIService.generate_quiz", fake_generate),
+            patch("src.services.ai.AsyncAIService.enhance_quiz", passthrough),
+            patch("src.services.ai.AsyncAIService.review_latex_quiz", passthrough),
+            patch("src.services.quiz_warmer.trigger_quiz_warmup"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_bank_merges_without_duplicates(self):
+        add_to_question_bank("t", "medium", "balanced", [{"q": "A"}, {"q": "B"}])
+        bank = add_to_question_bank("t", "medium", "balanced", [{"q": "B"}, {"q": "C"}])
+        self.assertEqual([q["q"] for q in bank], ["A", "B", "C"])
+        self.assertEqual(bank[0]["difficulty"], "medium")
+        self.assertEqual(get_question_bank("t", "hard", "balanced"), [])
+
+    def test_smaller_quiz_is_assembled_from_bank_without_generation(self):
+        generate_quiz("topic-1", num_questions=10)
+        quiz = generate_quiz("topic-1", num_questions=5)
+        self.assertEqual(self.generated, [10])
+        self.assertEqual([q["id"] for q in quiz["questions"]], [1, 2, 3, 4, 5])
+
+    def test_larger_quiz_generates_only_the_shortfall(self):
+        generate_quiz("topic-1", num_questions=10)
+        quiz = generate_quiz("topic-1", num_questions=15)
+        self.assertEqual(self.generated, [10, 5])
+        self.assertEqual(len(quiz["questions"]), 15)
+        self.assertEqual(len({q["q"] for q in quiz["questions"]}), 15)
+
+    def test_force_refresh_discards_banked_questions(self):
+        generate_quiz("topic-1", num_questions=10)
+        generate_quiz("topic-1", num_questions=10, force_refresh=True)
+        self.assertEqual(self.generated, [10, 10])
+        self.assertEqual(len(get_question_bank("topic-1", "medium", "balanced")), 10)
+
+
+class TestQuestionBankConcurrency(unittest.TestCase):
+
+    def test_concurrent_appends_keep_both_batches(self):
+        import threading
+        import time
+        from src.services import study_logic
+        from src.utils.cache_backends import MemoryCacheBackend
+
+        redis = MemoryCacheBackend()
+        real_read = study_logic.get_question_bank
+
+        def slow_read(*args, **kwargs):
+            bank = real_read(*args, **kwargs)
+            time.sleep(0.1)  # widen the read-modify-write window
+            return bank
+
+        batches = [[{"q": f"Câu {i}"}] for i in range(2)]
+        with patch("src.services.study_logic.get_redis", return_value=redis), \
+             patch("src.services.study_logic.get_question_bank", side_effect=slow_read):
+            threads = [threading.Thread(target=add_to_question_bank, args=("t1", "medium", "balanced", batch)) for batch in batches]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(5)
+
+            self.assertEqual(sorted(q["q"] for q in real_read("t1", "medium", "balanced")), ["Câu 0", "Câu 1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
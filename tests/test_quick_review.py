@@ -0,0 +1,141 @@
+import unittest
+import os
+import sys
+import json
+import time
+import threading
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_redis import FakeRedis
+from src.services.study_logic import iter_quick_review, generate_quick_review_stream, create_quick_review_session, get_quick_review_page
+
+CANDIDATES = [
+    {"id": "t1", "title": "Bài 1", "course": "Vi mô"},
+    {"id": "t2", "title": "Bài 2", "course": "Vi mô"},
+    {"id": "t3", "title": "Bài 3", "course": "Vĩ mô"},
+    {"id": "t4", "title": "Bài 4", "course": "Vi mô"},
+]
+
+
+def _quiz(topic_id, n=3):
+    return {"id": topic_id, "questions": [{"q": f"{topic_id}-{i}", "options": ["A"], "correct": 0} for i in range(n)]}
+
+
+class TestQuickReview(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.redis.set("quiz_t1_15_medium_balanced", json.dumps(_quiz("t1")))
+        self.redis.set("quiz_t3", json.dumps(_quiz("t3", 2)))  # legacy key
+        for p in [
+            patch("src.services.study_logic.get_redis", return_value=self.redis),
+            patch("src.services.study_logic.get_candidates", return_value=CANDIDATES),
+            patch("src.services.quiz_warmer.trigger_quiz_warmup"),
+        ]:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_cached_questions_come_first_then_generated(self):
+        with patch("src.services.study_logic.generate_quiz", side_effect=lambda tid, **kw: _quiz(tid)) as gen:
+            events = list(iter_quick_review(time_budget=5, max_generate=5))
+        self.assertEqual([e["type"] for e in events], ["meta", "questions", "questions", "questions", "done"])
+        self.assertEqual(events[1]["source"], "cache")
+        self.assertEqual({q["topic_id"] for q in events[1]["questions"]}, {"t1", "t3"})
+        self.assertEqual(sorted(c.args[0] for c in gen.call_args_list), ["t2", "t4"])
+        self.assertEqual(events[-1], {"type": "done", "question_count": 11, "partial": False, "missing_topics": []})
+
+    def test_topic_budget_defers_remaining_misses_to_warmer(self):
+        with patch("src.services.study_logic.generate_quiz", side_effect=lambda tid, **kw: _quiz(tid)) as gen, \
+             patch("src.services.quiz_warmer.trigger_quiz_warmup") as warm:
+            events = list(iter_quick_review(time_budget=5, max_generate=1))
+        self.assertEqual(gen.call_count, 1)
+        self.assertEqual([t["id"] for t in warm.call_args.args[0]], ["t4"])
+        self.assertTrue(events[-1]["partial"])
+        self.assertEqual(events[-1]["missing_topics"], ["t4"])
+
+    def test_time_budget_returns_partial_results(self):
+        def slow(tid, **kw):
+            time.sleep(0.5)
+            return _quiz(tid)
+
+        start = time.monotonic()
+        with patch("src.services.study_logic.generate_quiz", side_effect=slow):
+            events = list(iter_quick_review(course="Vĩ mô", time_budget=0.05, max_generate=5))
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(events[-1]["question_count"], 2)
+        self.assertFalse(events[-1]["partial"])
+
+        with patch("src.services.study_logic.generate_quiz", side_effect=slow):
+            events = list(iter_quick_review(course="Vi mô", time_budget=0.05, max_generate=5))
+        self.assertTrue(events[-1]["partial"])
+        self.assertEqual(sorted(events[-1]["missing_topics"]), ["t2", "t4"])
+        self.assertEqual(events[-1]["question_count"], 3)
+
+    def test_stream_reports_error_without_candidates(self):
+        with patch("src.services.study_logic.get_candidates", return_value=[]):
+            lines = list(generate_quick_review_stream())
+        self.assertEqual(json.loads(lines[0])["type"], "error")
+
+
+    def _wait_complete(self, session_id):
+        for _ in range(200):
+            page = get_quick_review_page(session_id, page=0, page_size=4)
+            if page["complete"]:
+                return page
+            time.sleep(0.01)
+        self.fail("quick review session never completed")
+
+    def test_session_returns_cached_page_before_generation_finishes(self):
+        release = threading.Event()
+
+        def slow(tid, **kw):
+            release.wait(5)
+            return _quiz(tid)
+
+        with patch("src.services.study_logic.generate_quiz", side_effect=slow):
+            first = create_quick_review_session(page_size=4, seed=7)
+            # Only the cached topics (t1, t3) are in so far; generation is still running
+            self.assertEqual((first["total"], first["complete"]), (5, False))
+            self.assertEqual({q["topic_id"] for q in first["questions"]}, {"t1", "t3"})
+            release.set()
+            done = self._wait_complete(first["session_id"])
+        self.assertEqual(done["total"], 11)
+
+    def test_session_pages_cover_the_seeded_shuffle(self):
+        with patch("src.services.study_logic.generate_quiz", side_effect=lambda tid, **kw: _quiz(tid)):
+            first = create_quick_review_session(page_size=4, seed=7)
+            self._wait_complete(first["session_id"])
+        self.assertEqual(len(first["questions"]), 4)
+
+        pages = [get_quick_review_page(first["session_id"], page=p, page_size=4) for p in (0, 1, 2)]
+        self.assertEqual((pages[0]["total"], pages[0]["total_pages"], pages[0]["next_page"]), (11, 3, 1))
+        self.assertEqual(pages[0]["questions"], first["questions"])
+        self.assertIsNone(pages[-1]["next_page"])
+        ids = [q["q"] for page in pages for q in page["questions"]]
+        self.assertEqual(len(ids), 11)
+        self.assertEqual(len(set(ids)), 11)
+
+        # Same seed over the same questions reproduces the same order
+        self.redis.lists.clear()
+        with patch("src.services.study_logic.generate_quiz", side_effect=lambda tid, **kw: _quiz(tid)):
+            again = create_quick_review_session(page_size=4, seed=7)
+            self._wait_complete(again["session_id"])
+        self.assertEqual([q["q"] for q in again["questions"]], ids[:4])
+
+    def test_session_without_redis_returns_everything_at_once(self):
+        with patch("src.services.study_logic.get_redis", return_value=None), \
+             patch("src.services.study_logic.generate_quiz", side_effect=lambda tid, **kw: _quiz(tid)):
+            quiz = create_quick_review_session(page_size=4, seed=7)
+        self.assertIsNone(quiz["session_id"])
+        self.assertTrue(quiz["complete"])
+        self.assertEqual(len(quiz["questions"]), quiz["total"])
+        self.assertEqual(quiz["next_page"], None)
+
+    def test_unknown_session_returns_none(self):
+        self.assertIsNone(get_quick_review_page("missing", page=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
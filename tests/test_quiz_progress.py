@@ -0,0 +1,125 @@
+import unittest
+import os
+import sys
+import json
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_redis import FakeRedis
+from src.services import study_logic
+from src.services.study_logic import save_quiz_progress, get_quiz_progress, clear_quiz_progress
+
+
+class CountingRedis(FakeRedis):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+        self.scans = 0
+
+    def get(self, key):
+        self.reads += 1
+        return super().get(key)
+
+    def hgetall(self, key):
+        self.reads += 1
+        return super().hgetall(key)
+
+    def scan_iter(self, pattern):
+        self.scans += 1
+        return super().scan_iter(pattern)
+
+
+def _progress(topic_id):
+    return {"topic": {"id": topic_id, "title": f"Bài {topic_id}"}, "quiz": [{"q": "Q1"}], "currentIndex": 0}
+
+
+class TestQuizProgressHash(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = CountingRedis()
+        patches = [
+            patch("src.services.study_logic.get_redis", return_value=self.redis),
+            patch.object(study_logic, "_progress_migrated", False),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_save_get_and_clear_use_one_hash_per_user(self):
+        self.assertTrue(save_quiz_progress(42, _progress("t1")))
+        self.assertTrue(save_quiz_progress(42, _progress("t2"), topic_id="t2"))
+        self.assertEqual(set(self.redis.hashes["quiz_progress_user_42"]), {"t1", "t2"})
+
+        self.assertEqual(get_quiz_progress(42, "t1")["topic"]["id"], "t1")
+        self.assertEqual(set(get_quiz_progress(42)), {"t1", "t2"})
+
+        clear_quiz_progress(42, "t1")
+        self.assertIsNone(get_quiz_progress(42, "t1"))
+        self.assertEqual(set(get_quiz_progress(42)), {"t2"})
+        clear_quiz_progress(42)
+        self.assertIsNone(get_quiz_progress(42))
+
+    def test_loading_all_progress_is_constant_round_trips(self):
+        for i in range(50):
+            self.redis.set(f"unrelated_key_{i}", "x")
+        save_quiz_progress(42, _progress("t1"))
+        for tid in ("t2", "t3", "t4"):
+            save_quiz_progress(42, _progress(tid))
+
+        self.redis.reads = 0
+        self.assertEqual(len(get_quiz_progress(42)), 4)
+        self.assertEqual(self.redis.reads, 1)
+        self.assertEqual(self.redis.scans, 1)  # only the one-time migration scanned
+
+    def test_legacy_keys_are_migrated_once(self):
+        self.redis.set("quiz_progress_7", json.dumps(_progress("old")))
+        self.redis.set("quiz_progress_7:t1", json.dumps(_progress("t1")))
+        self.redis.set("quiz_progress_8:t9", json.dumps(_progress("t9")))
+        self.redis.hset("quiz_progress_user_8", "t9", json.dumps({"topic": {"id": "t9"}, "currentIndex": 3}))
+
+        self.assertEqual(set(get_quiz_progress(7)), {"old", "t1"})
+        # Progress already in the hash is kept over the legacy copy
+        self.assertEqual(get_quiz_progress(8, "t9")["currentIndex"], 3)
+        self.assertFalse([k for k in self.redis.data if k.startswith("quiz_progress_7") or k.startswith("quiz_progress_8")])
+        self.assertEqual(self.redis.get("quiz_progress_migrated"), "1")
+
+        with patch.object(study_logic, "_progress_migrated", False):
+            get_quiz_progress(7)
+        self.assertEqual(self.redis.scans, 1)
+
+    def test_reads_fall_back_to_legacy_keys_while_another_worker_migrates(self):
+        self.redis.set("quiz_progress_migration_lock", "other-worker")
+        self.redis.set("quiz_progress_7", json.dumps(_progress("old")))
+        self.redis.set("quiz_progress_7:t1", json.dumps(_progress("t1")))
+        save_quiz_progress(7, {"topic": {"id": "t1"}, "currentIndex": 5})
+
+        self.assertEqual(set(get_quiz_progress(7)), {"old", "t1"})
+        self.assertEqual(get_quiz_progress(7, "old")["topic"]["id"], "old")
+        # The hash copy wins over the legacy one
+        self.assertEqual(get_quiz_progress(7, "t1")["currentIndex"], 5)
+
+        clear_quiz_progress(7, "old")
+        self.assertIsNone(self.redis.get("quiz_progress_7"))
+        self.assertEqual(set(get_quiz_progress(7)), {"t1"})
+        # The other worker's lock is left alone
+        self.assertEqual(self.redis.get("quiz_progress_migration_lock"), "other-worker")
+
+    def test_migration_releases_only_its_own_lock(self):
+        self.redis.set("quiz_progress_7:t1", json.dumps(_progress("t1")))
+        real_set = self.redis.set
+
+        def set_then_lose_lock(key, value, *args, **kwargs):
+            result = real_set(key, value, *args, **kwargs)
+            if key == "quiz_progress_migration_lock":
+                # Our lock expired mid-migration and another worker took it
+                real_set(key, "other-worker")
+            return result
+
+        with patch.object(self.redis, "set", side_effect=set_then_lose_lock):
+            study_logic.migrate_legacy_quiz_progress(self.redis)
+        self.assertEqual(self.redis.get("quiz_progress_migration_lock"), "other-worker")
+
+
+if __name__ == '__main__':
+    unittest.main()
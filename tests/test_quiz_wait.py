@@ -0,0 +1,93 @@
+import unittest
+import os
+import sys
+import json
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.cache_backends import MemoryCacheBackend
+from src.services.study_logic import generate_quiz, _wait_for_quiz_generation
+
+LOCK_KEY = "quiz_lock_t1_1_medium_balanced"
+CACHE_KEY = "quiz_t1_1_medium_balanced"
+CHANNEL = "quiz_ready_t1_1_medium_balanced"
+
+
+class TestQuizGenerationWait(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = MemoryCacheBackend()
+        p = patch("src.services.study_logic.get_redis", return_value=self.redis)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def _wait_in_thread(self):
+        result = {}
+
+        def run():
+            result["value"] = _wait_for_quiz_generation(self.redis, CACHE_KEY, LOCK_KEY, CHANNEL)
+            result["at"] = time.monotonic()
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread, result
+
+    def test_waiter_wakes_when_result_is_published(self):
+        self.redis.set(LOCK_KEY, "holder", nx=True, ex=120)
+        thread, result = self._wait_in_thread()
+        time.sleep(0.2)
+        self.redis.set(CACHE_KEY, '{"questions": []}')
+        self.redis.delete(LOCK_KEY)
+        published_at = time.monotonic()
+        self.redis.publish(CHANNEL, "released")
+        thread.join(5)
+        self.assertEqual(result["value"], '{"questions": []}')
+        self.assertLess(result["at"] - published_at, 0.5)
+
+    def test_wait_ends_when_lock_expires(self):
+        self.redis.set(LOCK_KEY, "crashed-holder", px=300)
+        start = time.monotonic()
+        thread, result = self._wait_in_thread()
+        thread.join(5)
+        self.assertIsNone(result["value"])
+        self.assertLess(result["at"] - start, 2)
+
+    def test_concurrent_requests_generate_once(self):
+        release = threading.Event()
+        calls = []
+
+        async def slow_generate(ai_self, content, num_questions=15, **kwargs):
+            calls.append(num_questions)
+            import asyncio
+            await asyncio.to_thread(release.wait, 5)
+            return json.dumps([{"q": "Câu 1", "options": ["A", "B"], "correct": 0, "explanation": ""}])
+
+        async def passthrough(ai_self, raw, *args, **kwargs):
+            return raw
+
+        results = []
+        with patch("src.services.notion.NotionService.fetch_page_content", return_value=["Nội dung"]), \
+             patch("src.services.study_logic.get_page_title", return_value="Bài 1"), \
+             patch("src.services.ai.AsyncAIService.generate_quiz", slow_generate), \
+             patch("src.services.ai.AsyncAIService.enhance_quiz", passthrough):
+            first = threading.Thread(target=lambda: results.append(generate_quiz("t1", num_questions=1)))
+            first.start()
+            deadline = time.monotonic() + 5
+            while not self.redis.get(LOCK_KEY) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            second = threading.Thread(target=lambda: results.append(generate_quiz("t1", num_questions=1)))
+            second.start()
+            time.sleep(0.2)
+            release.set()
+            first.join(10)
+            second.join(10)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["questions"], results[1]["questions"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.quiz_warmer import warm_quiz_cache, DEFAULT_QUIZ_CONFIG
+
+
+class TestQuizWarmer(unittest.TestCase):
+
+    def test_warms_default_config_for_each_candidate(self):
+        candidates = [{"id": "uuid-1", "title": "Bài 1"}, {"id": "uuid-2", "title": "Bài 2"}]
+        calls = []
+
+        def fake_generate(topic_id, **cfg):
+            calls.append((topic_id, cfg))
+            if topic_id == "uuid-2":
+                return {"questions": [{"q": "Lỗi tạo câu hỏi trắc nghiệm"}]}
+            return {"questions": [{"q": "Q1"}]}
+
+        with patch("src.services.quiz_warmer.get_redis", return_value=None), \
+             patch("src.services.study_logic.generate_quiz", side_effect=fake_generate):
+            summary = warm_quiz_cache(candidates)
+
+        self.assertEqual(calls, [("uuid-1", DEFAULT_QUIZ_CONFIG), ("uuid-2", DEFAULT_QUIZ_CONFIG)])
+        self.assertEqual(summary["warmed"], ["Bài 1 (15q, medium, balanced)"])
+        self.assertEqual(summary["failed"], ["uuid-2"])
+
+    def test_respects_max_topics(self):
+        candidates = [{"id": f"uuid-{i}", "title": f"Bài {i}"} for i in range(5)]
+        with patch("src.services.quiz_warmer.get_redis", return_value=None), \
+             patch("src.services.study_logic.generate_quiz", return_value={"questions": [{"q": "Q"}]}) as gen:
+            summary = warm_quiz_cache(candidates, max_topics=2)
+        self.assertEqual(gen.call_count, 2)
+        self.assertEqual(len(summary["warmed"]), 2)
+
+    def test_releases_only_its_own_lock(self):
+        from src.utils.cache_backends import MemoryCacheBackend
+        redis = MemoryCacheBackend()
+
+        def slow_generate(topic_id, **cfg):
+            # Our lock expired mid-pass and another worker took it
+            redis.set("quiz_warmer_lock", "other-worker")
+            return {"questions": [{"q": "Q"}]}
+
+        with patch("src.services.quiz_warmer.get_redis", return_value=redis), \
+             patch("src.services.study_logic.generate_quiz", side_effect=slow_generate):
+            warm_quiz_cache([{"id": "uuid-1", "title": "Bài 1"}])
+        self.assertEqual(redis.get("quiz_warmer_lock"), "other-worker")
+
+    def test_legacy_key_and_full_bank_count_as_cached(self):
+        import json
+        from src.utils.cache_backends import MemoryCacheBackend
+        from src.utils.compression import dumps_cached
+        redis = MemoryCacheBackend()
+        redis.set("quiz_uuid-1", json.dumps({"questions": [{"q": "Q"}]}))
+        redis.hset("quiz_bank_uuid-2", "medium:balanced", dumps_cached([{"q": f"Q{i}"} for i in range(15)]))
+        redis.hset("quiz_bank_uuid-3", "medium:balanced", dumps_cached([{"q": f"Q{i}"} for i in range(5)]))
+        candidates = [{"id": f"uuid-{i}", "title": f"Bài {i}"} for i in (1, 2, 3)]
+
+        with patch("src.services.quiz_warmer.get_redis", return_value=redis), \
+             patch("src.services.study_logic.generate_quiz", return_value={"questions": [{"q": "Q"}]}) as gen:
+            summary = warm_quiz_cache(candidates)
+
+        self.assertEqual([c.args[0] for c in gen.call_args_list], ["uuid-3"])
+        self.assertEqual(summary["cached"], 2)
+
+    def test_idle_check_reads_load_of_other_workers(self):
+        import json
+        import time
+        from src.services import quiz_warmer
+        from src.utils.cache_backends import MemoryCacheBackend
+        redis = MemoryCacheBackend()
+        busy = {"in_flight": 40, "queued": 3, "max_in_flight": 40}
+        redis.hset(quiz_warmer.LLM_LOAD_KEY, "other-worker", json.dumps({**busy, "ts": time.time()}))
+        self.assertFalse(quiz_warmer._wait_for_idle_ai(time.monotonic() + 0.1, redis))
+
+        # A worker that stopped reporting no longer holds the warmer back
+        redis.hset(quiz_warmer.LLM_LOAD_KEY, "other-worker", json.dumps({**busy, "ts": time.time() - 60}))
+        self.assertTrue(quiz_warmer._wait_for_idle_ai(time.monotonic() + 0.1, redis))
+        self.assertIsNone(redis.hget(quiz_warmer.LLM_LOAD_KEY, "other-worker"))
+
+    def test_publish_llm_load_round_trips(self):
+        from src.services import quiz_warmer
+        from src.utils.cache_backends import MemoryCacheBackend
+        redis = MemoryCacheBackend()
+        quiz_warmer.publish_llm_load(redis)
+        self.assertIn(quiz_warmer._process_id, redis.hgetall(quiz_warmer.LLM_LOAD_KEY))
+        self.assertNotEqual(redis.ttl(quiz_warmer.LLM_LOAD_KEY), -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
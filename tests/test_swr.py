@@ -0,0 +1,77 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_redis import FakeRedis
+from src.utils.swr import read_swr, write_swr
+from src.services.study_logic import get_candidates_snapshot
+from src.services import timeline
+
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.release = threading.Event()
+        self.rebuilds = []
+        patches = [
+            patch("src.services.study_logic.get_redis", return_value=self.redis),
+            patch("src.utils.cache.get_redis", return_value=self.redis),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(self.release.set)
+
+    def _slow_rebuild(self, value):
+        def rebuild(*args, **kwargs):
+            self.rebuilds.append(args)
+            self.release.wait(5)
+            return value
+        return rebuild
+
+    def _wait_for_lock_release(self, key):
+        deadline = time.monotonic() + 5
+        while self.redis.get(f"swr_lock_{key}") and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_soft_expiry(self):
+        write_swr(self.redis, "k", [1], soft_ttl=60, hard_ttl=120)
+        self.assertEqual(read_swr(self.redis.get("k")), ([1], False))
+        write_swr(self.redis, "k", [1], soft_ttl=0, hard_ttl=120)
+        self.assertEqual(read_swr(self.redis.get("k")), ([1], True))
+        self.assertEqual(read_swr(None), (None, False))
+
+    def test_stale_candidates_are_served_while_one_refresh_runs(self):
+        write_swr(self.redis, "study_candidates_all", [{"id": "old"}], soft_ttl=0, hard_ttl=120)
+        with patch("src.services.study_logic._build_candidates", side_effect=self._slow_rebuild([{"id": "new"}])):
+            start = time.monotonic()
+            for _ in range(3):
+                self.assertEqual(get_candidates_snapshot(), ([{"id": "old"}], True))
+            self.assertLess(time.monotonic() - start, 1)
+            self.release.set()
+            self._wait_for_lock_release("study_candidates_all")
+        self.assertEqual(len(self.rebuilds), 1)
+
+    def test_fresh_candidates_do_not_refresh(self):
+        write_swr(self.redis, "study_candidates_all", [{"id": "c1"}], soft_ttl=60, hard_ttl=120)
+        with patch("src.services.study_logic._build_candidates") as build:
+            self.assertEqual(get_candidates_snapshot(), ([{"id": "c1"}], False))
+        build.assert_not_called()
+
+    def test_stale_timeline_is_served_and_rebuilt_in_background(self):
+        write_swr(self.redis, "structured_timeline", [{"content": "old"}], soft_ttl=0, hard_ttl=120)
+        with patch("src.services.timeline._build_structured_timeline", side_effect=self._slow_rebuild([{"content": "new"}])):
+            self.assertEqual(timeline.get_structured_timeline_snapshot(), ([{"content": "old"}], True))
+            self.release.set()
+            self._wait_for_lock_release("structured_timeline")
+        self.assertEqual(len(self.rebuilds), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
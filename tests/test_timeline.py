@@ -0,0 +1,187 @@
+import unittest
+import os
+import sys
+import json
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_redis import FakeRedis
+from src.services import timeline
+from src.utils.swr import read_swr
+
+
+def _todo(text):
+    return {"block": {"type": "to_do", "text": text}}
+
+
+class _InlineThread:
+    """Runs the background enrichment inline so tests see its cache writes."""
+
+    def __init__(self, target, **kwargs):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+
+def _parse_block(block):
+    return {"type": "to_do", "completed": False, "dates": ["2026-07-15"], "clean_text": block["text"], "deadline": "2026-07-15"}
+
+
+class _TimelineTestCase(unittest.TestCase):
+
+    def cached_timeline(self):
+        return read_swr(self.redis.get("structured_timeline"))[0]
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.todos = {"p1": ["Nộp báo cáo @Today"], "p2": ["Ôn thi 15/07 09:00"]}
+        self.json_calls = []
+        self.summary_calls = []
+        self.now = datetime(2026, 7, 10, 9, 30, tzinfo=timezone(timedelta(hours=7)))
+
+        def generate_json(ai_self, raw_data):
+            self.json_calls.append(raw_data)
+            return json.dumps([{"date": "15/07 09:00", "course": "Môn 2", "content": "Ôn thi", "urgency": "high", "weekday": "Thứ Tư"}])
+
+        def summarize(ai_self, raw_data, is_raw_text=False):
+            self.summary_calls.append(raw_data)
+            return "Tóm tắt"
+
+        patches = [
+            patch("src.utils.cache.get_redis", return_value=self.redis),
+            patch("src.services.timeline.fetch_in_progress_tasks", return_value=[{"page_id": "p1", "name": "Môn 1"}, {"page_id": "p2", "name": "Môn 2"}]),
+            patch("src.utils.block_parser.fetch_blocks_recursive", side_effect=lambda client, headers, page_id: [_todo(t) for t in self.todos[page_id]]),
+            patch("src.utils.block_parser.parse_block", side_effect=_parse_block),
+            patch("src.services.ai.AIService.generate_timeline_json", generate_json),
+            patch("src.services.ai.AIService.summarize_timeline", summarize),
+            patch("src.services.timeline._vn_now", side_effect=lambda: self.now),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+
+class TestTimelineAICache(_TimelineTestCase):
+
+    def setUp(self):
+        super().setUp()
+        p = patch("src.services.timeline.threading.Thread", _InlineThread)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_refresh_with_unchanged_todos_skips_ai(self):
+        timeline.get_structured_timeline(force_refresh=True)
+        enriched = self.cached_timeline()
+        self.now += timedelta(minutes=5)
+        second = timeline.get_structured_timeline(force_refresh=True)
+        self.assertEqual(len(self.json_calls), 1)
+        self.assertEqual(second, enriched)
+
+        self.assertEqual(timeline.get_timeline_summary(), "Tóm tắt")
+        self.assertEqual(timeline.get_timeline_summary(), "Tóm tắt")
+        self.assertEqual(len(self.summary_calls), 1)
+        # The AI still sees resolved dates, not the @shortcuts
+        self.assertNotIn("@Today", self.summary_calls[0])
+
+    def test_changed_todos_or_new_day_call_ai_again(self):
+        timeline.get_structured_timeline(force_refresh=True)
+        self.todos["p1"].append("Làm bài tập 12/07")
+        timeline.get_structured_timeline(force_refresh=True)
+        self.assertEqual(len(self.json_calls), 2)
+
+        self.now += timedelta(days=1)
+        timeline.get_structured_timeline(force_refresh=True)
+        self.assertEqual(len(self.json_calls), 3)
+
+    def test_failed_ai_output_is_not_cached(self):
+        with patch("src.services.ai.AIService.summarize_timeline", side_effect=["Error: model down", "Tóm tắt"]):
+            self.assertEqual(timeline.get_timeline_summary(), "Error: model down")
+            self.assertEqual(timeline.get_timeline_summary(), "Tóm tắt")
+            self.assertEqual(timeline.get_timeline_summary(), "Tóm tắt")
+
+
+class TestDeterministicFirstTimeline(_TimelineTestCase):
+
+    def test_returns_deterministic_timeline_without_waiting_for_ai(self):
+        release = threading.Event()
+
+        def slow_json(ai_self, raw_data):
+            release.wait(5)
+            return json.dumps([{"date": "15/07 09:00", "course": "Môn 2", "content": "Ôn thi (AI)", "urgency": "high", "weekday": "T4"}])
+
+        with patch("src.services.ai.AIService.generate_timeline_json", slow_json):
+            start = time.monotonic()
+            items = timeline.get_structured_timeline(force_refresh=True)
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertTrue(timeline.is_timeline_enrichment_pending())
+
+            self.assertEqual([i["course"] for i in items], ["Môn 1", "Môn 2"])
+            self.assertEqual([i["date"] for i in items], ["10/07 09:30", "15/07 09:00"])
+            expected_weekdays = [timeline.WEEKDAY_SHORT[timeline._parse_date_for_sorting(i["date"]).weekday()] for i in items]
+            self.assertEqual([i["weekday"] for i in items], expected_weekdays)
+            self.assertEqual(self.cached_timeline(), items)
+
+            release.set()
+            deadline = time.monotonic() + 5
+            while timeline.is_timeline_enrichment_pending() and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertFalse(timeline.is_timeline_enrichment_pending())
+        cached = self.cached_timeline()
+        self.assertEqual([i["content"] for i in cached], ["Ôn thi (AI)"])
+        # Later reads are served from the swapped-in cache
+        self.assertEqual(timeline.get_structured_timeline(), cached)
+
+    def test_outdated_enrichment_does_not_overwrite_newer_timeline(self):
+        release_old = threading.Event()
+
+        def json_for(ai_self, raw_data):
+            if "Làm bài tập" not in raw_data:
+                release_old.wait(5)
+                return json.dumps([{"date": "15/07 09:00", "course": "Môn 2", "content": "Cũ (AI)", "urgency": "high", "weekday": "T4"}])
+            return json.dumps([{"date": "12/07", "course": "Môn 1", "content": "Mới (AI)", "urgency": "high", "weekday": "CN"}])
+
+        with patch("src.services.ai.AIService.generate_timeline_json", json_for):
+            timeline.get_structured_timeline(force_refresh=True)
+            self.assertTrue(timeline.is_timeline_enrichment_pending())
+
+            self.todos["p1"].append("Làm bài tập 12/07")
+            timeline.get_structured_timeline(force_refresh=True)
+            deadline = time.monotonic() + 5
+            while timeline.is_timeline_enrichment_pending() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual([i["content"] for i in self.cached_timeline()], ["Mới (AI)"])
+
+            # The older set's enrichment finishes last and is dropped
+            release_old.set()
+            deadline = time.monotonic() + 5
+            while timeline._enriching and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual([i["content"] for i in self.cached_timeline()], ["Mới (AI)"])
+        self.assertFalse(timeline.is_timeline_enrichment_pending())
+
+    def test_failed_enrichment_keeps_deterministic_timeline(self):
+        with patch("src.services.timeline.threading.Thread", _InlineThread), \
+             patch("src.services.ai.AIService.generate_timeline_json", side_effect=RuntimeError("model down")):
+            items = timeline.get_structured_timeline(force_refresh=True)
+        self.assertEqual(self.cached_timeline(), items)
+        self.assertFalse(timeline.is_timeline_enrichment_pending())
+
+    def test_no_enrichment_without_cache(self):
+        with patch("src.utils.cache.get_redis", return_value=None), \
+             patch("src.services.timeline.threading.Thread") as thread:
+            items, stale = timeline.get_structured_timeline_snapshot()
+        self.assertEqual(len(items), 2)
+        self.assertFalse(stale)
+        thread.assert_not_called()
+        self.assertEqual(self.json_calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()